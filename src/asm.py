@@ -0,0 +1,198 @@
+import re
+
+from registers import ARGUMENTS, RESULT, CALLER_SAVED, FIXED_ROLES
+from runtime import CONTRACTS
+
+
+# Operand roles of every BatPU-2 instruction the compiler emits, as
+# (positions read, positions written). Pseudo-instructions are listed with
+# their own operand order, e.g. CMP A B is SUB A B r0.
+OPERANDS = {
+    'NOP': ((), ()),
+    'HLT': ((), ()),
+    'ADD': ((0, 1), (2,)),
+    'SUB': ((0, 1), (2,)),
+    'NOR': ((0, 1), (2,)),
+    'AND': ((0, 1), (2,)),
+    'XOR': ((0, 1), (2,)),
+    'RSH': ((0,), (1,)),
+    'LDI': ((), (0,)),
+    'ADI': ((0,), (0,)),
+    'JMP': ((), ()),
+    'BRH': ((), ()),
+    'CAL': ((), ()),
+    'RET': ((), ()),
+    'LOD': ((0,), (1,)),
+    'STR': ((0, 1), ()),
+    'CMP': ((0, 1), ()),
+    'MOV': ((0,), (1,)),
+    'LSH': ((0,), (1,)),
+    'INC': ((0,), (0,)),
+    'DEC': ((0,), (0,)),
+    'NOT': ((0,), (1,)),
+    'NEG': ((0,), (1,)),
+}
+
+JUMPS = {'JMP', 'BRH', 'CAL'}
+
+# Registers read and written without being operands, from the calling
+# convention: a call reads every argument register and may change any
+# caller-saved one, and a return reads the result. Calls to the runtime
+# routines follow their own contract instead, from runtime.CONTRACTS.
+IMPLICIT = {
+    'CAL': (ARGUMENTS, CALLER_SAVED + FIXED_ROLES),
+    'RET': ((RESULT,), ()),
+}
+
+REGISTER = re.compile(r"[rv]\d+")
+
+
+class Instruction:
+    """
+    One line of BatPU-2 assembly, split into its parts so passes can inspect
+    and rewrite it without losing the original layout.
+
+    Attributes:
+        prefix (str): Blank lines emitted before the instruction.
+        label (str): The label defined on this line (e.g. '.mul_loop_1'), if any.
+        opcode (str): The mnemonic, or None for label-only and blank lines.
+        operands (list): The operands as strings.
+        comment (str): A trailing comment, including its separator.
+    """
+    __slots__ = ('prefix', 'label', 'opcode', 'operands', 'comment')
+
+    def __init__(self, prefix, label, opcode, operands, comment):
+        self.prefix = prefix
+        self.label = label
+        self.opcode = opcode
+        self.operands = operands
+        self.comment = comment
+
+    def uses(self):
+        """Returns the registers this instruction reads."""
+        read, _ = OPERANDS.get(self.opcode, ((), ()))
+        implicit, _ = self.implicit()
+        return [self.operands[i] for i in read if is_register(self.operands[i])] + list(implicit)
+
+    def defs(self):
+        """Returns the registers this instruction writes."""
+        _, written = OPERANDS.get(self.opcode, ((), ()))
+        _, implicit = self.implicit()
+        return [self.operands[i] for i in written if is_register(self.operands[i])] + list(implicit)
+
+    def implicit(self):
+        """Returns the registers read and written without being operands."""
+        if self.opcode == 'CAL' and self.operands[-1] in CONTRACTS:
+            return CONTRACTS[self.operands[-1]]
+        return IMPLICIT.get(self.opcode, ((), ()))
+
+    def target(self):
+        """Returns the label a jump, branch or call goes to, or None."""
+        if self.opcode in JUMPS:
+            return self.operands[-1]
+        return None
+
+    def __str__(self):
+        return render(self)
+
+
+def successors(code):
+    """Returns, for every instruction, the indices of the instructions that can run next."""
+    labels = {instruction.label: index for index, instruction in enumerate(code)
+              if instruction.label is not None}
+    successors = []
+    for index, instruction in enumerate(code):
+        following = [index + 1] if index + 1 < len(code) else []
+        # Jumps to labels outside the code (e.g. '.end') leave the program.
+        target = labels.get(instruction.target())
+        match instruction.opcode:
+            case 'JMP':
+                successors.append([target] if target is not None else [])
+            case 'BRH':
+                successors.append(
+                    following + ([target] if target is not None else []))
+            case 'HLT' | 'RET':
+                successors.append([])
+            case _:
+                successors.append(following)
+    return successors
+
+
+def liveness(code, successors, tracked=None):
+    """
+    Backward dataflow over the instructions.
+
+    Args:
+        code (list): The parsed instructions.
+        successors (list): The result of successors(code).
+        tracked (callable): Selects the registers to track; defaults to every
+                            register except r0, whose writes are discarded.
+
+    Returns:
+        tuple: (live_in, live_out), one set of registers per instruction.
+    """
+    tracked = tracked or (lambda register: register != 'r0')
+    uses = [{r for r in instruction.uses() if tracked(r)} for instruction in code]
+    defs = [{r for r in instruction.defs() if tracked(r)} for instruction in code]
+    live_in = [set() for _ in code]
+    live_out = [set() for _ in code]
+
+    changed = True
+    while changed:
+        changed = False
+        for index in reversed(range(len(code))):
+            out = set()
+            for successor in successors[index]:
+                out |= live_in[successor]
+            live_out[index] = out
+            live = uses[index] | (out - defs[index])
+            if live != live_in[index]:
+                live_in[index] = live
+                changed = True
+    return live_in, live_out
+
+
+def is_register(operand):
+    return REGISTER.fullmatch(operand) is not None
+
+
+def is_virtual(operand):
+    return operand.startswith('v') and is_register(operand)
+
+
+def parse(line):
+    """Splits an emitted assembly line into an Instruction."""
+    body = line.lstrip('\n')
+    prefix = line[:len(line) - len(body)]
+
+    comment = ""
+    for marker in (';', '#', '//'):
+        index = body.find(marker)
+        if index != -1:
+            body, comment = body[:index], body[index:]
+            break
+    # Keep the whitespace that separated the code from its comment.
+    stripped = body.rstrip()
+    if comment:
+        comment = body[len(stripped):] + comment
+    body = stripped.strip()
+
+    label = None
+    if body.startswith('.'):
+        label, _, body = body.partition(' ')
+        body = body.strip()
+
+    if not body:
+        return Instruction(prefix, label, None, [], comment)
+    opcode, *operands = body.split()
+    return Instruction(prefix, label, opcode.upper(), operands, comment)
+
+
+def render(instruction):
+    """Formats an Instruction back into an assembly line."""
+    parts = []
+    if instruction.label is not None:
+        parts.append(instruction.label)
+    if instruction.opcode is not None:
+        parts.append(' '.join([instruction.opcode, *instruction.operands]))
+    return instruction.prefix + ' '.join(parts) + instruction.comment
@@ -0,0 +1,99 @@
+import contextlib
+import functools
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import CompilationCache
+
+
+class BatchResult:
+    """
+    The outcome of compiling one file in a batch.
+
+    Attributes:
+        path (str): The compiled script.
+        output (str): Everything the compiler printed for it, diagnostics included.
+        ok (bool): False if the file could not be read, had errors or
+                   crashed the compiler.
+        cached (bool): Whether the assembly came from the compilation cache,
+                       or None if no cache was used.
+    """
+    __slots__ = ('path', 'output', 'ok', 'cached')
+
+    def __init__(self, path, output, ok, cached=None):
+        self.path = path
+        self.output = output
+        self.ok = ok
+        self.cached = cached
+
+
+def collect(paths, extension='.tki'):
+    """
+    Expands the arguments into the list of scripts to compile. Directories
+    are searched recursively for scripts, in a stable order.
+    """
+    scripts = []
+    for path in paths:
+        if not os.path.isdir(path):
+            scripts.append(path)
+            continue
+        for root, directories, files in os.walk(path):
+            directories.sort()
+            scripts += [os.path.join(root, name) for name in sorted(files)
+                        if name.endswith(extension)]
+    return scripts
+
+
+def compile_file(path, cached=True, level='O2'):
+    """
+    Compiles one script next to itself. Runs in a worker process, so the
+    compiler's output is captured instead of interleaving with other files.
+    Whatever goes wrong with one file is reported in its result, so it
+    can't stop the rest of the batch.
+    """
+    from main import Tikki
+
+    cache = CompilationCache() if cached else None
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            with open(path, 'rb') as file:
+                source = file.read().decode()
+        except OSError:
+            print("File not found")
+            return BatchResult(path, buffer.getvalue(), False)
+        except UnicodeDecodeError as error:
+            print(f"Not a UTF-8 text file: {error}")
+            return BatchResult(path, buffer.getvalue(), False)
+        try:
+            error = Tikki.run(source, os.path.splitext(path)[0] + '.as', cache=cache,
+                              level=level)
+        except Exception as error:
+            print(f"Internal compiler error: {type(error).__name__}: {error}")
+            return BatchResult(path, buffer.getvalue(), False)
+    return BatchResult(path, buffer.getvalue(), not error.had_error,
+                       bool(cache.hits) if cache is not None else None)
+
+
+def compile_all(paths, jobs=None, cached=True, level='O2'):
+    """
+    Compiles the scripts across a pool of worker processes.
+
+    Args:
+        paths (list): The scripts to compile.
+        jobs (int): The number of workers; defaults to the number of CPUs.
+        cached (bool): Whether to use the compilation cache.
+        level (str): The optimisation level, 'O2' or 'Os'.
+
+    Yields:
+        BatchResult: One per script, in the order of paths.
+    """
+    if not paths:
+        return
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # A few files per task so start-up and pickling are amortised.
+        chunksize = max(1, len(paths) // (jobs * 4))
+        yield from executor.map(functools.partial(compile_file, cached=cached, level=level),
+                                paths, chunksize=chunksize)
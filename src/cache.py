@@ -0,0 +1,160 @@
+import hashlib
+import os
+
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'tikki')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_compiler_version = None
+# Cache directory -> the bytes this process believes it holds, so a store
+# only walks the directory once the total crosses the limit.
+_sizes = {}
+
+
+def compiler_version():
+    """
+    Fingerprints the compiler itself: a hash of every module next to this
+    one, so any change to the compiler invalidates what it cached before.
+    """
+    global _compiler_version
+    if _compiler_version is None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py'):
+                digest.update(name.encode())
+                with open(os.path.join(directory, name), 'rb') as file:
+                    digest.update(file.read())
+        _compiler_version = digest.hexdigest()
+    return _compiler_version
+
+
+class CompilationCache:
+    """
+    A content-addressed, on-disk store of generated assembly.
+
+    Entries are keyed on the source bytes, the compiler version and the
+    optimisation flags, so a key never needs invalidating: any change
+    produces a different key. Every entry is a file named after its key;
+    reading one refreshes its modification time, and the least recently used
+    entries are evicted once the cache grows past max_bytes. Writes are
+    atomic, so worker processes can share one cache directory. Each process
+    keeps a running total of the size from its first store on, and only
+    walks the directory again once that total crosses max_bytes, so the
+    limit is soft by what other processes stored meanwhile.
+
+    Attributes:
+        directory (str): Where the entries are stored.
+        max_bytes (int): The size past which a store evicts entries.
+        hits (int), misses (int), evictions (int): Counters for this instance.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get(
+            'TIKKI_CACHE_DIR', DEFAULT_DIRECTORY)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, source, flags=()):
+        """
+        Computes the key of a compilation.
+
+        Args:
+            source (str | bytes): The script being compiled.
+            flags (iterable): The options that change the generated code.
+        """
+        if isinstance(source, str):
+            source = source.encode()
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode())
+        digest.update(repr(sorted(flags)).encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.as')
+
+    def load(self, key):
+        """Returns the cached assembly for the key, or None."""
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                text = file.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Another process evicted it since it was read.
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def store(self, key, text):
+        import tempfile
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        descriptor, temporary = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(text)
+            file.flush()
+            written = os.fstat(file.fileno()).st_size
+        os.replace(temporary, path)
+
+        size = _sizes.get(self.directory)
+        if size is None:
+            size = sum(entry_size for _, entry_size, _ in self.entries())
+        else:
+            size += written - replaced
+        _sizes[self.directory] = size
+        if size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """Returns (modification time, size, path) for every entry."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.as'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, path))
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is back
+        to three quarters of max_bytes, so the next stores have room before
+        it needs another walk."""
+        entries = self.entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        _sizes[self.directory] = size
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def report(self):
+        return (f"Cache: {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.evictions} eviction(s)")
@@ -0,0 +1,92 @@
+"""Compiles scripts through a running server.py instead of a fresh process.
+
+Usage: python3 client.py [-O2 | -Os] [--socket=path] script...
+
+Each script is compiled next to itself, like main.py does, at the given
+optimisation level. The exit code is 1 if any script had errors, and 69
+if no server is listening.
+"""
+import itertools
+import json
+import os
+import socket
+import sys
+
+
+def default_socket():
+    return os.environ.get('TIKKI_SOCKET', f"/tmp/tikki-{os.getuid()}.sock")
+
+
+class Client:
+    """A connection to the compile server."""
+
+    def __init__(self, path=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path or default_socket())
+        self.file = self.socket.makefile('rwb')
+        self.ids = itertools.count(1)
+
+    def call(self, method, **params):
+        request = {'jsonrpc': '2.0', 'id': next(self.ids),
+                   'method': method, 'params': params}
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error']['message'])
+        return response['result']
+
+    def compile(self, source, level='O2'):
+        return self.call('compile', source=source, level=level)
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+def describe(diagnostic):
+    """One line for a diagnostic record from the server."""
+    where = ("in the program" if diagnostic['line'] is None
+             else f"in line {diagnostic['line']}:{diagnostic['column']}")
+    return f"[{diagnostic['phase']}Error] {where}: {diagnostic['message']}"
+
+
+def main(args):
+    sockets = [arg for arg in args if arg.startswith('--socket=')]
+    levels = [arg for arg in args if arg in ('-O2', '-Os')]
+    scripts = [arg for arg in args if arg not in sockets and arg not in levels]
+    if not scripts or any(arg.startswith('-') for arg in scripts):
+        print("Usage: python3 client.py [-O2 | -Os] [--socket=path] script...")
+        sys.exit(64)
+    level = levels[-1][1:] if levels else 'O2'
+
+    try:
+        client = Client(sockets[-1][len('--socket='):] if sockets else None)
+    except OSError:
+        print("No compile server is running, start one with: python3 server.py")
+        sys.exit(69)
+
+    failed = False
+    for path in scripts:
+        try:
+            with open(path, 'rb') as file:
+                source = file.read().decode()
+        except FileNotFoundError:
+            print("File not found")
+            failed = True
+            continue
+        result = client.compile(source, level)
+        for diagnostic in result['diagnostics']:
+            print(describe(diagnostic))
+        if result['ok']:
+            with open(os.path.splitext(path)[0] + '.as', 'w') as file:
+                file.write(result['assembly'])
+        else:
+            failed = True
+    client.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,4 +1,3 @@
-from colorama import Fore, Style
 from token_type import TokenType
 
 
@@ -14,42 +13,75 @@ class RuntimeError(Exception):
 
 class DivisionByZeroError(RuntimeError):
     def __init__(self, token, reporter):
-        super().__init__(token, "Division by zero is not allowed.", reporter)
-        self.phase = "Arithmetic"
+        super().__init__(token, "Division by zero is not allowed.", reporter, "Arithmetic")
 
 
 class ModuloByZeroError(RuntimeError):
     def __init__(self, token, reporter):
-        super().__init__(token, "Modulo by zero is not allowed.", reporter)
-        self.phase = "Arithmetic"
+        super().__init__(token, "Modulo by zero is not allowed.", reporter, "Arithmetic")
 
 
 class InvalidOperandError(RuntimeError):
     def __init__(self, token, operand, reporter):
         message = f"Invalid operand: '{operand}'."
-        super().__init__(token, message, reporter)
-        self.phase = "Type"
+        super().__init__(token, message, reporter, "Type")
 
 
 class InvalidOperandsError(RuntimeError):
     def __init__(self, token, left, right, reporter):
         message = f"Invalid operands: '{left}' and '{right}'."
-        super().__init__(token, message, reporter)
-        self.phase = "Type"
+        super().__init__(token, message, reporter, "Type")
 
 
 class UndefinedVariableError(RuntimeError):
     def __init__(self, token, variable_name, reporter):
         message = f"Undefined variable '{variable_name}'."
-        super().__init__(token, message, reporter)
-        self.phase = "Resolution"
+        super().__init__(token, message, reporter, "Resolution")
+
+
+class NotCallableError(RuntimeError):
+    def __init__(self, token, name, reporter):
+        message = f"'{name}' is not a function."
+        super().__init__(token, message, reporter, "Resolution")
+
+
+class ArgumentCountError(RuntimeError):
+    def __init__(self, token, expected, actual, reporter):
+        message = f"Expected {expected} arguments but got {actual}."
+        super().__init__(token, message, reporter, "Resolution")
+
+
+class RecursiveCallError(RuntimeError):
+    def __init__(self, token, name, reporter):
+        message = f"Recursive call to '{name}': function frames are static."
+        super().__init__(token, message, reporter, "Resolution")
+
+
+class CapturedVariableError(RuntimeError):
+    def __init__(self, token, name, reporter):
+        message = f"Cannot use '{name}' here: functions only see their own locals and globals."
+        super().__init__(token, message, reporter, "Resolution")
+
+
+class ReturnOutsideFunctionError(RuntimeError):
+    def __init__(self, token, reporter):
+        super().__init__(token, "Cannot return from top-level code.", reporter, "Resolution")
 
 
 class TypeMismatchError(RuntimeError):
     def __init__(self, token, expected, actual, reporter):
         message = f"Expected type {expected}, but got {actual}."
-        super().__init__(token, message, reporter)
-        self.phase = "Type"
+        super().__init__(token, message, reporter, "Type")
+
+
+class DataMemoryError(Exception):
+    def __init__(self, needed, available, reporter):
+        message = (f"The program needs {needed} bytes of data RAM, "
+                   f"only {available} are available.")
+        super().__init__(message)
+        self.reporter = reporter
+        self.reporter.had_error = True
+        self.reporter.report_program(message, "Memory")
 
 
 class ParseError(Exception):
@@ -60,20 +92,26 @@ class ParseError(Exception):
 
         if token.type == TokenType.EOF:
             message = f"at end: {errordescription}"
-            TikkiError.had_error = True
         else:
             message = f" at '{token.lexeme}': {errordescription}"
-            TikkiError.had_error = True
+        self.reporter.had_error = True
 
         self.reporter.report(token, message, phase)
         super().__init__(message)
 
 
 class TikkiError:
-    had_error = False
+    """
+    Reports the diagnostics of one source file.
+
+    Attributes:
+        source_code (list): The source lines, quoted in the reports.
+        had_error (bool): Whether a syntax error was reported for this file.
+    """
 
     def __init__(self, source_code) -> None:
         self.source_code = source_code.splitlines()
+        self.had_error = False
 
     def report(self, token, message, phase="Syntax"):
         line_number = token.line - 1
@@ -81,7 +119,19 @@ class TikkiError:
         source_line = self.source_code[line_number]
         self.display_error(source_line, token.line, column, message, phase)
 
+    def report_program(self, message, phase):
+        """Reports an error that belongs to the program as a whole rather
+        than to a place in its source."""
+        from colorama import Fore, Style
+
+        print(Fore.RED + Style.BRIGHT + f"[{phase}Error]" + Fore.WHITE + " in the program:"
+              + Style.RESET_ALL)
+        print(Fore.RED + Style.BRIGHT + "  " + message + Style.RESET_ALL)
+
     def display_error(self, source_line, line, column, message, phase):
+        # Imported here so compiling a correct script never pays for it.
+        from colorama import Fore, Style
+
         max_line_number_digits = len(str(line + 1))
         line_marker_format = f"{{:>{max_line_number_digits}}} | "
         prefix = ''.join(
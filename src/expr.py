@@ -1,6 +1,8 @@
 # This file is auto-generated
 
 class Expr:
+    __slots__ = ()
+
     def accept(self, visitor):
         pass
 
@@ -35,15 +37,23 @@ class Visitor:
 
 
 class Assign(Expr):
+    __slots__ = ('name', 'value', 'binding', 'depth', 'slot')
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
+        # Filled in by the Resolver.
+        self.binding = None
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_assign_expr(self)
 
 
 class Binary(Expr):
+    __slots__ = ('left', 'operator', 'right')
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -54,6 +64,8 @@ class Binary(Expr):
 
 
 class Call(Expr):
+    __slots__ = ('callee', 'paren', 'arguments')
+
     def __init__(self, callee, paren, arguments):
         self.callee = callee
         self.paren = paren
@@ -64,6 +76,8 @@ class Call(Expr):
 
 
 class Grouping(Expr):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -72,14 +86,19 @@ class Grouping(Expr):
 
 
 class Literal(Expr):
-    def __init__(self, value):
+    __slots__ = ('value', 'token')
+
+    def __init__(self, value, token=None):
         self.value = value
+        self.token = token
 
     def accept(self, visitor):
         return visitor.visit_literal_expr(self)
 
 
 class Logical(Expr):
+    __slots__ = ('left', 'operator', 'right')
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -90,6 +109,8 @@ class Logical(Expr):
 
 
 class Unary(Expr):
+    __slots__ = ('operator', 'right')
+
     def __init__(self, operator, right):
         self.operator = operator
         self.right = right
@@ -99,16 +120,28 @@ class Unary(Expr):
 
 
 class Constant(Expr):
+    __slots__ = ('name', 'binding', 'depth', 'slot')
+
     def __init__(self, name):
         self.name = name
+        # Filled in by the Resolver.
+        self.binding = None
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_constant_expr(self)
 
 
 class Variable(Expr):
+    __slots__ = ('name', 'binding', 'depth', 'slot')
+
     def __init__(self, name):
         self.name = name
+        # Filled in by the Resolver.
+        self.binding = None
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_variable_expr(self)
@@ -1,79 +1,520 @@
-from token_type import TokenType
-import expr as expr
-import stmt as stmt
-from registers import Registers
+import ir as ir
+import loops as loops
+from lowering import Lowering
+from passes import default_pass_manager
+from registers import Registers, ARGUMENTS, RESULT, CALLEE_SAVED
+from regalloc import RegisterAllocator
 import libraries as libraries
+import runtime as runtime
+import layout as layout
 
 
-class CodeGenerator(expr.Visitor, stmt.Visitor):
+# IR comparison -> (BRH condition, whether CMP takes the operands swapped).
+# CMP a b sets the carry when a >= b unsigned, so every comparison is a
+# single test.
+CONDITIONS = {
+    'eq': ('EQ', False),
+    'ne': ('NE', False),
+    'ge': ('GE', False),
+    'lt': ('LT', False),
+    'le': ('GE', True),
+    'gt': ('LT', True),
+}
 
-    def __init__(self) -> None:
+
+def power_of_two(operand):
+    """Whether the operand is a constant power of two."""
+    return (isinstance(operand, ir.Const) and operand.value != 0
+            and operand.value & (operand.value - 1) == 0)
+
+
+class CodeGenerator:
+    """
+    Translates the AST into BatPU-2 assembly.
+
+    The statements are lowered into the three-address IR, optimised by the
+    pass manager, and then every IR instruction is selected into BatPU-2
+    instructions over virtual registers. Each function is then handed to its
+    own RegisterAllocator, which maps the virtual registers onto r1-r8 and
+    spills the rest to data RAM.
+
+    The top-level code comes first and the functions it still calls after
+    inlining follow it, each under its own label, entered with CAL and left
+    with RET under the convention in registers.py. Functions can't recurse,
+    so every one gets a static frame in data RAM, after the shared globals:
+    the arguments past the fourth, then its spill slots and the callee-saved
+    registers it uses, saved on entry and restored before every RET. Frames
+    of functions that are never active at once overlap, as layout.py lays
+    out, and the result is recorded in a layout.MemoryMap.
+
+    The helper loops for multiplication, division, variable shifts and
+    materialised comparisons are either expanded inline from libraries.py or called as
+    the shared routines of runtime.py, which are emitted once after the
+    functions. The choice is made per use from the optimisation level: -O2
+    weighs the ROM a call saves against the cycles it adds in loops, -Os
+    only the ROM.
+
+    Attributes:
+        frames (dict): ir.Function -> its frame, as a dict of the data RAM
+                       addresses of its 'arguments', 'spills' and 'saves'.
+        allocators (dict): ir.Function -> the RegisterAllocator that ran on it.
+        level (str): The optimisation level, a key of runtime.LEVELS.
+        calls (dict): ir.Instr -> the name of the runtime routine it calls.
+        memory_map (layout.MemoryMap): What every data RAM address holds.
+    """
+
+    def __init__(self, passes=None, level='O2') -> None:
         self.registers = Registers()
+        self.passes = passes or default_pass_manager(level)
+        self.level = level
+        self.calls = {}
         self.instructions = []
+        self.function = None
+        self.program = None
+        self.functions = []
+        self.frames = {}
+        self.allocators = {}
+        self.memory_map = None
         self.counters = {
             'ccumul': 0,
             'ccudiv': 0,
             'ccuge': 0,
             'ccgt': 0,
+            'ccueq': 0,
+            'ccune': 0,
             'cclls': 0,
             'cclrs': 0,
         }
 
     def generate(self, statements):
-        for stmt in statements:
-            self.execute(stmt)
+        self.program = Lowering().lower(statements)
+        self.passes.run(self.program)
+        calls = self.called(self.program.functions[0])
+        self.functions = layout.call_order(calls)
+        self.plan_routines()
 
-    def visit_expression_stmt(self, stmt):
-        self.evaluate(stmt.expression)
-        return None
+        self.memory_map = layout.MemoryMap()
+        for address, symbol in enumerate(self.program.globals):
+            self.memory_map.place(address, None, 'global', [symbol.name])
+        address = len(self.program.globals)
+        for function in self.functions:
+            stacked = function.params[len(ARGUMENTS):]
+            self.frames[function] = {'arguments': list(range(address, address + len(stacked)))}
+            for offset, param in enumerate(stacked):
+                self.memory_map.place(address + offset, function.name, 'argument', [param.name])
+            address += len(stacked)
 
-    def evaluate(self, expr):
-        return expr.accept(self)
+        # The end of each frame: the frames of its callees start after it.
+        ends = {}
+        code = []
+        for function in self.functions:
+            base = max((ends[caller] for caller in self.functions if function in calls[caller]),
+                       default=address)
+            self.instructions = []
+            self.select(function)
+            allocator = RegisterAllocator(self.registers, spill_base=base)
+            incoming = ARGUMENTS[:len(function.params)] if function is not self.functions[0] else ()
+            lines = allocator.allocate(self.instructions, incoming)
+            self.allocators[function] = allocator
+            self.frames[function]['spills'] = sorted(allocator.slots)
+            self.frames[function]['saves'] = []
+            ends[function] = base + len(allocator.slots)
+            if function is not self.functions[0]:
+                ends[function] = self.save_registers(function, lines, allocator, ends[function])
+            self.map_frame(function, allocator)
+            code += lines
 
-    def execute(self, statement):
-        statement.accept(self)
+        for name, routine in runtime.ROUTINES.items():
+            if name in self.calls.values():
+                code += routine.body
 
-    def visit_literal_expr(self, expr):
-        reg = self.registers.pop()
-        self.instructions.append(f"LDI {reg} {expr.value}")
-        return reg
+        self.instructions = code
+        return self.instructions
 
-    def visit_binary_expr(self, expr):
+    @staticmethod
+    def called(main):
+        """The top-level code and every function it can reach through calls,
+        each mapped to the functions it calls."""
+        functions = {main: []}
+        pending = [main]
+        for function in pending:
+            callees = functions[function]
+            for block in function.blocks:
+                for instruction in block.instructions:
+                    if (isinstance(instruction, ir.Call)
+                            and instruction.function not in callees):
+                        callees.append(instruction.function)
+            for callee in callees:
+                if callee not in functions:
+                    functions[callee] = []
+                    pending.append(callee)
+        return functions
 
-        left_register = self.evaluate(expr.left)
-        right_register = self.evaluate(expr.right)
+    def map_frame(self, function, allocator):
+        """Adds the function's spill slots and saves to the memory map, and
+        where each of its named variables lives."""
+        names = {}
+        for block in function.blocks:
+            for instruction in block.instructions:
+                for operand in [instruction.dest] + list(instruction.args):
+                    if isinstance(operand, ir.Temp) and operand.name is not None:
+                        names[str(operand)] = operand
+        for param in function.params:
+            names[str(param)] = param
 
-        match expr.operator.type:
-            case TokenType.GREATER_EQUAL:
-                self.counters['ccuge'] += 1
-                libraries.ccuge(
-                    self, left_register, right_register, self.counters['ccuge'])
-            case TokenType.PIPE:
-                libraries.ccor(self, left_register, right_register)
-            case TokenType.CARET:
-                self.instructions.append(
-                    f"XOR {left_register} {right_register} {left_register}")
-            case TokenType.AMPERSAND:
-                self.instructions.append(
-                    f"AND {left_register} {right_register} {left_register}")
-            case TokenType.LEFT_SHIFT:
-                self.counters['cclls'] += 1
-                libraries.cclls(self, left_register,
-                                right_register, self.counters['cclls'])
-            case TokenType.RIGHT_SHIFT:
-                self.counters['cclrs'] += 1
-                libraries.cclrs(self, left_register,
-                                right_register, self.counters['cclls'])
-            case TokenType.PLUS:
+        def label(register):
+            temp = names.get(register)
+            return register if temp is None else f"{temp.name} ({register})"
+
+        for address in sorted(allocator.slots):
+            held = sorted((register for register, slot in allocator.spill_slots.items()
+                           if slot == address), key=lambda register: int(register[1:]))
+            self.memory_map.place(address, function.name, 'spill', map(label, held))
+        self.memory_map.variables[function.name] = {
+            label(register): (f"[{allocator.spill_slots[register]}]"
+                              if register in allocator.spill_slots
+                              else allocator.assignment.get(register, 'unused'))
+            for register in sorted(names, key=lambda register: int(register[1:]))}
+
+    def plan_routines(self):
+        """Decides which uses of the helper loops call their runtime routine."""
+        sites = []
+        for function in self.functions:
+            depth = {}
+            for loop in loops.find_loops(function):
+                for block in loop.blocks:
+                    depth[block] = depth.get(block, 0) + 1
+            for block in function.blocks:
+                for instruction in block.instructions:
+                    name = self.routine(instruction)
+                    if name is not None:
+                        sites.append((instruction, name, depth.get(block, 0)))
+
+        counts = {}
+        for _, name, _ in sites:
+            counts[name] = counts.get(name, 0) + 1
+        for instruction, name, depth in sites:
+            if runtime.worth_calling(runtime.ROUTINES[name], counts[name], depth, self.level,
+                                     *self.expansion(instruction)):
+                self.calls[instruction] = name
+
+    @staticmethod
+    def routine(instruction):
+        """The runtime routine an instruction could call, if any. Constant
+        multipliers, shift amounts and power of two divisors are
+        strength-reduced instead."""
+        if instruction.op not in runtime.OPERATORS:
+            return None
+        if instruction.op in ('shl', 'shr') and isinstance(instruction.args[1], ir.Const):
+            return None
+        if instruction.op == 'mul' and any(isinstance(arg, ir.Const) for arg in instruction.args):
+            return None
+        if instruction.op in ('div', 'mod') and power_of_two(instruction.args[1]):
+            return None
+        return runtime.OPERATORS[instruction.op][0]
+
+    @staticmethod
+    def expansion(instruction):
+        """
+        The (size, cycles) of a division by a constant for runtime.worth_calling:
+        its unrolled chain takes about an instruction per cycle, and calling
+        the routine instead costs its whole loop. Empty for any other use.
+        """
+        divisor = instruction.args[1] if instruction.op in ('div', 'mod') else None
+        if not isinstance(divisor, ir.Const) or divisor.value == 0:
+            return ()
+        steps = libraries.division_steps(divisor.value)
+        # The dividend's copy, then per step an LDI, CMP, BRH and SUB, and
+        # for a quotient its LDI and an ADI per step.
+        size = 1 + 4 * steps if instruction.op == 'mod' else 2 + 5 * steps
+        return size, runtime.DIVIDE_CYCLES - size
+
+    def save_registers(self, function, lines, allocator, address):
+        """
+        Saves the callee-saved registers the function uses right after its
+        label and restores them before every RET. Returns the next free
+        address.
+        """
+        saved = sorted(set(allocator.assignment.values()) & set(CALLEE_SAVED))
+        self.frames[function]['saves'] = list(range(address, address + len(saved)))
+        for offset, register in enumerate(saved):
+            self.memory_map.place(address + offset, function.name, 'save', [register])
+
+        saves, restores = [], []
+        for offset, register in enumerate(saved):
+            saves += allocator.memory('STR', register, address + offset)
+            restores += allocator.memory('LOD', register, address + offset)
+        for index in reversed(range(len(lines))):
+            if lines[index] == "RET":
+                lines[index:index] = restores
+        lines[1:1] = saves
+        return address + len(saved)
+
+    def next_tag(self, name):
+        self.counters[name] += 1
+        return self.counters[name]
+
+    def select(self, function):
+        self.function = function
+        if function is not self.functions[0]:
+            self.select_entry(function)
+        blocks = function.blocks
+        for index, block in enumerate(blocks):
+            if block is not function.entry:
+                self.instructions.append(f"\n.{block.label}")
+            for instruction in block.instructions:
+                self.select_instruction(instruction)
+            following = blocks[index + 1] if index + 1 < len(blocks) else None
+            self.select_terminator(block.terminator, following)
+
+    def register(self, operand):
+        """Returns a register holding the operand, loading constants first."""
+        if isinstance(operand, ir.Const):
+            temp = self.function.new_temp()
+            self.instructions.append(f"LDI {temp} {operand.value}")
+            return temp
+        return operand
+
+    # Terminators.
+
+    def select_terminator(self, terminator, following):
+        match terminator:
+            case ir.Jump():
+                if terminator.target is not following:
+                    self.instructions.append(f"JMP .{terminator.target.label}")
+            case ir.Branch():
+                self.select_branch(terminator, following)
+            case ir.CompareBranch():
+                self.select_compare_branch(terminator, following)
+            case ir.Return():
+                if self.function is not self.functions[0]:
+                    self.select_return(terminator)
+                elif following is not None or len(self.functions) > 1 or self.calls:
+                    self.instructions.append("JMP .end")
+
+    def select_branch(self, branch, following):
+        condition = branch.condition
+        if isinstance(condition, ir.Const):
+            target = branch.then_block if condition.value else branch.else_block
+            if target is not following:
+                self.instructions.append(f"JMP .{target.label}")
+            return
+
+        self.instructions.append(f"CMP {condition} r0")
+        self.select_jumps('ne', branch, following)
+
+    def select_compare_branch(self, branch, following):
+        """CMP followed by a single BRH on the comparison's own flags."""
+        left, right = branch.left, branch.right
+        if isinstance(left, ir.Const) and isinstance(right, ir.Const):
+            holds = ir.compare(branch.op, left.value, right.value)
+            target = branch.then_block if holds else branch.else_block
+            if target is not following:
+                self.instructions.append(f"JMP .{target.label}")
+            return
+
+        if CONDITIONS[branch.op][1]:
+            left, right = right, left
+        self.instructions.append(
+            f"CMP {self.compare_operand(left)} {self.compare_operand(right)}")
+        self.select_jumps(branch.op, branch, following)
+
+    def compare_operand(self, operand):
+        """Zero needs no register: r0 always reads as 0."""
+        if isinstance(operand, ir.Const) and operand.value == 0:
+            return "r0"
+        return self.register(operand)
+
+    def select_jumps(self, op, branch, following):
+        """The BRH after a CMP, inverted to fall through when it can."""
+        condition = CONDITIONS[op][0]
+        negated = CONDITIONS[ir.NEGATED[op]][0]
+        if branch.else_block is following:
+            self.instructions.append(f"BRH {condition} .{branch.then_block.label}")
+        elif branch.then_block is following:
+            self.instructions.append(f"BRH {negated} .{branch.else_block.label}")
+        else:
+            self.instructions.append(f"BRH {condition} .{branch.then_block.label}")
+            self.instructions.append(f"JMP .{branch.else_block.label}")
+
+    # Functions.
+
+    def select_entry(self, function):
+        """The function's label, then its arguments into their temps."""
+        self.instructions.append(f"\n.{function.name}")
+        for register, param in zip(ARGUMENTS, function.params):
+            self.instructions.append(f"MOV {register} {param}")
+        stacked = function.params[len(ARGUMENTS):]
+        for param, address in zip(stacked, self.frames[function]['arguments']):
+            self.memory('LOD', param, address)
+
+    def select_return(self, terminator):
+        if terminator.value is not None:
+            self.move(terminator.value, RESULT)
+        self.instructions.append("RET")
+
+    def select_call(self, call):
+        """
+        Arguments past the fourth are stored into the callee's frame, the
+        others moved into r1-r4 just before the CAL, so nothing else runs
+        while the argument registers are taken.
+        """
+        callee = call.function
+        stacked = call.args[len(ARGUMENTS):]
+        for argument, address in zip(stacked, self.frames[callee]['arguments']):
+            self.memory('STR', self.register(argument), address)
+        for register, argument in zip(ARGUMENTS, call.args):
+            self.move(argument, register)
+        self.instructions.append(f"CAL .{callee.name}")
+        if call.dest is not None:
+            self.instructions.append(f"MOV {RESULT} {call.dest}")
+
+    def select_routine(self, instruction):
+        """The operands into the routine's registers, CAL, and the result out."""
+        name, swapped = runtime.OPERATORS[instruction.op]
+        routine = runtime.ROUTINES[name]
+        left, right = (instruction.args + [ir.Const(0)])[:2]
+        if swapped:
+            left, right = right, left
+        self.move(left, runtime.LEFT)
+        self.move(right, runtime.RIGHT)
+        self.instructions.append(f"CAL {routine.label}")
+        result = runtime.RESULTS.get(instruction.op, routine.result)
+        self.instructions.append(f"MOV {result} {instruction.dest}")
+
+    def move(self, operand, register):
+        if isinstance(operand, ir.Const):
+            self.instructions.append(f"LDI {register} {operand.value}")
+        else:
+            self.instructions.append(f"MOV {operand} {register}")
+
+    def memory(self, opcode, register, address):
+        """A LOD or STR between a register and a fixed data RAM address."""
+        # Offsets are 4-bit signed, r0 reaches addresses 0 to 7 directly.
+        if address <= 7:
+            self.instructions.append(f"{opcode} r0 {register} {address}")
+        else:
+            base = self.register(ir.Const(address))
+            self.instructions.append(f"{opcode} {base} {register} 0")
+
+    # Instructions.
+
+    def select_instruction(self, instruction):
+        op, dest, args = instruction.op, instruction.dest, instruction.args
+        if instruction in self.calls:
+            self.select_routine(instruction)
+            return
+
+        match op:
+            case 'copy':
+                if isinstance(args[0], ir.Const):
+                    self.instructions.append(f"LDI {dest} {args[0].value}")
+                else:
+                    self.instructions.append(f"MOV {args[0]} {dest}")
+            case 'neg':
                 self.instructions.append(
-                    f"ADD {left_register} {right_register} {left_register}")
-            case TokenType.MINUS:
+                    f"NEG {self.register(args[0])} {dest}")
+            case 'not':
+                libraries.ccueq(self, self.register(args[0]), "r0",
+                                self.next_tag('ccueq'))
+                self.compared(dest)
+            case 'add' | 'sub' | 'and' | 'xor':
+                left, right = self.register(args[0]), self.register(args[1])
                 self.instructions.append(
-                    f"SUB {left_register} {right_register} {left_register}")
-            case TokenType.STAR:
-                self.counters['ccumul'] += 1
-                libraries.ccumul(
-                    self, left_register, right_register, self.counters['ccumul'])
-
-        self.registers.push(right_register)
-        return left_register
+                    f"{op.upper()} {left} {right} {dest}")
+            case 'or':
+                libraries.ccor(self, self.register(args[0]),
+                               self.register(args[1]), dest)
+            case 'shl' | 'shr' | 'mul':
+                self.select_shift_or_multiply(op, dest, *args)
+            case 'div' | 'mod':
+                self.select_division(op, dest, *args)
+            case 'ge' | 'le' | 'gt' | 'lt' | 'eq' | 'ne':
+                self.select_comparison(op, dest, *args)
+            case 'call':
+                self.select_call(instruction)
+            case 'load':
+                self.memory('LOD', dest, args[0].value)
+            case 'store':
+                self.memory('STR', self.register(args[1]), args[0].value)
+
+    def select_comparison(self, op, dest, left, right):
+        left, right = self.register(left), self.register(right)
+        match op:
+            case 'ge':
+                libraries.ccuge(self, left, right, self.next_tag('ccuge'))
+            case 'le':
+                libraries.ccuge(self, right, left, self.next_tag('ccuge'))
+            case 'gt':
+                libraries.ccugt(self, left, right, self.next_tag('ccgt'))
+            case 'lt':
+                libraries.ccugt(self, right, left, self.next_tag('ccgt'))
+            case 'eq':
+                libraries.ccueq(self, left, right, self.next_tag('ccueq'))
+            case 'ne':
+                libraries.ccune(self, left, right, self.next_tag('ccune'))
+        self.compared(dest)
+
+    def compared(self, result_register):
+        """Moves a comparison result out of the flags register."""
+        self.instructions.append(
+            f"MOV {self.registers.flags()} {result_register}")
+
+    def select_shift_or_multiply(self, op, dest, left, right):
+        """The in-place helper routines work on a copy of the left operand.
+        A constant multiplier or shift amount is strength-reduced: expanded
+        inline instead of going through a runtime loop."""
+        # Multiplication commutes, keep a constant factor on the right.
+        if op == 'mul' and isinstance(left, ir.Const) and not isinstance(right, ir.Const):
+            left, right = right, left
+
+        left = self.register(left)
+        self.instructions.append(f"MOV {left} {dest}")
+
+        if isinstance(right, ir.Const):
+            match op:
+                case 'shl':
+                    libraries.cclsk(self, dest, right.value)
+                case 'shr':
+                    libraries.cclrsk(self, dest, right.value)
+                case 'mul':
+                    libraries.ccumulk(self, dest, right.value)
+            return
+
+        match op:
+            case 'shl':
+                libraries.cclls(self, dest, right, self.next_tag('cclls'))
+            case 'shr':
+                libraries.cclrs(self, dest, right, self.next_tag('cclrs'))
+            case 'mul':
+                libraries.ccumul(self, dest, right, self.next_tag('ccumul'))
+
+    def select_division(self, op, dest, left, right):
+        """A constant divisor is strength-reduced: a power of two divides as
+        a shift and takes the remainder as a mask, any other is subtracted
+        by an unrolled chain. A variable one goes through the division loop."""
+        if power_of_two(right):
+            if op == 'div':
+                self.instructions.append(f"MOV {self.register(left)} {dest}")
+                libraries.cclrsk(self, dest, right.value.bit_length() - 1)
+            else:
+                mask = self.register(ir.Const(right.value - 1))
+                self.instructions.append(f"AND {self.register(left)} {mask} {dest}")
+            return
+
+        if isinstance(right, ir.Const) and right.value != 0:
+            remainder = dest if op == 'mod' else self.function.new_temp()
+            self.instructions.append(f"MOV {self.register(left)} {remainder}")
+            libraries.ccudivk(self, remainder, right.value,
+                              dest if op == 'div' else None, self.next_tag('ccudiv'))
+            return
+
+        # The quotient is built over the dividend, so neither can share
+        # dest with the divisor.
+        quotient = self.function.new_temp()
+        self.instructions.append(f"MOV {self.register(left)} {quotient}")
+        libraries.ccudiv(self, quotient, self.register(right), self.next_tag('ccudiv'))
+        if op == 'div':
+            self.instructions.append(f"MOV {quotient} {dest}")
+        else:
+            self.instructions.append(f"MOV {self.registers.temporal()} {dest}")
@@ -0,0 +1,121 @@
+"""
+Value numbering on the IR: every computation that repeats one whose result
+is still at hand becomes a copy of that result.
+
+Each value gets a number, and an instruction is keyed by its operator and
+the numbers of its operands, so 'a + b' and 'b + a' or a copy of 'a' all
+match. The numbering runs over the dominator tree, so a block sees the
+computations of the blocks that dominate it, and is scoped: what a block
+adds is gone once its subtree is done.
+
+IR temps are not in SSA form, variables are assigned many times, so only
+the temps that are stable, written once before any read along every path,
+keep their numbers across blocks. Any other temp is numbered afresh in
+every block and again whenever it is assigned, which invalidates the
+computations it took part in and the ones it held.
+"""
+import itertools
+
+import ir as ir
+
+
+def number_values(function):
+    """Replaces the redundant pure computations of the function with copies."""
+    stable = stable_temps(function)
+    dominators = function.dominators()
+    children = {block: [] for block in dominators}
+    for block, above in dominators.items():
+        if block is not function.entry:
+            # The immediate dominator is the one with the most dominators.
+            parent = max(above - {block}, key=lambda other: len(dominators[other]))
+            children[parent].append(block)
+
+    fresh = itertools.count()
+    numbers = {}  # Stable temp -> its value number.
+    table = {}    # Expression key -> (value number, temp holding it).
+
+    def number(operand, local):
+        if isinstance(operand, ir.Const):
+            return ('const', operand.value)
+        held = numbers if operand in stable else local
+        if operand not in held:
+            held[operand] = next(fresh)
+        return held[operand]
+
+    stack = [function.entry]
+    scopes = []
+    while stack:
+        block = stack.pop()
+        if block is None:
+            for key, previous in reversed(scopes.pop()):
+                if previous is None:
+                    del table[key]
+                else:
+                    table[key] = previous
+            continue
+
+        added = []
+        local = {}
+        for position, instruction in enumerate(block.instructions):
+            dest = instruction.dest
+            if dest is None:
+                continue
+            held = numbers if dest in stable else local
+            if instruction.op == 'copy':
+                held[dest] = number(instruction.args[0], local)
+                continue
+            if instruction.op not in ir.PURE:
+                held[dest] = next(fresh)
+                continue
+
+            key = expression(instruction, [number(arg, local) for arg in instruction.args])
+            value, holder = table.get(key, (None, None))
+            if holder is not None and number(holder, local) == value:
+                block.instructions[position] = ir.Instr('copy', dest, [holder])
+                held[dest] = value
+                continue
+
+            held[dest] = next(fresh)
+            added.append((key, table.get(key)))
+            table[key] = (held[dest], dest)
+
+        scopes.append(added)
+        stack.append(None)
+        stack += reversed(children[block])
+
+
+def expression(instruction, numbers):
+    """The key of a pure instruction, with commutative operands in order."""
+    if instruction.op in ir.COMMUTATIVE:
+        numbers = sorted(numbers, key=repr)
+    return (instruction.op, *numbers)
+
+
+def stable_temps(function):
+    """
+    The temps with a single definition, a parameter counting as one at the
+    entry, that comes before each of their uses along every path. Such a
+    temp holds the same value at every point it can be read from.
+    """
+    dominators = function.dominators()
+    definitions = {param: (function.entry, -1) for param in function.params}
+    for block in dominators:
+        for index, instruction in enumerate(block.instructions):
+            dest = instruction.dest
+            if dest is not None:
+                definitions[dest] = None if dest in definitions else (block, index)
+
+    stable = {temp for temp, site in definitions.items() if site is not None}
+    for block in dominators:
+        uses = [(index, temp) for index, instruction in enumerate(block.instructions)
+                for temp in instruction.uses()]
+        uses += [(len(block.instructions), temp) for temp in block.terminator.uses()]
+        for index, temp in uses:
+            if temp not in stable:
+                continue
+            defined, at = definitions[temp]
+            if defined is block and at >= index:
+                stable.discard(temp)
+            elif defined is not block and defined not in dominators[block]:
+                stable.discard(temp)
+    return stable
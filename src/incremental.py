@@ -0,0 +1,358 @@
+from error import TikkiError, ParseError
+from lexer import RegexScanner
+from parser import Parser
+from semantic import SemanticAnalizer, IncompleteTree
+from symbol_table import SymbolTable
+from token_type import TokenType
+
+
+class Diagnostics(TikkiError):
+    """
+    A TikkiError that collects its reports instead of printing them.
+
+    Attributes:
+        records (list): One dict per report: line, column, message and phase.
+                        Reports about the whole program have no line or
+                        column.
+    """
+
+    def __init__(self, source_code) -> None:
+        super().__init__(source_code)
+        self.records = []
+
+    def report(self, token, message, phase="Syntax"):
+        self.records.append({'line': token.line, 'column': token.column,
+                             'message': message, 'phase': phase})
+
+    def report_program(self, message, phase):
+        self.records.append({'line': None, 'column': None,
+                             'message': message, 'phase': phase})
+
+
+class RecordingSymbolTable(SymbolTable):
+    """A SymbolTable that also logs every definition, in order."""
+
+    def __init__(self):
+        super().__init__()
+        self.log = []
+
+    def define(self, name, symbol, type):
+        self.log.append((name, symbol, type))
+        return super().define(name, symbol, type)
+
+
+class SummaryAnalyzer(SemanticAnalizer):
+    """
+    Runs the semantic checks on one top-level declaration in isolation.
+    Instead of failing on a variable that is used before being initialized,
+    it records the name in needs, so the declaration can later be checked
+    against any set of variables initialized before it.
+    """
+
+    def __init__(self, error, symbol_table):
+        super().__init__(error, symbol_table)
+        self.needs = set()
+
+    def visit_variable(self, node):
+        if node.name.lexeme not in self.variables_initialized:
+            self.needs.add(node.name.lexeme)
+        self.variables_used.add(node.name.lexeme)
+
+
+class Declaration:
+    """
+    One top-level declaration and what it depends on.
+
+    Attributes:
+        node (Stmt): The parsed statement; None if it failed to parse.
+        start (int): Index of its first token.
+        end (int): Index of the token after it. The parser has looked at
+                   that token, so the declaration depends on it too.
+        defines (list): The symbol table definitions made while parsing it.
+        names (set): The identifiers it mentions; only the symbol table
+                     entries for these can change how it parses.
+        literals (list): What it added to the parser's literal pool.
+        summary (SummaryAnalyzer): Its semantic checks, run in isolation;
+                                   None when they cannot be summarised.
+    """
+    __slots__ = ('node', 'start', 'end', 'defines', 'names', 'literals', 'summary')
+
+    def __init__(self, node, start, end, defines, names, literals):
+        self.node = node
+        self.start = start
+        self.end = end
+        self.defines = defines
+        self.names = names
+        self.literals = literals
+        self.summary = None
+
+
+class Document:
+    """
+    A source file kept parsed across edits, for editor integration.
+
+    After an edit only the tokens around it are scanned again: scanning
+    restarts at the last token before the edit and stops as soon as it
+    produces a token that starts at the same place, and in the same column,
+    as an old token past the edit. From there the old tokens are reused with
+    their line numbers shifted.
+
+    Top-level declarations whose tokens, lookahead included, all come before
+    the first changed token are reused as they are. Parsing resumes after
+    them and stops as soon as it lands on the start of an old declaration
+    past the changed tokens, provided none of the declarations from there on
+    mentions a name whose symbol the parsed declarations changed; those
+    declarations are all reused.
+
+    Semantic checks are summarised per declaration, so only the declarations
+    parsed again are checked again. The tokens, statements, symbol table,
+    literal pool, semantic sets and diagnostics are always the same as a
+    full parse of the new text would give. Whenever that cannot be
+    guaranteed cheaply (the previous text had scanning or parse errors, or
+    the rescanned region has scanning errors) the document is parsed in full.
+
+    Attributes:
+        source (str): The current text.
+        tokens (list), starts (list): The tokens and their source offsets.
+        declarations (list): The Declaration of every top-level statement.
+        statements (list): The parsed statements, as Parser.parse returns them.
+        symbol_table (SymbolTable): The parser's symbol table.
+        literal_pool (list): The parser's literal pool.
+        analyzer (SemanticAnalizer): Holds the semantic sets.
+        error (Diagnostics): The diagnostics of the current text.
+        reused (dict): What the last update reused: tokens and declarations.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.reused = {'tokens': 0, 'declarations': 0}
+        self.parse_all()
+
+    # Full parse.
+
+    def parse_all(self):
+        self.error = Diagnostics(self.source)
+        scanner = RegexScanner(self.source, self.error)
+        scanner.starts = []
+        self.tokens = list(scanner.iter_tokens())
+        self.starts = scanner.starts
+        self.parse(0, [], None)
+
+    # Incremental update.
+
+    def edit(self, start, end, text):
+        """
+        Replaces source[start:end] with text and brings everything up to date.
+        """
+        source = self.source[:start] + text + self.source[end:]
+        clean = not self.error.records[:self.parse_diagnostics]
+        self.source = source
+        if not clean:
+            self.reused = {'tokens': 0, 'declarations': 0}
+            return self.parse_all()
+
+        delta = len(text) - (end - start)
+        error = Diagnostics(source)
+        first, resume, tokens, starts = self.rescan(start, end, delta, error)
+        if error.records:
+            # Scanning errors are reported while parsing; keep their order.
+            self.reused = {'tokens': 0, 'declarations': 0}
+            return self.parse_all()
+
+        self.error = error
+        shift = len(tokens) - (resume - first)
+        self.tokens = self.tokens[:first] + tokens + self.tokens[resume:]
+        self.starts = self.starts[:first] + starts + \
+            [offset + delta for offset in self.starts[resume:]]
+        self.reused = {'tokens': len(self.tokens) - len(tokens)}
+
+        keep = 0
+        while (keep < len(self.declarations)
+               and self.declarations[keep].end < first):
+            keep += 1
+        self.parse(keep, self.declarations, (resume, shift))
+
+    def rescan(self, start, end, delta, error):
+        """
+        Scans the edited region of the new source.
+
+        Returns:
+            tuple: (first, resume, tokens, starts): the old tokens in
+                   [first, resume) are replaced by the new tokens and their
+                   starts.
+        """
+        old_tokens, old_starts = self.tokens, self.starts
+        scanner = RegexScanner(self.source, error)
+        scanner.starts = []
+
+        # The last token starting before the edit is the first one it can
+        # change, as it may grow into the edited text. Everything before it
+        # was scanned without looking past its start.
+        first = 0
+        if old_starts[0] < start:
+            while old_starts[first + 1] < start:
+                first += 1
+            scanner.current = old_starts[first]
+            scanner.line = old_tokens[first].line
+            scanner.column = old_tokens[first].column
+
+        tokens = []
+        resume = first
+        for token in scanner.iter_tokens():
+            new_start = scanner.starts[len(tokens)]
+            if new_start - delta >= end:
+                while resume < len(old_tokens) and old_starts[resume] + delta < new_start:
+                    resume += 1
+                if resume < len(old_tokens) and self.same(resume, token, new_start, delta):
+                    line_shift = token.line - old_tokens[resume].line
+                    for old in old_tokens[resume:]:
+                        old.line += line_shift
+                    return first, resume, tokens, scanner.starts[:len(tokens)]
+            tokens.append(token)
+        return first, len(old_tokens), tokens, scanner.starts
+
+    def same(self, index, token, start, delta):
+        old = self.tokens[index]
+        return (self.starts[index] + delta == start and old.column == token.column
+                and old.type == token.type and old.lexeme == token.lexeme)
+
+    # Parsing and checking.
+
+    def parse(self, keep, old, resync):
+        """
+        Parses the declarations after the first keep ones of old.
+
+        Args:
+            keep (int): How many leading declarations of old are reused.
+            old (list): The previous declarations.
+            resync (tuple): (resume, shift): old tokens from resume on were
+                            reused, at shift positions from their old index.
+                            None when nothing past the edit can be reused.
+        """
+        symbol_table = RecordingSymbolTable()
+        literal_pool = []
+        declarations = old[:keep]
+        for declaration in declarations:
+            for define in declaration.defines:
+                symbol_table.define(*define)
+            literal_pool += declaration.literals
+
+        parser = Parser(self.tokens, self.error, symbol_table)
+        parser.literal_pool = literal_pool
+        parser.current = declarations[-1].end if declarations else 0
+
+        # The old declarations after the edit, by their start in new positions.
+        candidates = {}
+        replaced = []
+        if resync is not None:
+            resume, shift = resync
+            for index in range(keep, len(old)):
+                if old[index].start >= resume:
+                    candidates[old[index].start + shift] = index
+        replaced_from = keep
+        prefix_log = len(symbol_table.log)
+        reused = keep
+
+        statements = None
+        analyzer = SemanticAnalizer(self.error, symbol_table)
+        try:
+            while not parser.is_at_end():
+                index = candidates.get(parser.current)
+                if (index is not None and not self.error.records
+                        and self.unaffected(old[replaced_from:index], replaced, old[index:],
+                                            symbol_table.log[:prefix_log])):
+                    _, shift = resync
+                    for declaration in old[index:]:
+                        declaration.start += shift
+                        declaration.end += shift
+                        for define in declaration.defines:
+                            symbol_table.define(*define)
+                        literal_pool += declaration.literals
+                        declarations.append(declaration)
+                    reused += len(old) - index
+                    break
+
+                start = parser.current
+                logged = len(symbol_table.log)
+                pooled = len(literal_pool)
+                node = parser.declaration()
+                defines = symbol_table.log[logged:]
+                replaced += defines
+                names = {token.lexeme for token in self.tokens[start:parser.current]
+                         if token.type == TokenType.IDENTIFIER}
+                declarations.append(Declaration(node, start, parser.current, defines,
+                                                names, literal_pool[pooled:]))
+            statements = [declaration.node for declaration in declarations]
+        except ParseError:
+            # Parser.parse gives up on an error that escapes a declaration.
+            statements = None
+
+        self.declarations = declarations
+        self.statements = statements
+        self.symbol_table = symbol_table
+        self.literal_pool = literal_pool
+        self.parse_diagnostics = len(self.error.records)
+        self.reused['declarations'] = reused
+        self.analyzer = analyzer
+        if statements is not None:
+            self.check()
+
+    @staticmethod
+    def unaffected(replaced, defines, following, prefix):
+        """
+        Whether the following declarations parse the same after the replaced
+        declarations, which made their own definitions, were parsed again
+        into the given defines. The parser only asks the symbol table what
+        kind of symbol a name is, if any, so only names that end up as a
+        different kind can matter.
+
+        Args:
+            replaced (list): The old declarations that were parsed again.
+            defines (list): The definitions made parsing them again.
+            following (list): The old declarations to reuse.
+            prefix (list): The definitions made before the replaced ones.
+        """
+        old = [define for declaration in replaced for define in declaration.defines]
+        if old == defines:
+            return True
+        names = {name for name, _, _ in old} | {name for name, _, _ in defines}
+        kinds = {}
+        for name, kind, _ in prefix:
+            if name in names:
+                kinds[name] = kind
+        old_kinds, new_kinds = dict(kinds), dict(kinds)
+        old_kinds.update((name, kind) for name, kind, _ in old)
+        new_kinds.update((name, kind) for name, kind, _ in defines)
+        changed = {name for name in names
+                   if old_kinds.get(name) != new_kinds.get(name)}
+        return not any(changed & declaration.names for declaration in following)
+
+    def check(self):
+        """
+        Combines the per-declaration semantic summaries. A declaration that
+        would fail, or that cannot be summarised, is checked for real against
+        the state so far, exactly where a full analysis would stop.
+        """
+        analyzer = self.analyzer
+        for declaration in self.declarations:
+            summary = declaration.summary
+            if summary is None and declaration.node is not None:
+                summary = SummaryAnalyzer(Diagnostics(""), self.symbol_table)
+                try:
+                    summary.visit(declaration.node)
+                    declaration.summary = summary
+                except (ParseError, IncompleteTree):
+                    summary = None
+
+            if summary is None or not summary.needs <= analyzer.variables_initialized:
+                try:
+                    analyzer.visit(declaration.node)
+                except (ParseError, IncompleteTree):
+                    return
+                continue
+
+            analyzer.variables_defined |= summary.variables_defined
+            analyzer.variables_initialized |= summary.variables_initialized
+            analyzer.variables_used |= summary.variables_used
+            analyzer.constants_defined |= summary.constants_defined
+            analyzer.constants_used |= summary.constants_used
@@ -0,0 +1,191 @@
+import ir as ir
+
+
+# What a call costs besides moving its arguments: CAL, RET and moving the
+# result back, in IR instructions.
+CALL_COST = 3
+# How many IR instructions inlining a function at all its call sites may
+# add to the program, after the calls it saves.
+INLINE_GROWTH = 16
+# How many IR instructions inlining may add to the whole program.
+INLINE_BUDGET = 64
+# The BatPU-2 has 1024 words of ROM. An IR instruction selects into about
+# two of them and the runtime routines and frames take their share, so
+# nothing is inlined at several sites once the program would reach a
+# quarter of ROM in IR instructions.
+ROM_SIZE = 1024
+PROGRAM_LIMIT = ROM_SIZE // 4
+
+
+def size(function):
+    """The IR instructions of a function, terminators included."""
+    return sum(len(block.instructions) + 1 for block in function.reverse_postorder())
+
+
+def callees(function):
+    """The functions the function calls, each once."""
+    called = []
+    for block in function.blocks:
+        for instruction in block.instructions:
+            if isinstance(instruction, ir.Call) and instruction.function not in called:
+                called.append(instruction.function)
+    return called
+
+
+class Inliner:
+    """
+    Replaces calls with a copy of the callee's body, as an IR pass.
+
+    Functions are inlined bottom-up: before a function is looked at, the
+    functions it calls are done, so a callee is weighed at the size it has
+    after its own inlining. A function is inlined when it has a single call
+    site, as the copy replaces the out-of-line body, or when inlining it
+    everywhere grows the program by at most INLINE_GROWTH instructions once
+    the call sequences it removes are paid back, which covers small
+    functions. All that growth together stays within INLINE_BUDGET, and
+    stops once the program nears PROGRAM_LIMIT. At -Os, a function with
+    several call sites is only inlined if that doesn't grow the program.
+    Besides the call itself, an inlined body saves the callee-saved
+    registers the function would have to preserve, and lets the later
+    passes optimise it together with its caller.
+
+    The callee's temps are renamed into the caller, its parameters become
+    copies of the arguments, and each return copies its value to the call's
+    destination and jumps to a block holding the rest of the caller's block.
+    The calls copied along were already weighed inside the callee and are
+    left as they are. A function left without call sites is retired: its
+    own calls no longer count, and it is skipped.
+
+    Attributes:
+        level (str): The optimisation level, a key of runtime.LEVELS.
+        inlined (int): How many calls were inlined.
+        retired (set): The functions that lost all their call sites.
+        done (set): The functions whose calls were already considered.
+        approved (set): The functions with several call sites chosen to be
+                        inlined at all of them.
+        growth (int): The IR instructions inlining has added so far.
+        program (int): The IR instructions of the program, once known.
+    """
+
+    def __init__(self, level='O2'):
+        self.level = level
+        self.inlined = 0
+        self.retired = set()
+        self.done = set()
+        self.approved = set()
+        self.growth = 0
+        self.program = None
+
+    def __call__(self, function):
+        if function in self.retired or function in self.done:
+            return
+        if self.program is None:
+            # The top-level code comes first and reaches every live function.
+            reachable = [function]
+            for caller in reachable:
+                reachable += [callee for callee in callees(caller) if callee not in reachable]
+            self.program = sum(size(live) for live in reachable)
+        self.done.add(function)
+        for callee in callees(function):
+            self(callee)
+
+        index = 0
+        while index < len(function.blocks):
+            block = function.blocks[index]
+            for position, instruction in enumerate(block.instructions):
+                if isinstance(instruction, ir.Call) and self.worth_inlining(instruction.function):
+                    continuation = self.inline(function, block, position)
+                    index = function.blocks.index(continuation) - 1
+                    break
+            index += 1
+
+    def worth_inlining(self, callee):
+        if callee.call_sites == 1 or callee in self.approved:
+            return True
+        body = size(callee)
+        saved = (CALL_COST + len(callee.params)) * callee.call_sites
+        growth = body * (callee.call_sites - 1) - saved
+        if self.level == 'Os' and growth > 0:
+            return False
+        if growth > INLINE_GROWTH or self.growth + growth > INLINE_BUDGET:
+            return False
+        if growth > 0 and self.program + growth > PROGRAM_LIMIT:
+            return False
+        self.growth += growth
+        self.program += growth
+        self.approved.add(callee)
+        return True
+
+    def inline(self, function, block, position):
+        """Inlines the call at the position in the block, returning the
+        block that continues after it."""
+        call = block.instructions[position]
+        callee = call.function
+        self.inlined += 1
+        suffix = f"_i{self.inlined}"
+
+        temps = {}
+
+        def rename(operand):
+            if not isinstance(operand, ir.Temp):
+                return operand
+            if operand not in temps:
+                temps[operand] = function.new_temp(operand.type, operand.name)
+            return temps[operand]
+
+        continuation = ir.BasicBlock(f"after_{callee.name}{suffix}")
+        continuation.instructions = block.instructions[position + 1:]
+        continuation.terminator = block.terminator
+
+        block.instructions = block.instructions[:position]
+        for param, argument in zip(callee.params, call.args):
+            block.instructions.append(ir.Instr('copy', rename(param), [argument]))
+
+        clones = {original: ir.BasicBlock(f"{callee.name}_{original.label}{suffix}")
+                  for original in callee.reverse_postorder()}
+        for original, clone in clones.items():
+            for instruction in original.instructions:
+                copy = instruction.copy()
+                copy.dest = rename(copy.dest)
+                copy.args = [rename(arg) for arg in copy.args]
+                if isinstance(copy, ir.Call):
+                    copy.function.call_sites += 1
+                clone.instructions.append(copy)
+            clone.terminator = self.clone_terminator(
+                original.terminator, clones, rename, call.dest, continuation, clone)
+        block.terminator = ir.Jump(clones[callee.entry])
+
+        at = function.blocks.index(block) + 1
+        function.blocks[at:at] = list(clones.values()) + [continuation]
+
+        callee.call_sites -= 1
+        if callee.call_sites == 0:
+            self.retire(callee)
+        return continuation
+
+    @staticmethod
+    def clone_terminator(terminator, clones, rename, dest, continuation, clone):
+        match terminator:
+            case ir.Jump():
+                return ir.Jump(clones[terminator.target])
+            case ir.Branch():
+                return ir.Branch(rename(terminator.condition),
+                                 clones[terminator.then_block], clones[terminator.else_block])
+            case ir.CompareBranch():
+                return ir.CompareBranch(terminator.op, rename(terminator.left),
+                                        rename(terminator.right),
+                                        clones[terminator.then_block], clones[terminator.else_block])
+            case ir.Return():
+                if dest is not None and terminator.value is not None:
+                    clone.instructions.append(
+                        ir.Instr('copy', dest, [rename(terminator.value)]))
+                return ir.Jump(continuation)
+
+    def retire(self, function):
+        self.retired.add(function)
+        for block in function.blocks:
+            for instruction in block.instructions:
+                if isinstance(instruction, ir.Call):
+                    instruction.function.call_sites -= 1
+                    if instruction.function.call_sites == 0:
+                        self.retire(instruction.function)
@@ -0,0 +1,307 @@
+"""
+Three-address intermediate representation.
+
+A Program holds Functions, a Function holds BasicBlocks, and every block is
+a straight run of Instr ending in exactly one terminator (Jump, Branch,
+CompareBranch or Return). Values are Temps (virtual registers, which also hold variables)
+or Consts, and both carry a type. A Call is an Instr naming the Function it
+calls; load and store move the globals shared with functions in and out of
+data RAM.
+"""
+
+U8 = "u8"
+BOOL = "bool"
+
+
+class Temp:
+    """A virtual register. Named temps hold source-level variables."""
+    __slots__ = ('id', 'type', 'name')
+
+    def __init__(self, id, type=U8, name=None):
+        self.id = id
+        self.type = type
+        self.name = name
+
+    def __str__(self):
+        return f"v{self.id}"
+
+    def __repr__(self):
+        return f"v{self.id}" if self.name is None else f"v{self.id}({self.name})"
+
+
+class Const:
+    """An immediate operand."""
+    __slots__ = ('value', 'type')
+
+    def __init__(self, value, type=U8):
+        self.value = value
+        self.type = type
+
+    def __eq__(self, other):
+        return isinstance(other, Const) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __str__(self):
+        return str(self.value)
+
+    __repr__ = __str__
+
+
+# Operators producing a value from their arguments.
+UNARY = {'copy', 'neg', 'not'}
+BINARY = {'add', 'sub', 'and', 'or', 'xor', 'shl', 'shr', 'mul', 'div', 'mod'}
+COMPARE = {'eq', 'ne', 'lt', 'le', 'gt', 'ge'}
+COMMUTATIVE = {'add', 'and', 'or', 'xor', 'mul', 'eq', 'ne'}
+# dest = load address; store address, value. The address is always a Const.
+MEMORY = {'load', 'store'}
+# Operators without side effects, that only depend on their arguments.
+PURE = UNARY | BINARY | COMPARE
+
+# Comparison -> the comparison that holds exactly when it does not.
+NEGATED = {'eq': 'ne', 'ne': 'eq', 'lt': 'ge', 'ge': 'lt', 'gt': 'le', 'le': 'gt'}
+
+
+def compare(op, left, right):
+    """Evaluates a comparison of two unsigned bytes."""
+    match op:
+        case 'eq':
+            return left == right
+        case 'ne':
+            return left != right
+        case 'lt':
+            return left < right
+        case 'le':
+            return left <= right
+        case 'gt':
+            return left > right
+        case 'ge':
+            return left >= right
+
+
+class Instr:
+    """dest = op args..."""
+    __slots__ = ('op', 'dest', 'args')
+
+    def __init__(self, op, dest, args):
+        self.op = op
+        self.dest = dest
+        self.args = args
+
+    def uses(self):
+        return [arg for arg in self.args if isinstance(arg, Temp)]
+
+    def copy(self):
+        return Instr(self.op, self.dest, list(self.args))
+
+    def __repr__(self):
+        args = ', '.join(repr(arg) for arg in self.args)
+        if self.dest is None:
+            return f"{self.op} {args}"
+        return f"{self.dest!r} = {self.op} {args}"
+
+
+class Call(Instr):
+    """dest = call function(args...); dest is None when the result is unused."""
+    __slots__ = ('function',)
+
+    def __init__(self, dest, function, args):
+        super().__init__('call', dest, args)
+        self.function = function
+
+    def copy(self):
+        return Call(self.dest, self.function, list(self.args))
+
+    def __repr__(self):
+        args = ', '.join(repr(arg) for arg in self.args)
+        call = f"call {self.function.name}({args})"
+        return call if self.dest is None else f"{self.dest!r} = {call}"
+
+
+class Jump:
+    __slots__ = ('target',)
+
+    def __init__(self, target):
+        self.target = target
+
+    def successors(self):
+        return [self.target]
+
+    def uses(self):
+        return []
+
+    def __repr__(self):
+        return f"jump {self.target.label}"
+
+
+class Branch:
+    """Goes to then_block when the condition is non-zero, else to else_block."""
+    __slots__ = ('condition', 'then_block', 'else_block')
+
+    def __init__(self, condition, then_block, else_block):
+        self.condition = condition
+        self.then_block = then_block
+        self.else_block = else_block
+
+    def successors(self):
+        return [self.then_block, self.else_block]
+
+    def uses(self):
+        return [self.condition] if isinstance(self.condition, Temp) else []
+
+    def __repr__(self):
+        return (f"branch {self.condition!r} ? {self.then_block.label}"
+                f" : {self.else_block.label}")
+
+
+class CompareBranch:
+    """
+    Goes to then_block when 'left op right' holds, else to else_block. It
+    branches on the comparison itself, so no boolean is ever materialised.
+    """
+    __slots__ = ('op', 'left', 'right', 'then_block', 'else_block')
+
+    def __init__(self, op, left, right, then_block, else_block):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.then_block = then_block
+        self.else_block = else_block
+
+    def successors(self):
+        return [self.then_block, self.else_block]
+
+    def uses(self):
+        return [arg for arg in (self.left, self.right) if isinstance(arg, Temp)]
+
+    def __repr__(self):
+        return (f"branch {self.left!r} {self.op} {self.right!r} ? {self.then_block.label}"
+                f" : {self.else_block.label}")
+
+
+class Return:
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def successors(self):
+        return []
+
+    def uses(self):
+        return [self.value] if isinstance(self.value, Temp) else []
+
+    def __repr__(self):
+        return "return" if self.value is None else f"return {self.value!r}"
+
+
+class BasicBlock:
+    __slots__ = ('label', 'instructions', 'terminator')
+
+    def __init__(self, label):
+        self.label = label
+        self.instructions = []
+        self.terminator = None
+
+    def successors(self):
+        return self.terminator.successors() if self.terminator else []
+
+    def __repr__(self):
+        lines = [f"{self.label}:"]
+        lines += [f"    {instruction!r}" for instruction in self.instructions]
+        lines.append(f"    {self.terminator!r}")
+        return '\n'.join(lines)
+
+
+class Function:
+    """
+    A control-flow graph of basic blocks. blocks[0] is the entry block and
+    the list order is the layout used when emitting code. call_sites counts
+    the Calls to the function; the lowering and the inliner keep it current.
+    """
+
+    def __init__(self, name, params=()):
+        self.name = name
+        self.params = list(params)
+        self.blocks = []
+        self.temp_count = 0
+        self.call_sites = 0
+
+    def new_temp(self, type=U8, name=None):
+        temp = Temp(self.temp_count, type, name)
+        self.temp_count += 1
+        return temp
+
+    def new_block(self, label):
+        block = BasicBlock(label)
+        self.blocks.append(block)
+        return block
+
+    @property
+    def entry(self):
+        return self.blocks[0]
+
+    def predecessors(self):
+        """Maps every block to the list of blocks that can jump to it."""
+        predecessors = {block: [] for block in self.blocks}
+        for block in self.blocks:
+            for successor in block.successors():
+                predecessors[successor].append(block)
+        return predecessors
+
+    def reverse_postorder(self):
+        """The reachable blocks, each one before its successors except along back edges."""
+        order = []
+        seen = set()
+        stack = [(self.entry, iter(self.entry.successors()))]
+        seen.add(self.entry)
+        while stack:
+            block, successors = stack[-1]
+            for successor in successors:
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append((successor, iter(successor.successors())))
+                    break
+            else:
+                stack.pop()
+                order.append(block)
+        order.reverse()
+        return order
+
+    def dominators(self):
+        """Maps every reachable block to the set of blocks that dominate it."""
+        order = self.reverse_postorder()
+        predecessors = self.predecessors()
+        dominators = {block: set(order) for block in order}
+        dominators[self.entry] = {self.entry}
+        changed = True
+        while changed:
+            changed = False
+            for block in order[1:]:
+                incoming = [dominators[predecessor] for predecessor in predecessors[block]
+                            if predecessor in dominators]
+                new = set.intersection(*incoming) | {block}
+                if new != dominators[block]:
+                    dominators[block] = new
+                    changed = True
+        return dominators
+
+    def __repr__(self):
+        params = ', '.join(repr(param) for param in self.params)
+        body = '\n'.join(repr(block) for block in self.blocks)
+        return f"fn {self.name}({params}):\n{body}"
+
+
+class Program:
+    """
+    functions[0] is the top-level code, the rest are its functions.
+    globals holds the symbols of the shared globals, indexed by address.
+    """
+
+    def __init__(self):
+        self.functions = []
+        self.globals = []
+
+    def __repr__(self):
+        return '\n\n'.join(repr(function) for function in self.functions)
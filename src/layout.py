@@ -0,0 +1,102 @@
+"""
+The static layout of data RAM, and the memory map that reports it.
+
+The globals that functions share come first, then the arguments passed past
+the fourth, then the frames of the functions: their spill slots and saved
+registers. Functions can't recurse, so a frame only holds anything while its
+function runs, and two functions that are never active at once share their
+addresses: every frame starts right after the deepest of its callers'
+frames. Within a frame, spilled values that are never live together share a
+slot, see RegisterAllocator.spill.
+
+Every value is a single u8 byte, so each address holds exactly one of them.
+"""
+from error import DataMemoryError
+
+# The BatPU-2 maps its I/O ports, the pixel display, character display and
+# number display among them, onto addresses 240 to 255, which leaves the
+# addresses below for data.
+DATA_SIZE = 240
+
+
+def call_order(functions):
+    """
+    The functions with every caller before the functions it calls, so a
+    frame can be placed after all of its callers'. The call graph has no
+    cycles, the top-level code has no callers and stays first.
+
+    Args:
+        functions (dict): ir.Function -> the functions it calls.
+    """
+    callers = {function: 0 for function in functions}
+    for callees in functions.values():
+        for callee in callees:
+            callers[callee] += 1
+
+    order = [function for function, count in callers.items() if count == 0]
+    for function in order:
+        for callee in functions[function]:
+            callers[callee] -= 1
+            if callers[callee] == 0:
+                order.append(callee)
+    return order
+
+
+class MemoryMap:
+    """
+    What every data RAM address holds, address by address. An address in
+    overlaid frames has an entry for each function using it.
+
+    Attributes:
+        size (int): The bytes of data RAM below the I/O ports.
+        entries (list): (address, owner, kind, contents) tuples, where owner
+                        is the function name or None for shared globals,
+                        kind one of 'global', 'argument', 'spill' or 'save',
+                        and contents the names of what it holds.
+        variables (dict): Function name -> {variable: where it lives}, a
+                          register or a data RAM address.
+    """
+
+    def __init__(self, size=DATA_SIZE):
+        self.size = size
+        self.entries = []
+        self.variables = {}
+
+    def place(self, address, owner, kind, contents):
+        self.entries.append((address, owner, kind, tuple(contents)))
+
+    @property
+    def used(self):
+        """The bytes from address 0 to the highest one taken."""
+        return max((entry[0] + 1 for entry in self.entries), default=0)
+
+    def fits(self):
+        return self.used <= self.size
+
+    def check(self, reporter):
+        """Reports a program whose data doesn't fit, raising DataMemoryError."""
+        if not self.fits():
+            raise DataMemoryError(self.used, self.size, reporter)
+
+    def report(self):
+        """A human-readable table, one line per address and owner, then the
+        storage of every named variable of each function."""
+        lines = [f"Data RAM: {self.used} of {self.size} bytes used"]
+        if not self.fits():
+            lines[0] += f", {self.used - self.size} too many"
+        lines.append(f"{'address':>7}  {'owner':<12}{'kind':<10}holds")
+        for address, owner, kind, contents in sorted(
+                self.entries, key=lambda entry: entry[0]):
+            lines.append(f"{address:>7}  {owner or '-':<12}{kind:<10}"
+                         + ', '.join(contents))
+
+        for owner, variables in self.variables.items():
+            if variables:
+                lines.append(f"\n{owner}:")
+                lines += [f"  {name:<16}{place}" for name, place in variables.items()]
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """Saves the report as text."""
+        with open(path, 'w') as file:
+            file.write(self.report() + '\n')
@@ -1,7 +1,81 @@
+import re
+
 from token_type import TokenType
 from tokens import Token
 
 
+# Master pattern used by RegexScanner. Alternatives are tried in order, so
+# two-character operators must come before their one-character prefixes.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<newline>\n)
+  | (?P<space>[ \r\v\f\t]+)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*(?:[^*]|\*(?!/))*(?:\*/)?)
+  | (?P<string>"[^"]*"?)
+  | (?P<number>[0-9]+)
+  | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<double>!=|==|<=|<<|>=|>>)
+  | (?P<single>[(){}\[\],.\-%+&^|;*!=<>/])
+  | (?P<unexpected>.)
+""", re.VERBOSE | re.DOTALL)
+
+SINGLE_TOKENS = {
+    '(': TokenType.LEFT_PAREN,
+    ')': TokenType.RIGHT_PAREN,
+    '{': TokenType.LEFT_BRACE,
+    '}': TokenType.RIGHT_BRACE,
+    '[': TokenType.LEFT_BRACKET,
+    ']': TokenType.RIGHT_BRACKET,
+    ',': TokenType.COMMA,
+    '.': TokenType.DOT,
+    '-': TokenType.MINUS,
+    '%': TokenType.MODULO,
+    '+': TokenType.PLUS,
+    '&': TokenType.AMPERSAND,
+    '^': TokenType.CARET,
+    '|': TokenType.PIPE,
+    ';': TokenType.SEMICOLON,
+    '*': TokenType.STAR,
+    '!': TokenType.BANG,
+    '=': TokenType.EQUAL,
+    '<': TokenType.LESS,
+    '>': TokenType.GREATER,
+    '/': TokenType.SLASH,
+}
+
+DOUBLE_TOKENS = {
+    '!=': TokenType.BANG_EQUAL,
+    '==': TokenType.EQUAL_EQUAL,
+    '<=': TokenType.LESS_EQUAL,
+    '<<': TokenType.LEFT_SHIFT,
+    '>=': TokenType.GREATER_EQUAL,
+    '>>': TokenType.RIGHT_SHIFT,
+}
+
+KEYWORDS = {
+    "and": TokenType.AND,
+    "break": TokenType.BREAK,
+    "const": TokenType.CONST,
+    "continue": TokenType.CONTINUE,
+    "class": TokenType.CLASS,
+    "else": TokenType.ELSE,
+    "false": TokenType.FALSE,
+    "fn": TokenType.FN,
+    "for": TokenType.FOR,
+    "if": TokenType.IF,
+    "in": TokenType.IN,
+    "not": TokenType.NOT,
+    "null": TokenType.NULL,
+    "or": TokenType.OR,
+    "return": TokenType.RETURN,
+    "self": TokenType.SELF,
+    "super": TokenType.SUPER,
+    "true": TokenType.TRUE,
+    "let": TokenType.LET,
+    "while": TokenType.WHILE,
+}
+
+
 class Scanner:
     """Docstring for Scanner"""
 
@@ -14,28 +88,7 @@ class Scanner:
         self.line = 1
         self.column = 1  # Track the current column in the line
         self.start_column = 0  # Track where the current token started
-        self.keywords = {
-            "and": TokenType.AND,
-            "break": TokenType.BREAK,
-            "const": TokenType.CONST,
-            "continue": TokenType.CONTINUE,
-            "class": TokenType.CLASS,
-            "else": TokenType.ELSE,
-            "false": TokenType.FALSE,
-            "fn": TokenType.FN,
-            "for": TokenType.FOR,
-            "if": TokenType.IF,
-            "in": TokenType.IN,
-            "not": TokenType.NOT,
-            "null": TokenType.NULL,
-            "or": TokenType.OR,
-            "return": TokenType.RETURN,
-            "self": TokenType.SELF,
-            "super": TokenType.SUPER,
-            "true": TokenType.TRUE,
-            "let": TokenType.LET,
-            "while": TokenType.WHILE
-        }
+        self.keywords = KEYWORDS
 
     def scan_tokens(self):
         while not self.is_at_end():
@@ -219,3 +272,101 @@ class Scanner:
         text = self.source[self.start:self.current]
         self.tokens.append(
             Token(type, text, literal, self.line, self.start_column))
+
+
+class RegexScanner(Scanner):
+    """Scanner that consumes whole lexemes with a single compiled master regex.
+
+    It produces the same tokens, positions and error reports as Scanner,
+    including its column bookkeeping: characters consumed through match()
+    (the second character of a two-character operator and the opening of a
+    comment) do not advance the column, and newlines inside strings and
+    block comments bump the line without resetting the column.
+
+    Scanning resumes from the current, line and column attributes, so it can
+    start at any token boundary. If starts is a list, the source offset of
+    every token yielded is appended to it.
+    """
+    starts = None
+
+    def scan_tokens(self):
+        self.tokens.extend(self.iter_tokens())
+        return self.tokens
+
+    def iter_tokens(self):
+        """Yields tokens one at a time as they are scanned, ending with EOF."""
+        source = self.source
+        keywords = self.keywords
+        report = self.error.report
+        match = TOKEN_PATTERN.match
+        length = len(source)
+        starts = self.starts
+        line = self.line
+        column = self.column
+        position = self.current
+
+        while position < length:
+            start = position
+            found = match(source, position)
+            kind = found.lastgroup
+            lexeme = found.group()
+            position = found.end()
+
+            if kind == "space":
+                column += len(lexeme)
+            elif kind == "newline":
+                line += 1
+                column = 1
+            elif kind == "identifier":
+                if starts is not None:
+                    starts.append(start)
+                yield Token(keywords.get(lexeme, TokenType.IDENTIFIER),
+                            lexeme, None, line, column)
+                column += len(lexeme)
+            elif kind == "number":
+                if starts is not None:
+                    starts.append(start)
+                yield Token(TokenType.NUMBER, lexeme, lexeme, line, column)
+                column += len(lexeme)
+            elif kind == "single":
+                if starts is not None:
+                    starts.append(start)
+                yield Token(SINGLE_TOKENS[lexeme], lexeme, None, line, column)
+                column += 1
+            elif kind == "double":
+                if starts is not None:
+                    starts.append(start)
+                yield Token(DOUBLE_TOKENS[lexeme], lexeme, None, line, column)
+                column += 1
+            elif kind == "line_comment":
+                column += len(lexeme) - 1
+            elif kind == "block_comment":
+                initial_line = line
+                line += lexeme.count('\n')
+                if len(lexeme) < 4 or not lexeme.endswith("*/"):
+                    report(Token(TokenType.NULL, None, None, initial_line,
+                                 column), "Unterminated block comment.")
+                column += len(lexeme) - 1
+            elif kind == "string":
+                initial_line = line
+                line += lexeme.count('\n')
+                if len(lexeme) < 2 or not lexeme.endswith('"'):
+                    report(Token(TokenType.NULL, None, None, initial_line,
+                                 column), "Unterminated string.")
+                else:
+                    if starts is not None:
+                        starts.append(start)
+                    yield Token(TokenType.STRING, lexeme, lexeme[1:-1],
+                                line, column)
+                column += len(lexeme)
+            else:
+                report(Token(TokenType.NULL, lexeme, None, line, column),
+                       f"Unexpected character: '{lexeme}'.")
+                column += 1
+
+        self.line = line
+        self.column = column
+        self.start = self.current = position
+        if starts is not None:
+            starts.append(position)
+        yield Token(TokenType.EOF, "", None, line, column)
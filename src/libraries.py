@@ -37,36 +37,149 @@ def cclrs(self, left_register, right_register, tag):
     self.instructions.append(f"{rsh_end_tag}")
 
 
-def ccor(self, left_register, right_register):
+def ccor(self, left_register, right_register, result_register):
     """Bitwise Or Operation"""
     self.instructions.append(
-        f"NOR {left_register} {right_register} {left_register}")
-    self.instructions.append(f"NOT {left_register} {left_register}")
+        f"NOR {left_register} {right_register} {result_register}")
+    self.instructions.append(f"NOT {result_register} {result_register}")
+
+
+def cclsk(self, register, amount):
+    """Logical Left Shift by a constant, unrolled"""
+    if amount >= 8:
+        self.instructions.append(f"LDI {register} 0")
+        return
+    for _ in range(amount):
+        self.instructions.append(f"LSH {register} {register}")
+
+
+def cclrsk(self, register, amount):
+    """Logical Right Shift by a constant, unrolled"""
+    if amount >= 8:
+        self.instructions.append(f"LDI {register} 0")
+        return
+    for _ in range(amount):
+        self.instructions.append(f"RSH {register} {register}")
 
 
 def ccumul(self, left_register, right_register, tag):
-    """Unsigned Multiplication"""
+    """Unsigned Multiplication, shift-and-add over the bits of the multiplier"""
     result_register = self.registers.temporal()
     counter_register = self.registers.counter()
+    bit_register = self.registers.scratch()
 
     mul_loop_tag = f".mul_loop_{tag}"
+    mul_skip_tag = f".mul_skip_{tag}"
     end_mul_tag = f".end_mul_{tag}"
 
     self.instructions.append(f"\nLDI {result_register} 0")
-    self.instructions.append(f"CMP {left_register} r0")
-    self.instructions.append(f"BRH EQ {end_mul_tag}")
+    self.instructions.append(f"LDI {bit_register} 1")
     self.instructions.append(f"MOV {right_register} {counter_register}")
     self.instructions.append(f"{mul_loop_tag}\t; Multiplication Loop")
     self.instructions.append(f"CMP {counter_register} r0")
     self.instructions.append(f"BRH EQ {end_mul_tag}")
+    self.instructions.append(
+        f"AND {counter_register} {bit_register} r0")
+    self.instructions.append(f"BRH EQ {mul_skip_tag}")
     self.instructions.append(
         f"ADD {result_register} {left_register} {result_register}")
-    self.instructions.append(f"DEC {counter_register}")
+    self.instructions.append(f"{mul_skip_tag}")
+    self.instructions.append(f"LSH {left_register} {left_register}")
+    self.instructions.append(f"RSH {counter_register} {counter_register}")
     self.instructions.append(f"JMP {mul_loop_tag}")
     self.instructions.append(f"{end_mul_tag}")
     self.instructions.append(f"MOV {result_register} {left_register}")
 
 
+def ccumulk(self, register, multiplier):
+    """Unsigned Multiplication by a constant, as an unrolled shift-and-add chain"""
+    multiplier &= 0xFF
+    if multiplier == 0:
+        self.instructions.append(f"LDI {register} 0")
+        return
+
+    bits = bin(multiplier)[3:]  # Every bit below the most significant one.
+    if '1' in bits:
+        self.instructions.append(f"MOV {register} {self.registers.temporal()}")
+    # Horner's rule from the top bit down: shift, then add the multiplicand
+    # back in for every set bit.
+    for bit in bits:
+        self.instructions.append(f"LSH {register} {register}")
+        if bit == '1':
+            self.instructions.append(
+                f"ADD {register} {self.registers.temporal()} {register}")
+
+
+def ccudiv(self, left_register, right_register, tag):
+    """Unsigned Division, restoring shift-and-subtract over the bits of the
+    dividend. The quotient replaces the dividend in left_register and the
+    remainder is left in the temporal register. A zero divisor gives a
+    quotient of 255 and the dividend as the remainder."""
+    remainder_register = self.registers.temporal()
+    counter_register = self.registers.counter()
+
+    div_loop_tag = f".div_loop_{tag}"
+    div_test_tag = f".div_test_{tag}"
+    div_take_tag = f".div_take_{tag}"
+    div_next_tag = f".div_next_{tag}"
+    div_over_tag = f".div_over_{tag}"
+    end_div_tag = f".end_div_{tag}"
+
+    self.instructions.append(f"\nLDI {remainder_register} 0")
+    self.instructions.append(f"LDI {counter_register} 8")
+    self.instructions.append(f"{div_loop_tag}\t; Division Loop")
+    # The remainder is below the divisor, so if shifting it overflows it
+    # is past any divisor and the subtraction wraps back into range.
+    self.instructions.append(
+        f"LSH {remainder_register} {remainder_register}")
+    self.instructions.append(f"BRH GE {div_over_tag}")
+    self.instructions.append(f"LSH {left_register} {left_register}")
+    self.instructions.append(f"BRH LT {div_test_tag}")
+    self.instructions.append(f"INC {remainder_register}")
+    self.instructions.append(f"{div_test_tag}")
+    self.instructions.append(f"CMP {remainder_register} {right_register}")
+    self.instructions.append(f"BRH LT {div_next_tag}")
+    self.instructions.append(f"{div_take_tag}")
+    self.instructions.append(
+        f"SUB {remainder_register} {right_register} {remainder_register}")
+    self.instructions.append(f"INC {left_register}")
+    self.instructions.append(f"{div_next_tag}")
+    self.instructions.append(f"DEC {counter_register}")
+    self.instructions.append(f"BRH NE {div_loop_tag}")
+    self.instructions.append(f"JMP {end_div_tag}")
+    self.instructions.append(f"{div_over_tag}")
+    self.instructions.append(f"LSH {left_register} {left_register}")
+    self.instructions.append(f"BRH LT {div_take_tag}")
+    self.instructions.append(f"INC {remainder_register}")
+    self.instructions.append(f"JMP {div_take_tag}")
+    self.instructions.append(f"{end_div_tag}")
+
+
+def division_steps(divisor):
+    """How many times a constant divisor can be doubled within a byte, plus one."""
+    return (0xFF // divisor).bit_length()
+
+
+def ccudivk(self, register, divisor, quotient_register, tag):
+    """Unsigned Division by a constant, as an unrolled chain subtracting the
+    divisor shifted left as far as it fits, then less and less. The dividend
+    in register is reduced to the remainder in place; the quotient is built
+    in quotient_register, unless it is None."""
+    divisor_register = self.registers.temporal()
+    if quotient_register is not None:
+        self.instructions.append(f"LDI {quotient_register} 0")
+    for shift in reversed(range(division_steps(divisor))):
+        skip_tag = f".div_skip_{tag}_{shift}"
+        self.instructions.append(f"LDI {divisor_register} {divisor << shift}")
+        self.instructions.append(f"CMP {register} {divisor_register}")
+        self.instructions.append(f"BRH LT {skip_tag}")
+        self.instructions.append(
+            f"SUB {register} {divisor_register} {register}")
+        if quotient_register is not None:
+            self.instructions.append(f"ADI {quotient_register} {1 << shift}")
+        self.instructions.append(f"{skip_tag}")
+
+
 def ccuge(self, left_register, right_register, tag):
     """Comparator Greater or Equal than"""
     result_register = self.registers.flags()
@@ -98,3 +211,35 @@ def ccugt(self, left_register, right_register, tag):
     self.instructions.append(f"{set_false_tag}")
     self.instructions.append(f"LDI {result_register} 0")
     self.instructions.append(f"{end_gt_tag}")
+
+
+def ccueq(self, left_register, right_register, tag):
+    """Comparator Equal"""
+    result_register = self.registers.flags()
+
+    set_true_tag = f".set_eq{tag}"
+    end_eq_tag = f".end_eq{tag}"
+
+    self.instructions.append(f"\nCMP {left_register} {right_register}")
+    self.instructions.append(f"BRH EQ {set_true_tag}")
+    self.instructions.append(f"LDI {result_register} 0")
+    self.instructions.append(f"JMP {end_eq_tag}")
+    self.instructions.append(f"{set_true_tag}")
+    self.instructions.append(f"LDI {result_register} 1")
+    self.instructions.append(f"{end_eq_tag}")
+
+
+def ccune(self, left_register, right_register, tag):
+    """Comparator Not Equal"""
+    result_register = self.registers.flags()
+
+    set_true_tag = f".set_ne{tag}"
+    end_ne_tag = f".end_ne{tag}"
+
+    self.instructions.append(f"\nCMP {left_register} {right_register}")
+    self.instructions.append(f"BRH NE {set_true_tag}")
+    self.instructions.append(f"LDI {result_register} 0")
+    self.instructions.append(f"JMP {end_ne_tag}")
+    self.instructions.append(f"{set_true_tag}")
+    self.instructions.append(f"LDI {result_register} 1")
+    self.instructions.append(f"{end_ne_tag}")
@@ -0,0 +1,505 @@
+"""
+Loop optimisations on the IR: loop-invariant code motion, strength
+reduction of induction variables and unrolling of counted loops.
+
+Loops are the natural loops of the control-flow graph, so a for loop (a
+While inside a Block once parsed) and a while loop are handled alike. Each
+pass takes an ir.Function, like every pass run by the PassManager.
+"""
+import ir as ir
+
+
+# The BatPU-2 is an 8-bit machine, induction variables wrap around.
+WORD_MASK = 0xFF
+
+# Unrolling never produces a loop, or a straight run of iterations, with
+# more IR instructions than this.
+UNROLL_BUDGET = 64
+# Partial unrolling factors, the largest that fits is used.
+UNROLL_FACTORS = (8, 4, 2)
+
+# Instructions that must not run on a path where they did not before.
+UNSAFE_TO_SPECULATE = {'div', 'mod'}
+
+# What a strength-reduced multiplication costs per iteration: a copy of the
+# running product, and an LDI and ADD to step it.
+REDUCED_COST = 3
+
+
+class Loop:
+    """
+    A natural loop.
+
+    Attributes:
+        header (BasicBlock): The block every iteration starts at.
+        blocks (list): The blocks of the loop in layout order, header included.
+        latches (list): The blocks that jump back to the header.
+    """
+    __slots__ = ('header', 'blocks', 'latches', 'members')
+
+    def __init__(self, header, blocks, latches):
+        self.header = header
+        self.blocks = blocks
+        self.latches = latches
+        self.members = set(blocks)
+
+    def __contains__(self, block):
+        return block in self.members
+
+    def exits(self):
+        """The (block inside, block outside) pairs of every edge leaving the loop."""
+        return [(block, successor) for block in self.blocks
+                for successor in block.successors() if successor not in self]
+
+    def size(self):
+        """Its IR instructions, counting every terminator as one."""
+        return sum(len(block.instructions) + 1 for block in self.blocks)
+
+
+def find_loops(function):
+    """Returns the natural loops of the function, innermost first."""
+    dominators = function.dominators()
+    predecessors = function.predecessors()
+    latches = {}
+    for block in dominators:
+        for successor in block.successors():
+            if successor in dominators[block]:
+                latches.setdefault(successor, []).append(block)
+
+    loops = []
+    for header, sources in latches.items():
+        body = {header}
+        stack = list(sources)
+        while stack:
+            block = stack.pop()
+            if block not in body and block in dominators:
+                body.add(block)
+                stack.extend(predecessors[block])
+        blocks = [block for block in function.blocks if block in body]
+        loops.append(Loop(header, blocks, sources))
+    loops.sort(key=lambda loop: len(loop.blocks))
+    return loops
+
+
+def each_loop(function):
+    """
+    Yields every loop, innermost first, finding it again each time so that
+    the changes made to the loops before it are seen.
+    """
+    for header in [loop.header for loop in find_loops(function)]:
+        if header is function.entry:
+            continue
+        for loop in find_loops(function):
+            if loop.header is header:
+                yield loop
+
+
+def liveness(function):
+    """Maps every block to the set of temps live on entry to it."""
+    uses, defines = {}, {}
+    for block in function.blocks:
+        used, defined = set(), set()
+        for instruction in block.instructions:
+            used.update(temp for temp in instruction.uses() if temp not in defined)
+            if instruction.dest is not None:
+                defined.add(instruction.dest)
+        used.update(temp for temp in block.terminator.uses() if temp not in defined)
+        uses[block], defines[block] = used, defined
+
+    live_in = {block: set() for block in function.blocks}
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(function.blocks):
+            live_out = set().union(*(live_in[successor] for successor in block.successors()))
+            live = uses[block] | (live_out - defines[block])
+            if live != live_in[block]:
+                live_in[block] = live
+                changed = True
+    return live_in
+
+
+def count_definitions(blocks):
+    """Maps every temp to how many instructions in the blocks assign it."""
+    definitions = {}
+    for block in blocks:
+        for instruction in block.instructions:
+            if instruction.dest is not None:
+                definitions[instruction.dest] = definitions.get(instruction.dest, 0) + 1
+    return definitions
+
+
+def retarget(terminator, old, new):
+    """Makes a terminator go to new wherever it went to old."""
+    if isinstance(terminator, ir.Jump):
+        if terminator.target is old:
+            terminator.target = new
+    elif isinstance(terminator, (ir.Branch, ir.CompareBranch)):
+        if terminator.then_block is old:
+            terminator.then_block = new
+        if terminator.else_block is old:
+            terminator.else_block = new
+
+
+def preheader(function, loop):
+    """
+    Returns the block every entry into the loop comes from, inserting an
+    empty one before the header when there is none.
+    """
+    outside = [block for block in function.predecessors()[loop.header] if block not in loop]
+    if len(outside) == 1 and isinstance(outside[0].terminator, ir.Jump):
+        return outside[0]
+    block = ir.BasicBlock(f"{loop.header.label}_pre")
+    block.terminator = ir.Jump(loop.header)
+    for predecessor in outside:
+        retarget(predecessor.terminator, loop.header, block)
+    function.blocks.insert(function.blocks.index(loop.header), block)
+    return block
+
+
+def constant(operand):
+    """Returns the 8-bit value of a numeric Const, or None."""
+    if isinstance(operand, ir.Const) and isinstance(operand.value, int):
+        return operand.value & WORD_MASK
+    return None
+
+
+# Loop-invariant code motion.
+
+def hoist_invariants(function):
+    """
+    Moves every instruction whose operands do not change inside a loop into
+    the loop's preheader, so it runs once instead of on every iteration.
+
+    The destination must have no other definition in the loop and must not
+    be live on entry to the header, so every use inside the loop already
+    reads the value of the same iteration. When the instruction does not
+    run on every way out of the loop, its destination must also be dead
+    after the loop, since it is now assigned even when the loop runs zero
+    times. Calls, loads and stores stay where they are.
+    """
+    for loop in each_loop(function):
+        dominators = function.dominators()
+        live_in = liveness(function)
+        definitions = count_definitions(loop.blocks)
+        exits = loop.exits()
+        live_after = set().union(*(live_in[target] for _, target in exits))
+
+        hoisted = []
+        changed = True
+        while changed:
+            changed = False
+            for block in loop.blocks:
+                always = all(block in dominators[exiting] for exiting, _ in exits)
+                for instruction in list(block.instructions):
+                    dest = instruction.dest
+                    if (dest is None or instruction.op not in ir.PURE
+                            or definitions.get(dest) != 1
+                            or dest in live_in[loop.header]
+                            or any(temp in definitions for temp in instruction.uses())):
+                        continue
+                    if not always and (dest in live_after
+                                       or instruction.op in UNSAFE_TO_SPECULATE):
+                        continue
+                    block.instructions.remove(instruction)
+                    hoisted.append(instruction)
+                    del definitions[dest]
+                    changed = True
+
+        if hoisted:
+            preheader(function, loop).instructions += hoisted
+
+
+# Induction variables.
+
+def step(instruction, variable):
+    """The constant 'instruction' adds to variable, if it is 'variable +/- c'."""
+    left, right = (instruction.args + [None, None])[:2]
+    if instruction.op == 'add':
+        if left is variable and constant(right) is not None:
+            return constant(right)
+        if right is variable and constant(left) is not None:
+            return constant(left)
+    elif instruction.op == 'sub' and left is variable and constant(right) is not None:
+        return -constant(right) & WORD_MASK
+    return None
+
+
+def induction_variables(loop, definitions):
+    """
+    Finds the basic induction variables of a loop: temps assigned once in
+    it, to themselves plus or minus a constant. The lowering computes
+    'i = i + 1' into a fresh temp and copies that into i, and both forms
+    are recognised.
+
+    Returns:
+        dict: variable -> (step, the instruction assigning it, its block).
+    """
+    variables = {}
+    for block in loop.blocks:
+        for position, instruction in enumerate(block.instructions):
+            variable = instruction.dest
+            if variable is None or definitions.get(variable) != 1:
+                continue
+            increment = step(instruction, variable)
+            if increment is None and instruction.op == 'copy':
+                source = instruction.args[0]
+                for earlier in block.instructions[:position]:
+                    if earlier.dest is source and definitions.get(source) == 1:
+                        increment = step(earlier, variable)
+            if increment is not None:
+                variables[variable] = (increment, instruction, block)
+    return variables
+
+
+def multiply_cost(multiplier):
+    """The instructions a multiplication by a constant expands into."""
+    multiplier &= WORD_MASK
+    if multiplier <= 1:
+        return 1
+    ones = bin(multiplier).count('1')
+    return 1 + (multiplier.bit_length() - 1) + (ones - 1) + (ones > 1)
+
+
+def scaled(instruction, variables):
+    """Returns (variable, multiplier) if the instruction is 'variable * c'."""
+    left, right = (instruction.args + [None, None])[:2]
+    if instruction.op == 'mul':
+        if left in variables and constant(right) is not None:
+            return left, constant(right)
+        if right in variables and constant(left) is not None:
+            return right, constant(left)
+    elif instruction.op == 'shl' and left in variables:
+        amount = constant(right)
+        if amount is not None and amount < 8:
+            return left, 1 << amount
+    return None
+
+
+def reduce_strength(function):
+    """
+    Replaces multiplications of an induction variable by a constant with a
+    running product that is stepped along with the variable.
+
+    For 'j = i * k' where i steps by c, a new temp s is set to i * k in the
+    preheader and increased by c * k right after every assignment to i, so
+    s equals i * k everywhere in the loop and 'j = copy s' replaces the
+    multiplication. Arithmetic wraps at 8 bits, so this is exact. Only
+    multiplications that expand into more instructions than the update
+    costs are replaced.
+    """
+    for loop in each_loop(function):
+        variables = induction_variables(loop, count_definitions(loop.blocks))
+        if not variables:
+            continue
+
+        products = {}
+        for block in loop.blocks:
+            for position, instruction in enumerate(block.instructions):
+                factor = scaled(instruction, variables)
+                if factor is None or multiply_cost(factor[1]) <= REDUCED_COST:
+                    continue
+                if factor not in products:
+                    products[factor] = function.new_temp()
+                block.instructions[position] = ir.Instr(
+                    'copy', instruction.dest, [products[factor]])
+
+        if not products:
+            continue
+        entry = preheader(function, loop)
+        for (variable, multiplier), product in products.items():
+            entry.instructions.append(
+                ir.Instr('mul', product, [variable, ir.Const(multiplier)]))
+            increment, assignment, block = variables[variable]
+            update = ir.Instr('add', product,
+                              [product, ir.Const(increment * multiplier & WORD_MASK)])
+            block.instructions.insert(block.instructions.index(assignment) + 1, update)
+
+
+# Unrolling.
+
+def initial_value(function, loop, variable):
+    """
+    The constant a variable holds when the loop is entered, found on the
+    straight run of blocks leading to it, or None.
+    """
+    predecessors = function.predecessors()
+    outside = [block for block in predecessors[loop.header] if block not in loop]
+    if len(outside) != 1:
+        return None
+    block = outside[0]
+    seen = set()
+    while block not in seen:
+        seen.add(block)
+        for instruction in reversed(block.instructions):
+            if instruction.dest is variable:
+                if instruction.op == 'copy':
+                    return constant(instruction.args[0])
+                return None
+        if len(predecessors[block]) != 1:
+            return None
+        block = predecessors[block][0]
+    return None
+
+
+def trip_count(function, loop):
+    """
+    How many times the body of a counted loop runs, or None when that is
+    not known at compile time.
+
+    A counted loop leaves only from its header, by comparing a basic
+    induction variable with a constant, and steps the variable once in the
+    body on every iteration, starting from a known constant.
+    """
+    test = loop.header.terminator
+    if (len(loop.latches) != 1 or not isinstance(test, ir.CompareBranch)
+            or any(block is not loop.header for block, _ in loop.exits())):
+        return None
+    stays = test.then_block in loop
+    if stays == (test.else_block in loop):
+        return None
+
+    variables = induction_variables(loop, count_definitions(loop.blocks))
+    if test.left in variables and constant(test.right) is not None:
+        variable = test.left
+    elif test.right in variables and constant(test.left) is not None:
+        variable = test.right
+    else:
+        return None
+    increment, _, block = variables[variable]
+    if block is loop.header or block not in function.dominators()[loop.latches[0]]:
+        return None
+    for inner in find_loops(function):
+        if inner.header is not loop.header and inner.header in loop and block in inner:
+            return None
+
+    value = initial_value(function, loop, variable)
+    if value is None:
+        return None
+    count = 0
+    while True:
+        left = value if test.left is variable else constant(test.left)
+        right = value if test.right is variable else constant(test.right)
+        if ir.compare(test.op, left, right) != stays:
+            return count
+        count += 1
+        value = (value + increment) & WORD_MASK
+        # The variable has gone through every value without leaving.
+        if count > WORD_MASK + 1:
+            return None
+
+
+def fresh(labels, label):
+    """
+    The label, with a count appended if it is among labels already, which
+    happens when a loop holding an unrolled one is unrolled in turn. The
+    result is added to labels.
+    """
+    unique, count = label, 1
+    while unique in labels:
+        count += 1
+        unique = f"{label}_{count}"
+    labels.add(unique)
+    return unique
+
+
+def clone(loop, suffix, labels):
+    """Copies the blocks of a loop; returns original block -> copy."""
+    copies = {}
+    for block in loop.blocks:
+        copy = ir.BasicBlock(fresh(labels, f"{block.label}_{suffix}"))
+        copy.instructions = [instruction.copy() for instruction in block.instructions]
+        copies[block] = copy
+    for block in loop.blocks:
+        copies[block].terminator = clone_terminator(block.terminator, copies)
+    return copies
+
+
+def clone_terminator(terminator, copies):
+    def target(block):
+        return copies.get(block, block)
+
+    match terminator:
+        case ir.Jump():
+            return ir.Jump(target(terminator.target))
+        case ir.Branch():
+            return ir.Branch(terminator.condition, target(terminator.then_block),
+                             target(terminator.else_block))
+        case ir.CompareBranch():
+            return ir.CompareBranch(terminator.op, terminator.left, terminator.right,
+                                    target(terminator.then_block),
+                                    target(terminator.else_block))
+        case ir.Return():
+            return ir.Return(terminator.value)
+
+
+def unroll(function):
+    """
+    Unrolls counted loops within UNROLL_BUDGET.
+
+    A loop whose whole run fits in the budget is unrolled fully: its
+    iterations are laid out one after another, each header keeping its
+    instructions but not its test, and a last copy of the header leads out
+    of the loop. Otherwise, when the trip count is a multiple of one of the
+    UNROLL_FACTORS, that many iterations are laid out per trip around the
+    loop and only the first header tests; the others are known to stay.
+    """
+    for loop in each_loop(function):
+        count = trip_count(function, loop)
+        if count is None:
+            continue
+        size = loop.size()
+        if count * size <= UNROLL_BUDGET:
+            unroll_fully(function, loop, count)
+            continue
+        for factor in UNROLL_FACTORS:
+            if count % factor == 0 and factor * size <= UNROLL_BUDGET:
+                unroll_partially(function, loop, factor)
+                break
+
+
+def lay_out(function, loop, iterations, last):
+    """
+    Chains the given copies of a loop, each one's latch going to the next
+    one's header and the final latch to last. Every header but the first
+    goes straight into its body.
+    """
+    header, latch = loop.header, loop.latches[0]
+    body = next(block for block in header.successors() if block in loop)
+    for index, copies in enumerate(iterations):
+        if index > 0:
+            copies[header].terminator = ir.Jump(copies[body])
+        following = iterations[index + 1][header] if index + 1 < len(iterations) else last
+        retarget(copies[latch].terminator, copies[header], following)
+
+    position = function.blocks.index(loop.blocks[-1]) + 1
+    added = [copies[block] for copies in iterations[1:] for block in loop.blocks]
+    function.blocks[position:position] = added
+    return body
+
+
+def unroll_fully(function, loop, count):
+    header = loop.header
+    exit_block = next(block for block in header.successors() if block not in loop)
+    if count == 0:
+        header.terminator = ir.Jump(exit_block)
+        return
+
+    labels = {block.label for block in function.blocks}
+    last = ir.BasicBlock(fresh(labels, f"{header.label}_u{count}"))
+    last.instructions = [instruction.copy() for instruction in header.instructions]
+    last.terminator = ir.Jump(exit_block)
+
+    identity = {block: block for block in loop.blocks}
+    iterations = [identity] + [clone(loop, f"u{index}", labels) for index in range(1, count)]
+    body = lay_out(function, loop, iterations, last)
+    header.terminator = ir.Jump(body)
+    position = function.blocks.index(iterations[-1][loop.blocks[-1]]) + 1
+    function.blocks.insert(position, last)
+
+
+def unroll_partially(function, loop, factor):
+    labels = {block.label for block in function.blocks}
+    identity = {block: block for block in loop.blocks}
+    iterations = [identity] + [clone(loop, f"u{index}", labels) for index in range(1, factor)]
+    lay_out(function, loop, iterations, loop.header)
@@ -0,0 +1,316 @@
+from token_type import TokenType
+import expr as expr
+import stmt as stmt
+import ir as ir
+
+
+BINARY_OPS = {
+    TokenType.PLUS: 'add',
+    TokenType.MINUS: 'sub',
+    TokenType.AMPERSAND: 'and',
+    TokenType.PIPE: 'or',
+    TokenType.CARET: 'xor',
+    TokenType.LEFT_SHIFT: 'shl',
+    TokenType.RIGHT_SHIFT: 'shr',
+    TokenType.STAR: 'mul',
+    TokenType.SLASH: 'div',
+    TokenType.MODULO: 'mod',
+    TokenType.EQUAL_EQUAL: 'eq',
+    TokenType.BANG_EQUAL: 'ne',
+    TokenType.LESS: 'lt',
+    TokenType.LESS_EQUAL: 'le',
+    TokenType.GREATER: 'gt',
+    TokenType.GREATER_EQUAL: 'ge',
+}
+
+
+def assignments(node):
+    """The slots of the local variables assigned anywhere in an expression,
+    or in a list of them."""
+    if isinstance(node, list):
+        return set().union(*(assignments(item) for item in node))
+    if not isinstance(node, expr.Expr):
+        return set()
+    slots = set()
+    if isinstance(node, expr.Assign) and not node.binding.shared:
+        slots.add(node.slot)
+    for name in node.__slots__:
+        slots |= assignments(getattr(node, name))
+    return slots
+
+
+class Lowering(expr.Visitor, stmt.Visitor):
+    """
+    Lowers the statement AST into the three-address IR.
+
+    Every variable gets a named Temp for its whole lifetime, found through
+    the slot the Resolver gave it, and every expression evaluates into a
+    fresh Temp or a Const. Control flow becomes
+    explicit basic blocks, so a for loop (already a While inside a Block by
+    the time it leaves the parser) turns into a header, body and exit block.
+
+    Conditions of ifs and whiles are lowered for their jumps, not their
+    value: a comparison becomes a CompareBranch, '!' swaps the targets, and
+    'and'/'or' become chains of branches that skip the right operand.
+
+    Every function declaration becomes a Function of its own, after the
+    top-level code in the program, with its parameters as named Temps. The
+    globals that functions use live in data RAM instead, so reading and
+    assigning them loads and stores. A function that returns no value
+    returns 0.
+    """
+
+    def __init__(self) -> None:
+        self.program = None
+        self.function = None
+        self.block = None
+        self.temps = {}
+        self.counters = {}
+        self.functions = {}
+        self.addresses = {}
+
+    def lower(self, statements):
+        self.program = ir.Program()
+        self.function = ir.Function("main")
+        self.block = self.function.new_block("entry")
+        self.program.functions.append(self.function)
+        for statement in statements:
+            self.execute(statement)
+        self.terminate(ir.Return())
+        return self.program
+
+    def execute(self, statement):
+        statement.accept(self)
+
+    def evaluate(self, expression):
+        return expression.accept(self)
+
+    def operands(self, expressions):
+        """
+        Evaluates the expressions left to right. A variable evaluates to its
+        own temp, so one that a later operand assigns is copied first, to
+        keep the value it had when it was read: with a = 7, a + (a = 5) is 12.
+        """
+        values = []
+        for index, expression in enumerate(expressions):
+            value = self.evaluate(expression)
+            if any(self.temps.get(slot) is value
+                   for slot in assignments(expressions[index + 1:])):
+                value = self.emit('copy', self.function.new_temp(value.type), value)
+            values.append(value)
+        return values
+
+    def emit(self, op, dest, *args):
+        self.block.instructions.append(ir.Instr(op, dest, list(args)))
+        return dest
+
+    def terminate(self, terminator):
+        """Ends the current block, unless it was already ended."""
+        if self.block.terminator is None:
+            self.block.terminator = terminator
+
+    def new_block(self, name):
+        """Creates a block; it joins the layout once code is emitted into it."""
+        self.counters[name] = self.counters.get(name, 0) + 1
+        return ir.BasicBlock(f"{name}_{self.counters[name]}")
+
+    def switch_to(self, block):
+        self.function.blocks.append(block)
+        self.block = block
+
+    def address(self, symbol):
+        """The data RAM address of a shared global."""
+        if symbol.slot not in self.addresses:
+            self.addresses[symbol.slot] = len(self.program.globals)
+            self.program.globals.append(symbol)
+        return ir.Const(self.addresses[symbol.slot])
+
+    # Statements.
+
+    def visit_expression_stmt(self, stmt):
+        if isinstance(stmt.expression, expr.Call):
+            # The result is thrown away, so don't copy it anywhere.
+            self.call(stmt.expression, None)
+        else:
+            self.evaluate(stmt.expression)
+
+    def visit_block_stmt(self, stmt):
+        for statement in stmt.statements:
+            self.execute(statement)
+
+    def visit_const_stmt(self, stmt):
+        pass
+
+    def visit_var_stmt(self, stmt):
+        if stmt.binding.shared:
+            if stmt.initializer is not None:
+                self.emit('store', None, self.address(stmt.binding),
+                          self.evaluate(stmt.initializer))
+            return
+        variable = self.function.new_temp(name=stmt.name.lexeme)
+        if stmt.initializer is not None:
+            self.emit('copy', variable, self.evaluate(stmt.initializer))
+        self.temps[stmt.slot] = variable
+
+    def visit_function_stmt(self, stmt):
+        name = f"fn_{stmt.name.lexeme}"
+        self.counters[name] = self.counters.get(name, 0) + 1
+        if self.counters[name] > 1:
+            name = f"{name}_{self.counters[name]}"
+
+        outer, block = self.function, self.block
+        self.function = ir.Function(name)
+        self.functions[stmt.slot] = self.function
+        self.program.functions.append(self.function)
+        for param, slot in zip(stmt.params, stmt.param_slots):
+            temp = self.function.new_temp(name=param.lexeme)
+            self.function.params.append(temp)
+            self.temps[slot] = temp
+
+        self.block = self.function.new_block("entry")
+        for statement in stmt.body:
+            self.execute(statement)
+        self.terminate(ir.Return(ir.Const(0)))
+        self.function, self.block = outer, block
+
+    def visit_return_stmt(self, stmt):
+        value = self.evaluate(stmt.value) if stmt.value is not None else ir.Const(0)
+        self.terminate(ir.Return(value))
+        # Whatever follows in the same block can't run.
+        self.switch_to(self.new_block("after_return"))
+
+    def visit_if_stmt(self, stmt):
+        then_block = self.new_block("if_then")
+        else_block = self.new_block(
+            "if_else") if stmt.else_branch is not None else None
+        end_block = self.new_block("end_if")
+
+        self.condition(stmt.condition, then_block, else_block or end_block)
+
+        self.switch_to(then_block)
+        self.execute(stmt.then_branch)
+        self.terminate(ir.Jump(end_block))
+
+        if else_block is not None:
+            self.switch_to(else_block)
+            self.execute(stmt.else_branch)
+            self.terminate(ir.Jump(end_block))
+
+        self.switch_to(end_block)
+
+    def visit_while_stmt(self, stmt):
+        header = self.new_block("while")
+        body = self.new_block("while_body")
+        exit_block = self.new_block("end_while")
+
+        self.terminate(ir.Jump(header))
+        self.switch_to(header)
+        self.condition(stmt.condition, body, exit_block)
+
+        self.switch_to(body)
+        self.execute(stmt.body)
+        self.terminate(ir.Jump(header))
+
+        self.switch_to(exit_block)
+
+    # Conditions.
+
+    def condition(self, expression, then_block, else_block):
+        """
+        Ends the current block by going to then_block when the expression is
+        truthy and to else_block otherwise, without computing its value.
+        """
+        match expression:
+            case expr.Grouping():
+                self.condition(expression.expression, then_block, else_block)
+            case expr.Unary() if expression.operator.type == TokenType.BANG:
+                self.condition(expression.right, else_block, then_block)
+            case expr.Logical():
+                right_block = self.new_block("logical_rhs")
+                if expression.operator.type == TokenType.AND:
+                    self.condition(expression.left, right_block, else_block)
+                else:
+                    self.condition(expression.left, then_block, right_block)
+                self.switch_to(right_block)
+                self.condition(expression.right, then_block, else_block)
+            case expr.Binary() if BINARY_OPS[expression.operator.type] in ir.COMPARE:
+                left, right = self.operands([expression.left, expression.right])
+                self.terminate(ir.CompareBranch(BINARY_OPS[expression.operator.type],
+                                                left, right, then_block, else_block))
+            case _:
+                value = self.evaluate(expression)
+                self.terminate(ir.Branch(value, then_block, else_block))
+
+    # Expressions.
+
+    def visit_literal_expr(self, expr):
+        value = expr.value
+        if isinstance(value, bool):
+            return ir.Const(int(value), ir.BOOL)
+        if isinstance(value, str) and value.isdigit():
+            return ir.Const(int(value))
+        return ir.Const(value)
+
+    def visit_grouping_expr(self, expr):
+        return self.evaluate(expr.expression)
+
+    def visit_constant_expr(self, expr):
+        return self.evaluate(expr.binding.value)
+
+    def visit_variable_expr(self, expr):
+        if expr.binding.shared:
+            return self.emit('load', self.function.new_temp(), self.address(expr.binding))
+        return self.temps[expr.slot]
+
+    def visit_assign_expr(self, expr):
+        if expr.binding.shared:
+            value = self.evaluate(expr.value)
+            self.emit('store', None, self.address(expr.binding), value)
+            return value
+        variable = self.temps[expr.slot]
+        self.emit('copy', variable, self.evaluate(expr.value))
+        return variable
+
+    def visit_call_expr(self, expr):
+        return self.call(expr, self.function.new_temp())
+
+    def call(self, expr, dest):
+        """Emits a call, leaving its result in dest unless that is None."""
+        arguments = self.operands(expr.arguments)
+        function = self.functions[expr.callee.slot]
+        function.call_sites += 1
+        self.block.instructions.append(ir.Call(dest, function, arguments))
+        return dest
+
+    def visit_unary_expr(self, expr):
+        right = self.evaluate(expr.right)
+        match expr.operator.type:
+            case TokenType.MINUS:
+                return self.emit('neg', self.function.new_temp(), right)
+            case TokenType.BANG:
+                return self.emit('not', self.function.new_temp(ir.BOOL), right)
+
+    def visit_logical_expr(self, expr):
+        result = self.function.new_temp()
+        right_block = self.new_block("logical_rhs")
+        end_block = self.new_block("end_logical")
+
+        self.emit('copy', result, self.evaluate(expr.left))
+        # 'and' stops at a falsy left operand, 'or' at a truthy one.
+        if expr.operator.type == TokenType.AND:
+            self.terminate(ir.Branch(result, right_block, end_block))
+        else:
+            self.terminate(ir.Branch(result, end_block, right_block))
+
+        self.switch_to(right_block)
+        self.emit('copy', result, self.evaluate(expr.right))
+        self.terminate(ir.Jump(end_block))
+
+        self.switch_to(end_block)
+        return result
+
+    def visit_binary_expr(self, expr):
+        left, right = self.operands([expr.left, expr.right])
+        op = BINARY_OPS[expr.operator.type]
+        type_ = ir.BOOL if op in ir.COMPARE else ir.U8
+        return self.emit(op, self.function.new_temp(type_), left, right)
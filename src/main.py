@@ -1,11 +1,19 @@
+import io
 import sys
 import os
 
 from semantic import SemanticAnalizer
-from lexer import Scanner
+from lexer import RegexScanner
 from parser import Parser
-from error import TikkiError
+from error import TikkiError, DataMemoryError
 from symbol_table import SymbolTable
+from resolver import Resolver
+from optimizer import ConstantFolder, DeadCodeEliminator
+from generator import CodeGenerator
+from runtime import LEVELS
+from peephole import Peephole
+from stats import Stats, count_nodes, count_instructions
+import tkcode
 
 
 class Tikki:
@@ -14,66 +22,222 @@ class Tikki:
 
     @classmethod
     def main(cls):
-        os.system("cls" or "clear")
-        if len(cls.args) > 1:
-            print("Usage: python3 main.py [script]")
-            sys.exit(64)
-        elif len(cls.args) == 1:
-            cls.run_file(cls.args[0])
+        levels = [arg for arg in cls.args if arg.startswith('-') and arg[1:] in LEVELS]
+        level = levels[-1][1:] if levels else 'O2'
+        args = [arg for arg in cls.args if not arg.startswith('-')]
+        options = [arg for arg in cls.args if arg.startswith('-') and not arg.startswith('--')]
+        flags = [arg for arg in cls.args if arg.startswith('--')]
+        jobs = [flag for flag in flags if flag.startswith('--jobs=')]
+        cached = '--no-cache' not in flags
+        maps = [flag for flag in flags if flag == '--map' or flag.startswith('--map=')]
+        stats = [flag for flag in flags
+                 if flag not in jobs and flag not in maps and flag != '--no-cache']
+        if (any(option not in levels for option in options)
+                or any(flag != '--stats' and not flag.startswith('--stats=') for flag in stats)
+                or any(not flag[len('--jobs='):].isdigit() for flag in jobs)):
+            cls.usage()
+        elif len(args) > 1 or (args and os.path.isdir(args[0])):
+            if stats or maps:
+                cls.usage()
+            cls.run_batch(args, int(jobs[-1][len('--jobs='):]) if jobs else None, cached, level)
+        elif len(args) == 1:
+            report = memory_map = None
+            if stats:
+                _, _, report = stats[-1].partition('=')
+                report = report or os.path.splitext(args[0])[0] + '.stats.json'
+            if maps:
+                _, _, memory_map = maps[-1].partition('=')
+                memory_map = memory_map or os.path.splitext(args[0])[0] + '.map'
+            cls.run_file(args[0], report, cached, level, memory_map)
         else:
             sys.exit(1)
 
+    @staticmethod
+    def usage():
+        print("Usage: python3 main.py [-O2 | -Os] [--no-cache] [--stats[=report.json]]\n"
+              "                       [--map[=memory.map]] [script]\n"
+              "       python3 main.py [-O2 | -Os] [--no-cache] [--jobs=N] [script | directory]...")
+        sys.exit(64)
+
+    @classmethod
+    def run_batch(cls, paths, jobs=None, cached=True, level='O2'):
+        """Compiles many scripts in parallel, printing each one's output in
+        order, and exits with 1 if any of them failed."""
+        import batch
+
+        failed = []
+        hits = misses = 0
+        for result in batch.compile_all(batch.collect(paths), jobs, cached, level):
+            print(f"==> {result.path}")
+            print(result.output, end='')
+            if not result.ok:
+                failed.append(result.path)
+            if result.cached is not None:
+                hits += result.cached
+                misses += not result.cached
+        if cached:
+            print(f"Cache: {hits} hit(s), {misses} miss(es)")
+        if failed:
+            print(f"{len(failed)} file(s) failed: " + ', '.join(failed))
+            sys.exit(1)
+
     @classmethod
-    def run_file(cls, path):
+    def run_file(cls, path, report=None, cached=True, level='O2', memory_map=None):
+        """Compiles a script next to itself; with a report path, the per-phase
+        statistics are printed and saved there as JSON, and with a memory_map
+        path, the data RAM map is saved there. Both bypass cached results,
+        but still cache the new one."""
         try:
             with open(path, 'rb') as file:
                 bytes_content = file.read()
-                cls.run(bytes_content.decode())
+                output = os.path.splitext(path)[0] + '.as'
+                stats = Stats(enabled=report is not None)
+                cache = None
+                if cached:
+                    from cache import CompilationCache
+                    cache = CompilationCache()
+                error = cls.run(bytes_content.decode(), output, stats, cache,
+                                refresh=stats.enabled or memory_map is not None,
+                                level=level, memory_map=memory_map)
+                if cache is not None and cache.hits:
+                    print(f"{path} is up to date (cached).")
+
+                if report is not None and stats.phases:
+                    print(stats.report())
+                    stats.write(report)
 
                 # Indicate error in the exit code
-                if TikkiError.had_error:
+                if error.had_error:
                     sys.exit(1)
 
         except FileNotFoundError:
             print("File not found")
 
     @classmethod
-    def run(cls, source):
-        error = TikkiError(source)
-        symbol_table = SymbolTable()
-
-        Tikki_scanner = Scanner(source, error)
-        tokens = Tikki_scanner.scan_tokens()
-
-        Tikki_parser = Parser(tokens, error, symbol_table)
-        statements = Tikki_parser.parse()
+    def run(cls, source, output='file.as', stats=None, cache=None, refresh=False, level='O2',
+            memory_map=None):
+        """Compiles source into output and returns its TikkiError reporter."""
+        stats = stats or Stats(enabled=False)
+        error, text = cls.compile(source, stats, cache, refresh, level, memory_map)
+        if text is not None:
+            with stats.phase("emit") as phase:
+                with open(output, 'w') as file:
+                    file.write(text)
+                phase.counts['bytes'] = len(text)
+        return error
 
-        analyzer = SemanticAnalizer(error, symbol_table)
-        analyzer.analyze(statements)
+    @classmethod
+    def compile(cls, source, stats=None, cache=None, refresh=False, level='O2',
+                memory_map=None, error=None):
+        """
+        Compiles source into assembly.
+
+        Args:
+            stats (Stats): Records the cost of each phase.
+            cache (CompilationCache): Reuses the assembly of an identical
+                                      earlier compilation, and stores new ones.
+            refresh (bool): Compile even if the cache has the result.
+            level (str): 'O2' to balance size and speed, 'Os' to favour size.
+            memory_map (str): Where to save the map of data RAM, if anywhere.
+                              A cached result has none, so pass refresh too.
+            error (TikkiError): Receives the diagnostics; by default they
+                                are printed.
+
+        Returns:
+            tuple: (TikkiError reporter, assembly text or None on errors).
+        """
+        stats = stats or Stats(enabled=False)
+        error = error or TikkiError(source)
+
+        if cache is not None:
+            key = cache.key(source, [level])
+            text = None if refresh else cache.load(key)
+            if text is not None:
+                return error, text
 
-        print("Defined Variables:", analyzer.variables_defined)
-        print("Initialized Variables:", analyzer.variables_initialized)
-        print("Used Variables:", analyzer.variables_used)
-        print("Defined Constants:", analyzer.constants_defined)
-        print("Used Constants:", analyzer.constants_used)
+        symbol_table = SymbolTable()
 
-        # Stop if there was a syntax error.
-        if TikkiError.had_error:
-            return
+        # Scanning is measured as part of the parse phase. The parser takes
+        # the tokens as a list: a TokenStream would start parsing before
+        # lexing ends, but every peek through it costs a method call.
+        with stats.phase("parse") as phase:
+            Tikki_scanner = RegexScanner(source, error)
+            tokens = Tikki_scanner.scan_tokens()
 
+            Tikki_parser = Parser(tokens, error, symbol_table)
+            statements = Tikki_parser.parse()
+            phase.counts['tokens'] = len(tokens)
+            phase.counts['nodes'] = count_nodes(statements)
 
-"""
-    generator = CodeGenerator()
-    instructions = generator.generate(statements)
+        with stats.phase("semantic") as phase:
+            analyzer = SemanticAnalizer(error, symbol_table)
+            analyzer.analyze(statements)
+            phase.counts['symbols'] = len(analyzer.variables_defined | analyzer.constants_defined)
 
-    with open('file.as', 'w') as file:
-        tkcode.header(file)
-        tkcode.stater(file)
+        # Stop if there was a syntax error.
+        if error.had_error:
+            return error, None
+
+        with stats.phase("resolve") as phase:
+            resolver = Resolver(error)
+            resolver.resolve(statements)
+            phase.counts['slots'] = len(resolver.symbol_table.symbols)
+
+        if error.had_error:
+            return error, None
+
+        with stats.phase("fold") as phase:
+            statements = ConstantFolder(error).fold(statements)
+            phase.counts['nodes'] = count_nodes(statements)
+
+        if error.had_error:
+            return error, None
+
+        with stats.phase("dce") as phase:
+            eliminator = DeadCodeEliminator()
+            statements = eliminator.eliminate(statements)
+            phase.counts['removed'] = eliminator.removed
+            phase.counts['nodes'] = count_nodes(statements)
+
+        with stats.phase("generate") as phase:
+            generator = CodeGenerator(level=level)
+            generator.generate(statements)
+            blocks = [block for function in generator.functions
+                      for block in function.blocks]
+            phase.counts['blocks'] = len(blocks)
+            phase.counts['ir'] = sum(len(block.instructions) for block in blocks)
+            phase.counts['instructions'] = count_instructions(generator.instructions)
+            phase.counts['spills'] = sum(len(allocator.spill_slots)
+                                         for allocator in generator.allocators.values())
+            phase.counts['runtime_calls'] = len(generator.calls)
+            phase.counts['data_bytes'] = generator.memory_map.used
+
+        if memory_map is not None:
+            generator.memory_map.write(memory_map)
+        try:
+            generator.memory_map.check(error)
+        except DataMemoryError:
+            return error, None
+
+        with stats.phase("peephole") as phase:
+            peephole = Peephole()
+            generator.instructions = peephole.optimize(generator.instructions)
+            phase.counts['instructions'] = count_instructions(generator.instructions)
+
+        buffer = io.StringIO()
+        tkcode.header(buffer)
+        tkcode.stater(buffer)
         for instruction in generator.instructions:
-            file.write(instruction + '\n')
-        file.write("\nJMP .end")
-    """
+            buffer.write(instruction + '\n')
+        buffer.write("\nJMP .end")
+        text = buffer.getvalue()
+
+        if cache is not None:
+            cache.store(key, text)
 
+        stats.extra['passes'] = dict(generator.passes.timings)
+        stats.extra['peephole'] = dict(peephole.hits)
+        return error, text
 
 if __name__ == "__main__":
     Tikki.main()
@@ -0,0 +1,99 @@
+"""Reports the memory cost of tokens and AST nodes.
+
+Usage: python3 memory_bench.py [script] [repeat]
+
+Every token and node produced for the script is rebuilt twice: once with the
+slotted classes from tokens.py, expr.py and stmt.py ("after") and once as
+plain objects carrying a per-instance __dict__ ("before").
+"""
+import sys
+import tracemalloc
+
+import expr
+import stmt
+from lexer import RegexScanner
+from parser import Parser
+from symbol_table import SymbolTable
+
+
+SAMPLE = """
+const LIMIT = 10;
+let total = 0;
+let mask = 15;
+for (let i = 0; i < LIMIT; i = i + 1) {
+    total = total + (i << 1) & mask;
+    if (total >= LIMIT) { total = total - LIMIT; } else { mask = mask | 1; }
+}
+while (total != 0) { total = total - 1; }
+"""
+
+
+class Reporter:
+    def report(self, token, message, phase="Syntax"):
+        raise SystemExit(f"{phase}Error at line {token.line}: {message}")
+
+
+class Plain:
+    """Stand-in for the original dict-backed token and node layout."""
+
+
+def fields(obj):
+    return {name: getattr(obj, name) for name in obj.__slots__}
+
+
+def walk(node):
+    """Yields every AST node reachable from node."""
+    if isinstance(node, list):
+        for item in node:
+            yield from walk(item)
+    elif isinstance(node, (expr.Expr, stmt.Stmt)):
+        yield node
+        for value in fields(node).values():
+            yield from walk(value)
+
+
+def rebuild(objects, plain):
+    """Recreates objects field by field so only their own allocation is measured."""
+    copies = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for obj in objects:
+        if plain:
+            copy = Plain()
+            copy.__dict__.update(fields(obj))
+        else:
+            copy = object.__new__(type(obj))
+            for name, value in fields(obj).items():
+                setattr(copy, name, value)
+        copies.append(copy)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # Discount the list that keeps the copies alive.
+    size -= sys.getsizeof(copies)
+    return size / max(len(objects), 1)
+
+
+def main(args):
+    source = SAMPLE
+    if args:
+        with open(args[0]) as file:
+            source = file.read()
+    repeat = int(args[1]) if len(args) > 1 else 200
+
+    tokens = []
+    nodes = []
+    for _ in range(repeat):
+        scanned = RegexScanner(source, Reporter()).scan_tokens()
+        statements = Parser(scanned, Reporter(), SymbolTable()).parse()
+        tokens.extend(scanned)
+        nodes.extend(walk(statements))
+
+    print(f"{len(tokens)} tokens, {len(nodes)} nodes")
+    print(f"{'':8}{'before':>10}{'after':>10}")
+    for label, objects in (("token", tokens), ("node", nodes)):
+        print(f"{label:8}{rebuild(objects, True):>10.1f}"
+              f"{rebuild(objects, False):>10.1f}  bytes each")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
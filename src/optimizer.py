@@ -0,0 +1,448 @@
+from token_type import TokenType
+import error as error
+import expr as expr
+import stmt as stmt
+
+
+# The BatPU-2 is an 8-bit machine, every folded value wraps around.
+WORD_MASK = 0xFF
+
+
+def numeric(node):
+    """Returns the 8-bit value of a numeric or boolean Literal, or None."""
+    if not isinstance(node, expr.Literal):
+        return None
+    value = node.value
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value & WORD_MASK
+    # Number tokens carry their digits as the literal.
+    if isinstance(value, str) and value.isdigit():
+        return int(value) & WORD_MASK
+    return None
+
+
+def is_pure(node):
+    """True if evaluating the expression has no side effects, so it can be dropped."""
+    match node:
+        case expr.Literal() | expr.Variable() | expr.Constant():
+            return True
+        case expr.Grouping():
+            return is_pure(node.expression)
+        case expr.Unary():
+            return is_pure(node.right)
+        case expr.Binary() | expr.Logical():
+            return is_pure(node.left) and is_pure(node.right)
+    return False
+
+
+ARITHMETIC = {
+    TokenType.PLUS: lambda a, b: a + b,
+    TokenType.MINUS: lambda a, b: a - b,
+    TokenType.STAR: lambda a, b: a * b,
+    TokenType.SLASH: lambda a, b: a // b,
+    TokenType.MODULO: lambda a, b: a % b,
+    TokenType.AMPERSAND: lambda a, b: a & b,
+    TokenType.PIPE: lambda a, b: a | b,
+    TokenType.CARET: lambda a, b: a ^ b,
+    TokenType.LEFT_SHIFT: lambda a, b: a << b if b < 8 else 0,
+    TokenType.RIGHT_SHIFT: lambda a, b: a >> b,
+}
+
+COMPARISON = {
+    TokenType.EQUAL_EQUAL: lambda a, b: a == b,
+    TokenType.BANG_EQUAL: lambda a, b: a != b,
+    TokenType.GREATER: lambda a, b: a > b,
+    TokenType.GREATER_EQUAL: lambda a, b: a >= b,
+    TokenType.LESS: lambda a, b: a < b,
+    TokenType.LESS_EQUAL: lambda a, b: a <= b,
+}
+
+# Identities on a constant right operand, as (operator, constant) -> result.
+# "left" keeps the other operand, an int replaces the whole expression when
+# the other operand is pure.
+RIGHT_IDENTITIES = {
+    (TokenType.PLUS, 0): "left",
+    (TokenType.MINUS, 0): "left",
+    (TokenType.STAR, 1): "left",
+    (TokenType.STAR, 0): 0,
+    (TokenType.SLASH, 1): "left",
+    (TokenType.MODULO, 1): 0,
+    (TokenType.AMPERSAND, WORD_MASK): "left",
+    (TokenType.AMPERSAND, 0): 0,
+    (TokenType.PIPE, 0): "left",
+    (TokenType.PIPE, WORD_MASK): WORD_MASK,
+    (TokenType.CARET, 0): "left",
+    (TokenType.LEFT_SHIFT, 0): "left",
+    (TokenType.RIGHT_SHIFT, 0): "left",
+}
+
+# The same identities for commutative operators with the constant on the left.
+LEFT_IDENTITIES = {
+    (TokenType.PLUS, 0): "right",
+    (TokenType.STAR, 1): "right",
+    (TokenType.STAR, 0): 0,
+    (TokenType.AMPERSAND, WORD_MASK): "right",
+    (TokenType.AMPERSAND, 0): 0,
+    (TokenType.PIPE, 0): "right",
+    (TokenType.PIPE, WORD_MASK): WORD_MASK,
+    (TokenType.CARET, 0): "right",
+}
+
+
+class ConstantFolder(expr.Visitor, stmt.Visitor):
+    """
+    Optimisation pass run between semantic analysis and code generation.
+
+    It replaces references to constants with their values, evaluates constant
+    subexpressions with 8-bit wraparound and simplifies algebraic identities
+    such as x + 0, x * 1, x & 0xFF or x << 0. Statements are rewritten in place.
+    The statements must have gone through the Resolver, which binds every
+    constant reference to its declaration.
+
+    A division or modulo whose divisor folds to zero is reported, as it
+    would otherwise only show up as a wrong result at run time.
+    """
+
+    def __init__(self, error) -> None:
+        self.error = error
+
+    def fold(self, statements):
+        try:
+            for statement in statements:
+                self.execute(statement)
+        except error.RuntimeError:
+            self.error.had_error = True
+        return statements
+
+    def execute(self, statement):
+        statement.accept(self)
+
+    def evaluate(self, expression):
+        return expression.accept(self)
+
+    # Statements.
+
+    def visit_block_stmt(self, stmt):
+        for statement in stmt.statements:
+            self.execute(statement)
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression = self.evaluate(stmt.expression)
+
+    def visit_function_stmt(self, stmt):
+        for statement in stmt.body:
+            self.execute(statement)
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value is not None:
+            stmt.value = self.evaluate(stmt.value)
+
+    def visit_if_stmt(self, stmt):
+        stmt.condition = self.evaluate(stmt.condition)
+        self.execute(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.execute(stmt.else_branch)
+
+    def visit_const_stmt(self, stmt):
+        pass
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer is not None:
+            stmt.initializer = self.evaluate(stmt.initializer)
+
+    def visit_while_stmt(self, stmt):
+        stmt.condition = self.evaluate(stmt.condition)
+        self.execute(stmt.body)
+
+    # Expressions.
+
+    def visit_assign_expr(self, expr):
+        expr.value = self.evaluate(expr.value)
+        return expr
+
+    def visit_call_expr(self, expr):
+        expr.callee = self.evaluate(expr.callee)
+        expr.arguments = [self.evaluate(argument)
+                          for argument in expr.arguments]
+        return expr
+
+    def visit_grouping_expr(self, expr_):
+        inner = self.evaluate(expr_.expression)
+        if isinstance(inner, (expr.Literal, expr.Variable, expr.Constant)):
+            return inner
+        expr_.expression = inner
+        return expr_
+
+    def visit_literal_expr(self, expr):
+        return expr
+
+    def visit_constant_expr(self, expr):
+        return expr.binding.value
+
+    def visit_variable_expr(self, expr):
+        return expr
+
+    def visit_unary_expr(self, expr_):
+        expr_.right = self.evaluate(expr_.right)
+        value = numeric(expr_.right)
+        if value is None:
+            return expr_
+
+        match expr_.operator.type:
+            case TokenType.MINUS:
+                return expr.Literal(-value & WORD_MASK)
+            case TokenType.BANG:
+                return expr.Literal(not value)
+        return expr_
+
+    def visit_logical_expr(self, expr_):
+        expr_.left = self.evaluate(expr_.left)
+        expr_.right = self.evaluate(expr_.right)
+        value = numeric(expr_.left)
+        if value is None:
+            return expr_
+
+        # Lox semantics: 'and' yields the left operand when it is falsy,
+        # 'or' yields it when it is truthy; otherwise the right operand.
+        if expr_.operator.type == TokenType.AND:
+            return expr_.right if value else expr_.left
+        return expr_.left if value else expr_.right
+
+    def visit_binary_expr(self, expr_):
+        expr_.left = self.evaluate(expr_.left)
+        expr_.right = self.evaluate(expr_.right)
+        operator = expr_.operator.type
+        left = numeric(expr_.left)
+        right = numeric(expr_.right)
+
+        if right == 0 and operator == TokenType.SLASH:
+            raise error.DivisionByZeroError(expr_.operator, self.error)
+        if right == 0 and operator == TokenType.MODULO:
+            raise error.ModuloByZeroError(expr_.operator, self.error)
+
+        if left is not None and right is not None:
+            if operator in COMPARISON:
+                return expr.Literal(COMPARISON[operator](left, right))
+            if operator in ARITHMETIC:
+                return expr.Literal(ARITHMETIC[operator](left, right) & WORD_MASK)
+            return expr_
+
+        if right is not None:
+            return self.simplify(expr_, RIGHT_IDENTITIES.get(
+                (operator, right)), expr_.left)
+        if left is not None:
+            return self.simplify(expr_, LEFT_IDENTITIES.get(
+                (operator, left)), expr_.right)
+        return expr_
+
+    def simplify(self, binary, identity, operand):
+        """Applies an identity from the tables, keeping side effects intact."""
+        if identity in ("left", "right"):
+            return operand
+        if isinstance(identity, int) and is_pure(operand):
+            return expr.Literal(identity)
+        shift = numeric(binary.right)
+        if (binary.operator.type in (TokenType.LEFT_SHIFT, TokenType.RIGHT_SHIFT)
+                and shift is not None and shift >= 8 and is_pure(operand)):
+            return expr.Literal(0)
+        return binary
+
+
+def count_reads(node, reads, own=None):
+    """
+    Counts, per resolver slot, the Variable and Constant nodes reading it.
+
+    A statement like 'x = x + 1;' only feeds x back into itself, so when the
+    stored value is pure its reads of x are not counted: if nothing else
+    reads x, the whole statement is dead.
+    """
+    if isinstance(node, list):
+        for item in node:
+            count_reads(item, reads, own)
+    elif isinstance(node, (expr.Variable, expr.Constant)):
+        if node.slot != own:
+            reads[node.slot] = reads.get(node.slot, 0) + 1
+    elif (isinstance(node, stmt.Expression) and isinstance(node.expression, expr.Assign)
+          and is_pure(node.expression.value)):
+        count_reads(node.expression.value, reads, node.expression.slot)
+    elif isinstance(node, (expr.Expr, stmt.Stmt)):
+        for name in node.__slots__:
+            count_reads(getattr(node, name), reads, own)
+    return reads
+
+
+class DeadCodeEliminator(expr.Visitor, stmt.Visitor):
+    """
+    Removes code whose effect can never be observed, after ConstantFolder
+    has turned constant conditions into literals:
+
+        - branches that a constant condition never takes (if (false), while (false)),
+        - stores to variables that are never read, keeping any side effects
+          of the stored value,
+        - declarations of constants that are never referenced,
+        - expression statements without side effects, and the empty blocks
+          and ifs left behind,
+        - statements after a return, and functions that are never called.
+
+    Reads are counted per resolver slot, so shadowed variables with the same
+    name are told apart. Removing code can leave more variables unread, so
+    the pass repeats until nothing changes. Statement visitors return the
+    statement to keep, or None to drop it.
+
+    Attributes:
+        removed (int): How many statements and stores were removed.
+    """
+
+    def __init__(self) -> None:
+        self.reads = {}
+        self.removed = 0
+
+    def eliminate(self, statements):
+        while True:
+            removed = self.removed
+            self.reads = count_reads(statements, {})
+            statements = self.execute_all(statements)
+            if self.removed == removed:
+                return statements
+
+    def execute_all(self, statements):
+        kept = []
+        for index, statement in enumerate(statements):
+            statement = self.execute(statement)
+            if statement is not None:
+                kept.append(statement)
+            if isinstance(statement, stmt.Return):
+                self.removed += len(statements) - index - 1
+                break
+        return kept
+
+    def execute(self, statement):
+        return statement.accept(self)
+
+    def evaluate(self, expression):
+        return expression.accept(self)
+
+    def drop(self):
+        self.removed += 1
+        return None
+
+    def is_read(self, node):
+        return self.reads.get(node.slot, 0) > 0
+
+    def effects(self, expression):
+        """Keeps an expression only for its side effects."""
+        if is_pure(expression):
+            return self.drop()
+        return stmt.Expression(expression)
+
+    # Statements.
+
+    def visit_block_stmt(self, stmt):
+        if not stmt.statements:
+            # Not counted: it may be the placeholder branch of an if or while.
+            return None
+        stmt.statements = self.execute_all(stmt.statements)
+        if not stmt.statements:
+            return self.drop()
+        return stmt
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression = self.evaluate(stmt.expression)
+        if is_pure(stmt.expression):
+            return self.drop()
+        return stmt
+
+    def visit_function_stmt(self, stmt):
+        if not self.is_read(stmt):
+            return self.drop()
+        stmt.body = self.execute_all(stmt.body)
+        return stmt
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value is not None:
+            stmt.value = self.evaluate(stmt.value)
+        return stmt
+
+    def visit_if_stmt(self, stmt_):
+        stmt_.condition = self.evaluate(stmt_.condition)
+        value = numeric(stmt_.condition)
+        if value is not None:
+            self.removed += 1
+            taken = stmt_.then_branch if value else stmt_.else_branch
+            return self.execute(taken) if taken is not None else None
+
+        then_branch = self.execute(stmt_.then_branch)
+        else_branch = (self.execute(stmt_.else_branch)
+                       if stmt_.else_branch is not None else None)
+        if then_branch is None and else_branch is None:
+            return self.effects(stmt_.condition)
+        # The lowering always expects a then branch.
+        stmt_.then_branch = then_branch or stmt.Block([])
+        stmt_.else_branch = else_branch
+        return stmt_
+
+    def visit_const_stmt(self, stmt):
+        if not self.is_read(stmt):
+            return self.drop()
+        return stmt
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer is not None:
+            stmt.initializer = self.evaluate(stmt.initializer)
+        if self.is_read(stmt):
+            return stmt
+        if stmt.initializer is None:
+            return self.drop()
+        return self.effects(stmt.initializer)
+
+    def visit_while_stmt(self, stmt_):
+        stmt_.condition = self.evaluate(stmt_.condition)
+        if numeric(stmt_.condition) == 0:
+            return self.drop()
+        stmt_.body = self.execute(stmt_.body) or stmt.Block([])
+        return stmt_
+
+    # Expressions.
+
+    def visit_assign_expr(self, expr):
+        expr.value = self.evaluate(expr.value)
+        if not self.is_read(expr):
+            # The assignment still evaluates to the stored value.
+            self.removed += 1
+            return expr.value
+        return expr
+
+    def visit_binary_expr(self, expr):
+        expr.left = self.evaluate(expr.left)
+        expr.right = self.evaluate(expr.right)
+        return expr
+
+    def visit_call_expr(self, expr):
+        expr.callee = self.evaluate(expr.callee)
+        expr.arguments = [self.evaluate(argument)
+                          for argument in expr.arguments]
+        return expr
+
+    def visit_grouping_expr(self, expr):
+        expr.expression = self.evaluate(expr.expression)
+        return expr
+
+    def visit_literal_expr(self, expr):
+        return expr
+
+    def visit_logical_expr(self, expr):
+        expr.left = self.evaluate(expr.left)
+        expr.right = self.evaluate(expr.right)
+        return expr
+
+    def visit_unary_expr(self, expr):
+        expr.right = self.evaluate(expr.right)
+        return expr
+
+    def visit_constant_expr(self, expr):
+        return expr
+
+    def visit_variable_expr(self, expr):
+        return expr
@@ -5,6 +5,9 @@ from error import ParseError
 
 
 class Parser:
+    """Recursive descent parser. The tokens can be the list returned by
+    Scanner.scan_tokens or a TokenStream that scans them on demand."""
+
     def __init__(self, tokens, error, symbol_table):
         self.error = error
         self.symbol_table = symbol_table
@@ -38,6 +41,8 @@ class Parser:
             return self.for_statement()
         if self.match(TokenType.IF):
             return self.if_statement()
+        if self.match(TokenType.RETURN):
+            return self.return_statement()
         if self.match(TokenType.WHILE):
             return self.while_statement()
         if self.match(TokenType.LEFT_BRACE):
@@ -114,6 +119,15 @@ class Parser:
 
         return If(condition, then_branch, else_branch)
 
+    def return_statement(self):
+        keyword = self.previous()
+        value = None
+        if not self.check(TokenType.SEMICOLON):
+            value = self.expression()
+
+        self.consume(TokenType.SEMICOLON, "Expected ';' after return value.")
+        return Return(keyword, value)
+
     def const_declaration(self):
         name = self.consume(TokenType.IDENTIFIER, "Expected constant name.")
         self.consume(TokenType.EQUAL, "Expected '=' after constant name.")
@@ -179,6 +193,14 @@ class Parser:
     def function(self, kind):
         name = self.consume(TokenType.IDENTIFIER,
                             "Expected " + kind + " name.")
+
+        check = self.symbol_table.lookup(name.lexeme)
+        if check is not None and check.symbol == "const":
+            raise ParseError(
+                name, f"Constant '{name.lexeme}' is already declared.", self.error)
+        # Defined before the body, so the resolver can tell recursion apart
+        # from a call to an undefined function.
+        self.symbol_table.define(name.lexeme, "fn", "")
         self.consume(TokenType.LEFT_PAREN,
                      "Expected '(' after " + kind + " name.")
 
@@ -193,6 +215,8 @@ class Parser:
                 if not self.match(TokenType.COMMA):
                     break
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
+        for parameter in parameters:
+            self.symbol_table.define(parameter.lexeme, "var", "")
         self.consume(TokenType.LEFT_BRACE, f"Expect '{{' before {kind} body.")
         body = self.block()
 
@@ -377,11 +401,11 @@ class Parser:
         if self.match(TokenType.TRUE):
             return Literal(True)
         if self.match(TokenType.NULL):
-            return Literal(None)
+            return Literal(None, self.previous())
 
         if self.match(TokenType.NUMBER, TokenType.STRING):
             self.literal_pool.append(self.previous().literal)
-            return Literal(self.previous().literal)
+            return Literal(self.previous().literal, self.previous())
 
         if self.match(TokenType.IDENTIFIER):
             identifier = self.previous()
@@ -390,7 +414,7 @@ class Parser:
             if check == None:
                 raise ParseError(
                     identifier, f"Undefined identifier '{identifier.lexeme}'.", self.error)
-            if check.symbol == "var":
+            if check.symbol in ("var", "fn"):
                 return Variable(identifier)
             elif check.symbol == "const":
                 return Constant(identifier)
@@ -0,0 +1,144 @@
+import time
+
+import ir as ir
+import loops as loops
+from gvn import number_values
+from inliner import Inliner
+
+
+class PassManager:
+    """
+    Runs optimisation passes over every function of an IR program.
+
+    A pass is any callable taking an ir.Function and rewriting it in place.
+    Passes run in registration order unless placed explicitly with 'before'
+    or 'after', and the time spent in each one is accumulated in timings.
+
+    Attributes:
+        passes (list): (name, pass) pairs in execution order.
+        timings (dict): Pass name -> total seconds spent in it.
+    """
+
+    def __init__(self):
+        self.passes = []
+        self.timings = {}
+
+    def register(self, name, function, before=None, after=None):
+        """
+        Adds a pass to the pipeline.
+
+        Args:
+            name (str): A unique name, used for ordering and in reports.
+            function (callable): The pass, called once per ir.Function.
+            before (str): Run just before the pass with this name.
+            after (str): Run just after the pass with this name.
+        """
+        names = [registered for registered, _ in self.passes]
+        if name in names:
+            raise ValueError(f"Pass '{name}' is already registered.")
+
+        position = len(self.passes)
+        if before is not None:
+            position = names.index(before)
+        elif after is not None:
+            position = names.index(after) + 1
+        self.passes.insert(position, (name, function))
+
+    def unregister(self, name):
+        self.passes = [(registered, function) for registered, function in self.passes
+                       if registered != name]
+
+    def run(self, program):
+        for name, function in self.passes:
+            start = time.perf_counter()
+            for ir_function in program.functions:
+                function(ir_function)
+            self.timings[name] = self.timings.get(
+                name, 0.0) + time.perf_counter() - start
+        return program
+
+    def report(self):
+        """One line per pass with the time it took, in milliseconds."""
+        return '\n'.join(f"{name:<24}{self.timings.get(name, 0.0) * 1000:>10.3f} ms"
+                         for name, _ in self.passes)
+
+
+def simplify_cfg(function):
+    """
+    Cleans up the control-flow graph: constant branches become jumps, jumps
+    through empty blocks go straight to their target, unreachable blocks are
+    dropped, and a block with a single predecessor is merged into it.
+    """
+    changed = True
+    while changed:
+        changed = False
+
+        for block in function.blocks:
+            terminator = block.terminator
+            if isinstance(terminator, ir.Branch) and isinstance(terminator.condition, ir.Const):
+                block.terminator = ir.Jump(
+                    terminator.then_block if terminator.condition.value else terminator.else_block)
+                changed = True
+            elif (isinstance(terminator, ir.CompareBranch) and isinstance(terminator.left, ir.Const)
+                    and isinstance(terminator.right, ir.Const)):
+                holds = ir.compare(terminator.op, terminator.left.value, terminator.right.value)
+                block.terminator = ir.Jump(
+                    terminator.then_block if holds else terminator.else_block)
+                changed = True
+
+            terminator = block.terminator
+            if isinstance(terminator, ir.Jump):
+                target = forward(terminator.target)
+                if target is not terminator.target:
+                    terminator.target = target
+                    changed = True
+            elif isinstance(terminator, (ir.Branch, ir.CompareBranch)):
+                then_block = forward(terminator.then_block)
+                else_block = forward(terminator.else_block)
+                if then_block is not terminator.then_block or else_block is not terminator.else_block:
+                    terminator.then_block, terminator.else_block = then_block, else_block
+                    changed = True
+
+        reachable = set(function.reverse_postorder())
+        if len(reachable) != len(function.blocks):
+            function.blocks = [block for block in function.blocks
+                               if block in reachable]
+            changed = True
+
+        predecessors = function.predecessors()
+        for block in function.blocks:
+            terminator = block.terminator
+            if not isinstance(terminator, ir.Jump):
+                continue
+            target = terminator.target
+            if (target is block or target is function.entry
+                    or len(predecessors[target]) != 1):
+                continue
+            block.instructions += target.instructions
+            block.terminator = target.terminator
+            function.blocks.remove(target)
+            changed = True
+            break
+
+
+def forward(block):
+    """Follows a chain of empty blocks that only jump elsewhere."""
+    seen = set()
+    while (not block.instructions and isinstance(block.terminator, ir.Jump)
+           and block not in seen):
+        seen.add(block)
+        block = block.terminator.target
+    return block
+
+
+def default_pass_manager(level='O2'):
+    passes = PassManager()
+    passes.register("inline", Inliner(level))
+    passes.register("simplify-cfg", simplify_cfg)
+    passes.register("gvn", number_values)
+    passes.register("licm", loops.hoist_invariants)
+    passes.register("strength-reduce", loops.reduce_strength)
+    passes.register("unroll", loops.unroll)
+    # Merges the chains of blocks that unrolling lays out.
+    passes.register("simplify-cfg-late", simplify_cfg)
+    return passes
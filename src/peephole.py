@@ -0,0 +1,219 @@
+import asm as asm
+
+
+# Instructions that set the zero flag from the value they write.
+FLAG_SETTERS = {'ADD', 'SUB', 'NOR', 'AND', 'XOR', 'RSH', 'ADI',
+                'MOV', 'LSH', 'INC', 'DEC', 'NOT', 'NEG'}
+
+ZERO_CONDITIONS = {'EQ', 'NE', '=', '!=', 'Z', 'NZ', 'ZERO', 'NOTZERO'}
+
+
+class Rule:
+    """
+    A declarative rewrite over a window of consecutive lines.
+
+    Pattern lines are templates such as "MOV $a $a" or "JMP $l". Operands
+    starting with '$' bind on first use and must match on every later use,
+    "$l:" matches a label line, and "*" matches any instruction. The
+    replacement lists templates to emit, or integers to keep the matched
+    line at that position unchanged.
+
+    Attributes:
+        name (str): The name used for enabling the rule and counting hits.
+        pattern (list): The templates of the window.
+        replacement (list): What the window is rewritten into.
+        when (callable): An extra condition, called as when(match).
+    """
+
+    def __init__(self, name, pattern, replacement, when=None):
+        self.name = name
+        self.pattern = [asm.parse(line) if line not in ("*",) and not line.endswith(":")
+                        else line for line in pattern]
+        self.replacement = replacement
+        self.when = when
+
+    def match(self, code, index):
+        """Returns the bindings if the window starting at index matches."""
+        if index + len(self.pattern) > len(code):
+            return None
+        bindings = {}
+        for offset, template in enumerate(self.pattern):
+            line = code[index + offset]
+            if template == "*":
+                if line.opcode is None or line.label is not None:
+                    return None
+            elif isinstance(template, str):
+                # A label line: "$l:".
+                if line.label is None or line.opcode is not None:
+                    return None
+                if not bind(bindings, template[:-1], line.label):
+                    return None
+            else:
+                if line.label is not None or line.opcode != template.opcode:
+                    return None
+                if len(line.operands) != len(template.operands):
+                    return None
+                for expected, actual in zip(template.operands, line.operands):
+                    if not bind(bindings, expected, actual):
+                        return None
+        return bindings
+
+
+def bind(bindings, expected, actual):
+    if not expected.startswith('$'):
+        return expected.upper() == actual.upper()
+    if expected in bindings:
+        return bindings[expected] == actual
+    bindings[expected] = actual
+    return True
+
+
+class Match:
+    """The context handed to a rule's condition."""
+
+    def __init__(self, peephole, index, bindings):
+        self.peephole = peephole
+        self.index = index
+        self.bindings = bindings
+
+    def line(self, offset):
+        return self.peephole.code[self.index + offset]
+
+    def dead_after(self, register, offset):
+        """True if the register is not read again after the given window line."""
+        line = self.line(offset)
+        analyzed, live_out = self.peephole.live_out.get(id(line), (None, None))
+        # Lines created during this sweep have no liveness yet.
+        return analyzed is line and self.bindings[register] not in live_out
+
+    def overwritten_at(self, register, offset):
+        """True if the given window line writes the register without reading it."""
+        line = self.line(offset)
+        register = self.bindings[register]
+        return register in line.defs() and register not in line.uses()
+
+    def zero_test_only(self, offset):
+        """True if only the zero flag is read at the branch on the given window
+        line, at its fall-through and at its target."""
+        branch = self.line(offset)
+        if branch.operands[0].upper() not in ZERO_CONDITIONS:
+            return False
+        code = self.peephole.code
+        following = [self.index + offset + 1,
+                     self.peephole.labels.get(branch.target())]
+        for position in following:
+            if position is None:
+                continue
+            while position < len(code) and code[position].opcode is None:
+                position += 1
+            if position < len(code) and code[position].opcode == 'BRH':
+                return False
+        return True
+
+
+RULES = [
+    # MOV r r does nothing, register coalescing leaves many of these behind.
+    Rule("self-move", ["MOV $a $a"], []),
+    # Control falling through to the label anyway.
+    Rule("jump-to-next", ["JMP $l", "$l:"], [1]),
+    Rule("branch-to-next", ["BRH $c $l", "$l:"], [1]),
+    # A load whose value is replaced before anything reads it.
+    Rule("dead-load", ["LDI $a $k", "*"], [1],
+         when=lambda m: m.overwritten_at("$a", 1)),
+    # Only the flags of the second comparison can be observed.
+    Rule("double-compare", ["CMP $a $b", "CMP $c $d"], [1]),
+    # Inverting twice is a copy, and an OR that is inverted again is a NOR.
+    Rule("double-not", ["NOT $a $t", "NOT $t $u"], ["MOV $a $u"],
+         when=lambda m: m.dead_after("$t", 1)),
+    Rule("nor-not-not", ["NOR $a $b $t", "NOT $t $t", "NOT $t $u"], ["NOR $a $b $u"],
+         when=lambda m: m.dead_after("$t", 2)),
+    # The instruction that wrote the value already set the zero flag for it.
+    Rule("redundant-test", ["*", "CMP $x r0", "BRH $c $l"], [0, 2],
+         when=lambda m: (m.line(0).opcode in FLAG_SETTERS
+                         and m.line(0).defs() == [m.bindings["$x"]]
+                         and m.zero_test_only(2))),
+]
+
+
+class Peephole:
+    """
+    Rewrites the final instruction stream with a table of small patterns,
+    sweeping until none of them applies.
+
+    Attributes:
+        rules (list): The enabled rules, in the order they are tried.
+        hits (dict): Rule name -> number of times it fired.
+    """
+
+    def __init__(self, rules=None, disabled=()):
+        self.rules = [rule for rule in (rules if rules is not None else RULES)
+                      if rule.name not in disabled]
+        self.hits = {rule.name: 0 for rule in self.rules}
+        self.code = []
+        self.labels = {}
+        self.live_out = {}
+
+    def optimize(self, lines):
+        self.code = [asm.parse(line) for line in lines]
+        changed = True
+        while changed:
+            self.analyze()
+            changed = self.sweep()
+        return [asm.render(instruction) for instruction in self.code]
+
+    def analyze(self):
+        """Liveness for the rules' conditions, keyed by instruction identity so
+        it stays valid for untouched lines while the sweep rewrites others."""
+        self.index_labels()
+        _, live_out = asm.liveness(self.code, asm.successors(self.code))
+        self.live_out = {id(instruction): (instruction, live)
+                         for instruction, live in zip(self.code, live_out)}
+
+    def index_labels(self):
+        self.labels = {instruction.label: index for index, instruction in enumerate(self.code)
+                       if instruction.label is not None}
+
+    def sweep(self):
+        changed = False
+        index = 0
+        while index < len(self.code):
+            for rule in self.rules:
+                bindings = rule.match(self.code, index)
+                if bindings is None:
+                    continue
+                if rule.when is not None and not rule.when(Match(self, index, bindings)):
+                    continue
+                self.rewrite(rule, index, bindings)
+                self.hits[rule.name] += 1
+                changed = True
+                # Step back so the new lines can start a match too.
+                index = max(index - 2, 0)
+                break
+            else:
+                index += 1
+        return changed
+
+    def rewrite(self, rule, index, bindings):
+        window = self.code[index:index + len(rule.pattern)]
+        replacement = []
+        for item in rule.replacement:
+            if isinstance(item, int):
+                replacement.append(window[item])
+            else:
+                line = item
+                for name, value in bindings.items():
+                    line = line.replace(name, value)
+                replacement.append(asm.parse(line))
+
+        # Keep the blank lines that separated the window from what precedes it.
+        prefix = window[0].prefix
+        if prefix:
+            if replacement:
+                replacement[0].prefix = prefix
+            elif index + len(window) < len(self.code):
+                self.code[index + len(window)].prefix = prefix
+        self.code[index:index + len(window)] = replacement
+        self.index_labels()
+
+    def report(self):
+        return '\n'.join(f"{name:<20}{count:>6}" for name, count in self.hits.items())
@@ -0,0 +1,224 @@
+import asm as asm
+from registers import Registers
+
+
+class RegisterAllocator:
+    """
+    Linear-scan register allocator over the code generator's instruction
+    stream, where every value lives in a virtual register.
+
+    Liveness is computed over the control-flow graph implied by labels,
+    jumps and branches, so values that are live around a loop back edge stay
+    live for the whole loop. Each virtual register gets a single interval
+    and a spill weight that grows tenfold with every level of loop nesting;
+    when more intervals overlap than there are allocatable registers, the
+    one with the lowest weight per instruction it covers is spilled to data
+    RAM with STR/LOD. Spilled values that are never live at once share a
+    slot.
+
+    The code may also name allocatable registers itself, to pass arguments
+    and results. A register written by an instruction is busy until the
+    next instruction reading it, an incoming argument until its first read,
+    and a call clobbers the caller-saved registers. A virtual register only
+    gets a physical one that is not busy, nor clobbered, while it is live.
+
+    Attributes:
+        registers (Registers): Register roles (allocatable, spill scratch, address).
+        spill_base (int): The first data RAM address used for spill slots.
+        assignment (dict): Virtual register -> physical register.
+        spill_slots (dict): Virtual register -> data RAM address.
+        slots (dict): Data RAM address -> the intervals of the virtual
+                      registers spilled there.
+    """
+
+    def __init__(self, registers=None, spill_base=0):
+        self.registers = registers or Registers()
+        self.spill_base = spill_base
+        self.assignment = {}
+        self.spill_slots = {}
+        self.slots = {}
+        self.busy = {}
+        self.clobbered = {}
+
+    def allocate(self, lines, incoming=()):
+        """
+        Returns the instruction lines with every virtual register replaced.
+
+        Args:
+            lines (list): The instruction lines, over virtual registers.
+            incoming (tuple): Physical registers holding values on entry,
+                              such as a function's arguments.
+        """
+        code = [asm.parse(line) for line in lines]
+        successors = asm.successors(code)
+        live_in, _ = asm.liveness(code, successors, asm.is_virtual)
+        intervals = self.intervals(code, live_in)
+        weights = self.weights(code, successors)
+        self.reserve(code, incoming)
+        self.scan(intervals, weights, self.hints(code))
+        return self.rewrite(code)
+
+    def reserve(self, code, incoming):
+        """Finds where the code itself keeps values in allocatable registers."""
+        allocatable = set(self.registers.allocatable)
+        written = [(-1, register) for register in incoming]
+        for index, instruction in enumerate(code):
+            for register in instruction.defs():
+                if register not in allocatable:
+                    continue
+                if register in instruction.operands:
+                    written.append((index, register))
+                else:
+                    self.clobbered.setdefault(register, []).append(index)
+
+        for start, register in written:
+            end = start + 1
+            while end < len(code) and register not in code[end].uses():
+                end += 1
+            self.busy.setdefault(register, []).append((start, end))
+
+    def fits(self, register, physical, interval):
+        """Whether the virtual register can hold the physical one over its interval."""
+        start, end = interval
+        for busy_start, busy_end in self.busy.get(physical, ()):
+            if start < busy_end and busy_start < end:
+                return False
+        return not any(start < index < end for index in self.clobbered.get(physical, ()))
+
+    def intervals(self, code, live_in):
+        """Maps each virtual register to the [start, end] span of instructions it is live in."""
+        intervals = {}
+        for index, instruction in enumerate(code):
+            points = live_in[index].union(
+                r for r in instruction.defs() if asm.is_virtual(r))
+            for register in points:
+                start, end = intervals.get(register, (index, index))
+                intervals[register] = (min(start, index), max(end, index))
+        return intervals
+
+    def weights(self, code, successors):
+        """Spill weights: every read or write counts 10 ** loop depth."""
+        depth = [0] * len(code)
+        for index, targets in enumerate(successors):
+            for target in targets:
+                if target <= index:  # A back edge closes a loop.
+                    for inner in range(target, index + 1):
+                        depth[inner] += 1
+
+        weights = {}
+        for index, instruction in enumerate(code):
+            for register in instruction.uses() + instruction.defs():
+                if asm.is_virtual(register):
+                    weights[register] = weights.get(
+                        register, 0) + 10 ** depth[index]
+        return weights
+
+    def hints(self, code):
+        """Registers joined by a MOV prefer the same physical register."""
+        hints = {}
+        for instruction in code:
+            if instruction.opcode == 'MOV':
+                source, destination = instruction.operands
+                hints.setdefault(destination, source)
+                hints.setdefault(source, destination)
+        return hints
+
+    def scan(self, intervals, weights, hints):
+        allocatable = self.registers.allocatable
+        free = list(allocatable)
+        active = []  # Virtual registers currently holding a physical one.
+
+        for register in sorted(intervals, key=lambda r: intervals[r]):
+            start, end = intervals[register]
+
+            # An interval ending where this one starts can hand over its
+            # register: the instruction reads its operands before writing.
+            for other in list(active):
+                if intervals[other][1] <= start:
+                    active.remove(other)
+                    free.append(self.assignment[other])
+
+            usable = [physical for physical in free
+                      if self.fits(register, physical, intervals[register])]
+            if not usable:
+                holders = [other for other in active
+                           if self.fits(register, self.assignment[other], intervals[register])]
+                victim = min(holders + [register],
+                             key=lambda r: self.spill_cost(r, intervals, weights))
+                if victim == register:
+                    self.spill(register, intervals[register])
+                    continue
+                active.remove(victim)
+                usable = [self.assignment.pop(victim)]
+                free.append(usable[0])
+                self.spill(victim, intervals[victim])
+
+            hint = hints.get(register)
+            preferred = hint if hint in allocatable else self.assignment.get(hint)
+            physical = preferred if preferred in usable else usable[0]
+            free.remove(physical)
+            self.assignment[register] = physical
+            active.append(register)
+
+    def spill_cost(self, register, intervals, weights):
+        """Weight per instruction covered: long-lived, rarely used values go first."""
+        start, end = intervals[register]
+        return weights.get(register, 0) / (end - start + 1)
+
+    def spill(self, register, interval):
+        """Gives the register the first slot holding nothing live over its
+        interval. As with registers, a slot read at the start of the interval
+        can be handed over: the reload comes before the store."""
+        start, end = interval
+        for address, held in self.slots.items():
+            if all(end <= other_start or other_end <= start
+                   for other_start, other_end in held):
+                break
+        else:
+            address = self.spill_base + len(self.slots)
+            self.slots[address] = []
+        self.slots[address].append(interval)
+        self.spill_slots[register] = address
+
+    def memory(self, opcode, register, address):
+        """A LOD or STR between a register and a spill slot."""
+        # Offsets are 4-bit signed, r0 reaches addresses 0 to 7 directly.
+        if address <= 7:
+            return [f"{opcode} r0 {register} {address}"]
+        base = self.registers.address()
+        return [f"LDI {base} {address}", f"{opcode} {base} {register} 0"]
+
+    def rewrite(self, code):
+        lines = []
+        scratch = self.registers.spill()
+        for instruction in code:
+            reloaded = {}
+            loads = []
+            for register in instruction.uses():
+                if register in self.spill_slots and register not in reloaded:
+                    reloaded[register] = scratch[len(reloaded)]
+                    loads += self.memory('LOD', reloaded[register],
+                                         self.spill_slots[register])
+
+            stores = []
+            for register in instruction.defs():
+                if register in self.spill_slots:
+                    # Operands are read before the result is written, so
+                    # the first scratch register is free again.
+                    reloaded.setdefault(register, scratch[0])
+                    stores += self.memory('STR', reloaded[register],
+                                          self.spill_slots[register])
+
+            instruction.operands = [
+                reloaded.get(operand, self.assignment.get(operand, operand))
+                for operand in instruction.operands]
+
+            if loads and (instruction.prefix or instruction.label is not None):
+                # Keep blank lines and labels ahead of the reloads.
+                lines.append(asm.render(asm.Instruction(
+                    instruction.prefix, instruction.label, None, [], "")))
+                instruction.prefix, instruction.label = "", None
+            lines += loads
+            lines.append(asm.render(instruction))
+            lines += stores
+        return lines
@@ -1,27 +1,48 @@
 
+# The calling convention. The first arguments go in r1-r4, in order, and
+# the result comes back in r1. A call may change r1-r4 along with the fixed
+# role registers, while a function saves any of r5-r8 it uses and restores
+# them before returning, so values live across a call belong in r5-r8.
+ARGUMENTS = ('r1', 'r2', 'r3', 'r4')
+RESULT = 'r1'
+CALLER_SAVED = ('r1', 'r2', 'r3', 'r4')
+CALLEE_SAVED = ('r5', 'r6', 'r7', 'r8')
+FIXED_ROLES = ('r9', 'r10', 'r11', 'r12', 'r13', 'r14', 'r15')
+
+
 class Registers():
+    """
+    The BatPU-2 register file as seen by the code generator.
+
+    The code generator emits IR temps as virtual registers (v0, v1, ...)
+    that the RegisterAllocator later maps onto the allocatable registers.
+    The remaining registers have fixed roles in the helper routines from
+    libraries.py and in spill code, and are never allocated.
+    """
 
     def __init__(self) -> None:
-        self.registers = ['r8', 'r7', 'r6', 'r5', 'r4', 'r3', 'r2', 'r1']
+        self.allocatable = ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8']
         self.reg_counter = ['r9']
         self.temp_register = ['r10']
+        self.scratch_register = ['r11']
+        self.spill_registers = ['r12', 'r13']
+        self.address_register = ['r14']
         self.flags_register = ['r15']
 
-    def push(self, register):
-        if register in self.registers:
-            raise ValueError(f"Register {register} in the stack!.")
-        self.registers.append(register)
-
-    def pop(self):
-        if len(self.registers) == 0:
-            raise ValueError("No more registers available!.")
-        return self.registers.pop()
-
     def counter(self):
         return self.reg_counter[0]
 
     def temporal(self):
         return self.temp_register[0]
 
+    def scratch(self):
+        return self.scratch_register[0]
+
+    def spill(self):
+        return self.spill_registers
+
+    def address(self):
+        return self.address_register[0]
+
     def flags(self):
         return self.flags_register[0]
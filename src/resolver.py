@@ -0,0 +1,191 @@
+import error
+import expr as expr
+import stmt as stmt
+from error import (UndefinedVariableError, NotCallableError, ArgumentCountError, RecursiveCallError,
+                   CapturedVariableError, ReturnOutsideFunctionError, InvalidOperandError)
+from symbol_table import SymbolTable
+
+
+class Resolver(expr.Visitor, stmt.Visitor):
+    """
+    Binds every name to its declaration once, so later passes never look
+    names up again.
+
+    The parser checks names against a single global table; the resolver
+    walks the AST with real block scopes instead, and stamps each Var and
+    Const declaration and each Variable, Assign and Constant reference with:
+
+        binding: the symbol_table.Symbol of the declaration. A constant's
+                 symbol holds its initializer as its value.
+        depth:   the scope level of the declaration, 0 being global.
+        slot:    the declaration's storage slot, unique in the program. The
+                 backend maps slots onto registers or data RAM.
+
+    Function declarations get the same stamps, their symbol holding the
+    declaration as its value, plus the slots of their parameters.
+
+    Functions get static frames, so calls are checked here: the callee must
+    be a function taking that many arguments, and no call may reach a
+    function that is still running, which, as functions can only call what
+    is declared before them, means one that encloses the call. A function
+    sees its own locals and the globals; the globals it uses are marked
+    shared, so the backend keeps them in data RAM.
+
+    Attributes:
+        symbol_table (SymbolTable): The scoped table, one symbol per slot.
+        functions (list): The declarations of the functions being resolved,
+                          innermost last, with the scope level of their
+                          parameters.
+    """
+
+    def __init__(self, error) -> None:
+        self.error = error
+        self.symbol_table = SymbolTable()
+        self.functions = []
+
+    def resolve(self, statements):
+        try:
+            for statement in statements:
+                self.execute(statement)
+        except error.RuntimeError:
+            self.error.had_error = True
+        return statements
+
+    def execute(self, statement):
+        statement.accept(self)
+
+    def evaluate(self, expression):
+        expression.accept(self)
+
+    def declare(self, declaration, kind):
+        symbol = self.symbol_table.define(declaration.name.lexeme, kind, "u8")
+        self.bind(declaration, symbol)
+        return symbol
+
+    def reference(self, node):
+        symbol = self.symbol_table.lookup(node.name.lexeme)
+        if symbol is None:
+            # Declared in a scope that has already closed.
+            raise UndefinedVariableError(node.name, node.name.lexeme, self.error)
+        if self.functions and symbol.symbol == "var":
+            frame = self.functions[-1][1]
+            if symbol.scope_level == 0:
+                symbol.shared = True
+            elif symbol.scope_level < frame:
+                raise CapturedVariableError(node.name, node.name.lexeme, self.error)
+        self.bind(node, symbol)
+        return symbol
+
+    def value(self, node):
+        """References a name used as a value, which a function can't be."""
+        symbol = self.reference(node)
+        if symbol.symbol == "fn":
+            raise InvalidOperandError(node.name, node.name.lexeme, self.error)
+
+    def bind(self, node, symbol):
+        node.binding = symbol
+        node.depth = symbol.scope_level
+        node.slot = symbol.slot
+
+    # Statements.
+
+    def visit_block_stmt(self, stmt):
+        self.symbol_table.enter_scope()
+        for statement in stmt.statements:
+            self.execute(statement)
+        self.symbol_table.exit_scope()
+
+    def visit_expression_stmt(self, stmt):
+        self.evaluate(stmt.expression)
+
+    def visit_function_stmt(self, stmt):
+        symbol = self.declare(stmt, "fn")
+        symbol.value = stmt
+
+        self.symbol_table.enter_scope()
+        self.functions.append((stmt, len(self.symbol_table.scopes) - 1))
+        stmt.param_slots = [self.symbol_table.define(param.lexeme, "var", "u8").slot
+                            for param in stmt.params]
+        for statement in stmt.body:
+            self.execute(statement)
+        self.functions.pop()
+        self.symbol_table.exit_scope()
+
+    def visit_return_stmt(self, stmt):
+        if not self.functions:
+            raise ReturnOutsideFunctionError(stmt.keyword, self.error)
+        if stmt.value is not None:
+            self.evaluate(stmt.value)
+
+    def visit_if_stmt(self, stmt):
+        self.evaluate(stmt.condition)
+        self.execute(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.execute(stmt.else_branch)
+
+    def visit_const_stmt(self, stmt):
+        self.evaluate(stmt.initializer)
+        symbol = self.declare(stmt, "const")
+        symbol.value = stmt.initializer
+
+    def visit_var_stmt(self, stmt):
+        # The initializer still sees any outer variable of the same name.
+        if stmt.initializer is not None:
+            self.evaluate(stmt.initializer)
+        self.declare(stmt, "var")
+
+    def visit_while_stmt(self, stmt):
+        self.evaluate(stmt.condition)
+        self.execute(stmt.body)
+
+    # Expressions.
+
+    def visit_assign_expr(self, expr):
+        self.evaluate(expr.value)
+        self.value(expr)
+
+    def visit_binary_expr(self, expr):
+        self.evaluate(expr.left)
+        self.evaluate(expr.right)
+
+    def visit_call_expr(self, expr):
+        callee = expr.callee
+        if not hasattr(callee, 'name'):
+            raise NotCallableError(expr.paren, "(...)", self.error)
+        symbol = self.reference(callee)
+        if symbol.symbol != "fn":
+            raise NotCallableError(callee.name, callee.name.lexeme, self.error)
+
+        declaration = symbol.value
+        if any(function is declaration for function, _ in self.functions):
+            raise RecursiveCallError(callee.name, callee.name.lexeme, self.error)
+        if len(expr.arguments) != len(declaration.params):
+            raise ArgumentCountError(expr.paren, len(declaration.params),
+                                     len(expr.arguments), self.error)
+        for argument in expr.arguments:
+            self.evaluate(argument)
+
+    def visit_grouping_expr(self, expr):
+        self.evaluate(expr.expression)
+
+    def visit_literal_expr(self, expr):
+        # Only booleans and numbers that fit in a byte can be loaded.
+        value = expr.value
+        if isinstance(value, bool):
+            return
+        if isinstance(value, str) and value.isdigit() and int(value) <= 0xFF:
+            return
+        raise InvalidOperandError(expr.token, expr.token.lexeme, self.error)
+
+    def visit_logical_expr(self, expr):
+        self.evaluate(expr.left)
+        self.evaluate(expr.right)
+
+    def visit_unary_expr(self, expr):
+        self.evaluate(expr.right)
+
+    def visit_constant_expr(self, expr):
+        self.reference(expr)
+
+    def visit_variable_expr(self, expr):
+        self.value(expr)
@@ -0,0 +1,190 @@
+"""
+The runtime library: the loops libraries.py expands at every use, as
+subroutines emitted once per program and entered with CAL.
+
+Every routine reads its operands from r10 and r11 and leaves its result in
+a fixed-role register, so a call never touches r1-r8 and the values held
+there stay put across it. Whether a use calls its routine or is expanded
+inline is decided per site by worth_calling.
+"""
+
+# The register contract: the left operand in LEFT, the right one in RIGHT.
+LEFT = 'r10'
+RIGHT = 'r11'
+
+# The instructions a call takes at its site: both operands moved into
+# place, the CAL, and the result moved out.
+CALL_SIZE = 4
+# The cycles a call adds to an inline expansion: the CAL, the RET and the
+# extra operand move.
+CALL_CYCLES = 3
+
+# The cycles a call to the division routine takes at most: eight rounds of
+# its loop and the call sequence.
+DIVIDE_CYCLES = 95
+
+# Optimisation level -> (weight of an instruction of ROM, weight of a cycle
+# spent every time the code runs). -Os only counts ROM, -O2 also counts the
+# cycles, which weigh ten times more with every loop around the site.
+LEVELS = {'O2': (1, 1), 'Os': (1, 0)}
+
+
+class Routine:
+    """
+    A runtime routine and its register contract.
+
+    Attributes:
+        label (str): The label it is called by.
+        result (str): The register holding the result when it returns.
+        clobbers (tuple): Every register it may change, result included.
+        body (list): Its lines, starting with the label.
+        inline (int): The instructions of one inline expansion instead, as
+                      emitted through libraries.py, moving the result included.
+    """
+    __slots__ = ('label', 'result', 'clobbers', 'body', 'inline')
+
+    def __init__(self, label, result, clobbers, body, inline):
+        self.label = label
+        self.result = result
+        self.clobbers = clobbers
+        self.body = [f"\n{label}"] + body
+        self.inline = inline
+
+    @property
+    def size(self):
+        """Its instructions, labels excluded."""
+        return sum(1 for line in self.body if not line.lstrip('\n').startswith('.'))
+
+
+def shift(name, opcode):
+    """LEFT shifted by one bit RIGHT times, counting RIGHT down."""
+    label = f".rt_{name}"
+    return Routine(label, LEFT, (LEFT, RIGHT), [
+        f"CMP {RIGHT} r0",
+        f"BRH EQ {label}_end",
+        f"{opcode} {LEFT} {LEFT}",
+        f"DEC {RIGHT}",
+        f"JMP {label}",
+        f"{label}_end",
+        "RET",
+    ], inline=7)
+
+
+def comparison(name, condition, swapped, inline):
+    """The flags register set to 1, then cleared unless the comparison holds.
+    LDI leaves the flags alone, so it can come before the branch."""
+    label = f".rt_{name}"
+    left, right = (RIGHT, LEFT) if swapped else (LEFT, RIGHT)
+    return Routine(label, 'r15', ('r15',), [
+        "LDI r15 1",
+        f"CMP {left} {right}",
+        f"BRH {condition} {label}_end",
+        "LDI r15 0",
+        f"{label}_end",
+        "RET",
+    ], inline=inline)
+
+
+ROUTINES = {
+    # Shift-and-add over the bits of RIGHT, with r15 as the bit mask.
+    'mul': Routine('.rt_mul', 'r9', ('r9', LEFT, RIGHT, 'r15'), [
+        "LDI r9 0",
+        "LDI r15 1",
+        ".rt_mul_loop",
+        f"CMP {RIGHT} r0",
+        "BRH EQ .rt_mul_end",
+        f"AND {RIGHT} r15 r0",
+        "BRH EQ .rt_mul_skip",
+        f"ADD r9 {LEFT} r9",
+        ".rt_mul_skip",
+        f"LSH {LEFT} {LEFT}",
+        f"RSH {RIGHT} {RIGHT}",
+        "JMP .rt_mul_loop",
+        ".rt_mul_end",
+        "RET",
+    ], inline=13),
+    # Restoring division: every round shifts the top bit of LEFT into the
+    # remainder in r9, and subtracts RIGHT from it when it fits, shifting a
+    # quotient bit into LEFT. A remainder that overflows on the shift is
+    # larger than any divisor. A zero divisor gives 255, remainder LEFT.
+    'div': Routine('.rt_div', LEFT, ('r9', LEFT, RIGHT, 'r15'), [
+        "LDI r9 0",
+        "LDI r15 8",
+        ".rt_div_loop",
+        "LSH r9 r9",
+        "BRH GE .rt_div_over",
+        f"LSH {LEFT} {LEFT}",
+        "BRH LT .rt_div_test",
+        "INC r9",
+        ".rt_div_test",
+        f"CMP r9 {RIGHT}",
+        "BRH LT .rt_div_next",
+        ".rt_div_take",
+        f"SUB r9 {RIGHT} r9",
+        f"INC {LEFT}",
+        ".rt_div_next",
+        "DEC r15",
+        "BRH NE .rt_div_loop",
+        "RET",
+        ".rt_div_over",
+        f"LSH {LEFT} {LEFT}",
+        "BRH LT .rt_div_take",
+        "INC r9",
+        "JMP .rt_div_take",
+    ], inline=19),
+    'shl': shift('shl', 'LSH'),
+    'shr': shift('shr', 'RSH'),
+    'ge': comparison('ge', 'GE', False, inline=6),
+    'gt': comparison('gt', 'LT', True, inline=7),
+    'eq': comparison('eq', 'EQ', False, inline=6),
+    'ne': comparison('ne', 'NE', False, inline=6),
+}
+
+# IR operator -> (the routine computing it, whether it takes the operands
+# swapped). 'not x' is 'x eq 0'.
+OPERATORS = {
+    'mul': ('mul', False),
+    'shl': ('shl', False),
+    'shr': ('shr', False),
+    'ge': ('ge', False),
+    'le': ('ge', True),
+    'gt': ('gt', False),
+    'lt': ('gt', True),
+    'eq': ('eq', False),
+    'ne': ('ne', False),
+    'not': ('eq', False),
+    'div': ('div', False),
+    'mod': ('div', False),
+}
+
+# IR operator -> the register its result is in, when that is not the
+# routine's result: the division routine leaves the remainder in r9.
+RESULTS = {'mod': 'r9'}
+
+# Call label -> (registers read, registers written), for asm.py.
+CONTRACTS = {routine.label: ((LEFT, RIGHT), routine.clobbers)
+             for routine in ROUTINES.values()}
+
+
+def worth_calling(routine, sites, depth, level, inline=None, cycles=CALL_CYCLES):
+    """
+    Whether a use should call the routine rather than expand it inline.
+
+    The ROM a call saves is its inline size less the call sequence and a
+    share of the routine's own body, split over its sites. It is weighed
+    against the cycles the call adds, times 10 ** depth for the loops
+    around the site.
+
+    Args:
+        routine (Routine): The routine the use can call.
+        sites (int): The uses in the program that can call it.
+        depth (int): The loops the use is nested in.
+        level (str): The optimisation level, a key of LEVELS.
+        inline (int): The size of this use's inline expansion, when it is
+                      not routine.inline, as for a constant divisor.
+        cycles (int): The cycles calling adds to the inline expansion.
+    """
+    size, speed = LEVELS[level]
+    inline = routine.inline if inline is None else inline
+    saved = inline - CALL_SIZE - routine.size / sites
+    return size * saved > speed * cycles * 10 ** depth
@@ -1,6 +1,10 @@
 from error import ParseError
 
 
+class IncompleteTree(Exception):
+    """A statement the parser gave up on, and already reported, was reached."""
+
+
 class SemanticAnalizer:
     def __init__(self, error, symbol_table):
         self.error = error
@@ -15,7 +19,7 @@ class SemanticAnalizer:
         try:
             for stmt in statements:
                 self.visit(stmt)
-        except Exception as error:
+        except (ParseError, IncompleteTree):
             return None
 
     def visit(self, node):
@@ -26,6 +30,10 @@ class SemanticAnalizer:
     def generic_visit(self, node):
         raise Exception(f'No visit_{type(node).__name__.lower()} method')
 
+    def visit_nonetype(self, node):
+        # Nothing is checked past a parse error.
+        raise IncompleteTree()
+
     def visit_const(self, node):
         # Constant declaration: const <const> = <initializer>
         const_name = node.name.lexeme
@@ -53,6 +61,10 @@ class SemanticAnalizer:
 
     def visit_variable(self, node):
         # Usage of a variable: <var>
+        symbol = self.symbol_table.lookup(node.name.lexeme)
+        if symbol is not None and symbol.symbol == "fn":
+            # A function used as a value; the resolver reports it.
+            return
         if node.name.lexeme not in self.variables_initialized:
             raise ParseError(node.name,
                              f"Variables must be initialized before use '{node.name.lexeme}'.", self.error)
@@ -64,6 +76,16 @@ class SemanticAnalizer:
         self.visit(node.left)
         self.visit(node.right)
 
+    def visit_grouping(self, node):
+        self.visit(node.expression)
+
+    def visit_logical(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_unary(self, node):
+        self.visit(node.right)
+
     def visit_literal(self, node):
         # Literal value
         value = node.value
@@ -93,5 +115,19 @@ class SemanticAnalizer:
 
     def visit_function(self, node):
         # Function definition: fn <name>(<params>) { <body> }
+        for param in node.params:
+            self.variables_defined.add(param.lexeme)
+            self.variables_initialized.add(param.lexeme)
 
-        self.visit(node.body)
+        for stmt in node.body:
+            self.visit(stmt)
+
+    def visit_call(self, node):
+        # Function call: <callee>(<arguments>)
+        for argument in node.arguments:
+            self.visit(argument)
+
+    def visit_return(self, node):
+        # Return statement: return <value>;
+        if node.value is not None:
+            self.visit(node.value)
@@ -0,0 +1,194 @@
+"""Keeps the compiler loaded and compiles scripts on request.
+
+Usage: python3 server.py [--stdio | socket]
+
+Requests and responses are JSON-RPC 2.0 objects, one per line, read from
+a Unix socket (default: $TIKKI_SOCKET or /tmp/tikki-<uid>.sock) or, with
+--stdio, from standard input. open, edit and close keep documents parsed
+for an editor and only re-parse what an edit touches. Diagnostics are
+{"line", "column", "message", "phase"} records, with a null line and
+column for errors about the whole program. Methods:
+
+    compile   {"source": str, "cache": bool (optional),
+               "level": "O2" | "Os" (optional)}
+              -> {"ok": bool, "assembly": str | null, "diagnostics": list}
+    open      {"uri": str, "source": str} -> {"diagnostics": list}
+    edit      {"uri": str, "start": int, "end": int, "text": str}
+              -> {"diagnostics": list, "reused": dict}
+    close     {"uri": str} -> null
+    ping      {} -> "pong"
+    shutdown  {} -> null, then the server exits
+"""
+import inspect
+import json
+import os
+import socketserver
+import sys
+
+from cache import CompilationCache
+from client import default_socket
+from incremental import Diagnostics, Document
+from main import Tikki
+from runtime import LEVELS
+
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RequestError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class CompilerService:
+    """
+    Answers JSON-RPC requests with the pipeline already imported, so a
+    compile costs only the compilation itself.
+
+    Attributes:
+        cache (CompilationCache): Shared by every request that asks for it.
+        documents (dict): URI -> incremental.Document open in an editor.
+        running (bool): Cleared by the shutdown method.
+    """
+
+    def __init__(self):
+        self.cache = CompilationCache()
+        self.documents = {}
+        self.running = True
+
+    def handle(self, line):
+        """Answers one request line; returns the response line, or None for
+        notifications, which get no reply even when they fail. A line that
+        isn't JSON can't be told apart from a request, so it is answered."""
+        identifier = None
+        notification = False
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RequestError(PARSE_ERROR, "Parse error.")
+            if isinstance(request, dict):
+                identifier = request.get('id')
+                notification = 'id' not in request
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RequestError(INVALID_REQUEST, "Invalid request.")
+            params = request.get('params', {})
+            if not isinstance(params, dict):
+                raise RequestError(INVALID_PARAMS, "Params must be an object.")
+
+            method = getattr(self, 'rpc_' + request['method'], None)
+            if method is None:
+                raise RequestError(METHOD_NOT_FOUND,
+                                   f"Method '{request['method']}' not found.")
+            try:
+                inspect.signature(method).bind(**params)
+            except TypeError as error:
+                raise RequestError(INVALID_PARAMS, str(error))
+            response = {'jsonrpc': '2.0', 'id': identifier, 'result': method(**params)}
+        except RequestError as error:
+            response = {'jsonrpc': '2.0', 'id': identifier,
+                        'error': {'code': error.code, 'message': str(error)}}
+        except Exception as error:
+            # A compiler bug must not take the server down with it.
+            response = {'jsonrpc': '2.0', 'id': identifier,
+                        'error': {'code': INTERNAL_ERROR, 'message': repr(error)}}
+        return None if notification else json.dumps(response)
+
+    def rpc_compile(self, source, cache=True, level='O2'):
+        if not isinstance(source, str):
+            raise RequestError(INVALID_PARAMS, "'source' must be a string.")
+        if level not in LEVELS:
+            raise RequestError(INVALID_PARAMS, "'level' must be 'O2' or 'Os'.")
+        error, assembly = Tikki.compile(source, cache=self.cache if cache else None,
+                                        level=level, error=Diagnostics(source))
+        return {'ok': not error.had_error, 'assembly': assembly,
+                'diagnostics': error.records}
+
+    def rpc_open(self, uri, source):
+        self.documents[uri] = Document(source)
+        return {'diagnostics': self.documents[uri].error.records}
+
+    def rpc_edit(self, uri, start, end, text):
+        document = self.documents.get(uri)
+        if document is None:
+            raise RequestError(INVALID_PARAMS, f"Document '{uri}' is not open.")
+        if not 0 <= start <= end <= len(document.source):
+            raise RequestError(INVALID_PARAMS, "Edit range out of bounds.")
+        document.edit(start, end, text)
+        return {'diagnostics': document.error.records, 'reused': document.reused}
+
+    def rpc_close(self, uri):
+        self.documents.pop(uri, None)
+        return None
+
+    def rpc_ping(self):
+        return "pong"
+
+    def rpc_shutdown(self):
+        self.running = False
+        return None
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.service.handle(line)
+            if response is not None:
+                self.wfile.write(response.encode() + b'\n')
+                self.wfile.flush()
+            if not self.server.service.running:
+                break
+
+
+class Server(socketserver.UnixStreamServer):
+    """Serves one connection at a time; requests are cheap, and serialising
+    them keeps the documents and the cache free of races."""
+
+    def __init__(self, path, service):
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, Handler)
+        self.service = service
+
+
+def serve_stdio(service, input=sys.stdin, output=sys.stdout):
+    for line in input:
+        if not line.strip():
+            continue
+        response = service.handle(line)
+        if response is not None:
+            output.write(response + '\n')
+            output.flush()
+        if not service.running:
+            break
+
+
+def main(args):
+    service = CompilerService()
+    if args == ['--stdio']:
+        serve_stdio(service)
+        return
+    if len(args) > 1 or (args and args[0].startswith('--')):
+        print("Usage: python3 server.py [--stdio | socket]")
+        sys.exit(64)
+
+    path = args[0] if args else default_socket()
+    with Server(path, service) as server:
+        try:
+            while service.running:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,228 @@
+import sys
+
+import asm as asm
+from layout import DATA_SIZE
+
+
+# Pseudo-instructions and the native instruction each one assembles to, as
+# (opcode, operand builder).
+PSEUDO = {
+    'CMP': ('SUB', lambda a, b: [a, b, 'r0']),
+    'MOV': ('ADD', lambda a, c: [a, 'r0', c]),
+    'LSH': ('ADD', lambda a, c: [a, a, c]),
+    'INC': ('ADI', lambda a: [a, '1']),
+    'DEC': ('ADI', lambda a: [a, '-1']),
+    'NOT': ('NOR', lambda a, c: [a, 'r0', c]),
+    'NEG': ('SUB', lambda a, c: ['r0', a, c]),
+}
+
+CONDITIONS = {
+    'EQ': 'zero', '=': 'zero', 'Z': 'zero', 'ZERO': 'zero',
+    'NE': 'notzero', '!=': 'notzero', 'NZ': 'notzero', 'NOTZERO': 'notzero',
+    'GE': 'carry', '>=': 'carry', 'C': 'carry', 'CARRY': 'carry',
+    'LT': 'notcarry', '<': 'notcarry', 'NC': 'notcarry', 'NOTCARRY': 'notcarry',
+}
+
+# Clock cycles per native instruction. The BatPU-2 completes one
+# instruction per clock, taken branches included.
+CYCLES = {opcode: 1 for opcode in ('NOP', 'HLT', 'ADD', 'SUB', 'NOR', 'AND', 'XOR', 'RSH',
+                                   'LDI', 'ADI', 'JMP', 'BRH', 'CAL', 'RET', 'LOD', 'STR')}
+
+CALL_STACK_DEPTH = 16
+
+
+class SimulationError(Exception):
+    pass
+
+
+def number(text):
+    """Parses an immediate: decimal, 0x/0b prefixed, or with leading zeros."""
+    try:
+        return int(text, 0)
+    except ValueError:
+        return int(text)
+
+
+class Simulator:
+    """
+    Assembles and runs BatPU-2 assembly as written by the compiler, header
+    and start-up code included.
+
+    Addresses from DATA_SIZE up are the I/O ports, not data RAM: what is
+    stored there goes to the devices, and loading from one reads its input.
+
+    Attributes:
+        program (list): The assembled (opcode, operands) pairs.
+        labels (dict): Label -> address in program.
+        registers (list): r0 to r15; r0 always reads as zero.
+        memory (list): The bytes of data RAM, below the ports.
+        inputs (dict): Port -> the value loading from it reads, 0 if absent.
+        output (list): (port, value) for every store to a port, in order.
+        zero (bool), carry (bool): The flags.
+        cycles (int): Clock cycles spent so far.
+        executed (int): Native instructions executed so far.
+        profile (dict): Opcode -> number of times it was executed.
+        halted (bool): Whether HLT was reached.
+    """
+
+    def __init__(self, source, max_cycles=1_000_000, inputs=None):
+        self.max_cycles = max_cycles
+        self.inputs = inputs or {}
+        self.program = []
+        self.labels = {}
+        self.assemble(source.splitlines() if isinstance(source, str) else source)
+
+        self.registers = [0] * 16
+        self.memory = [0] * DATA_SIZE
+        self.output = []
+        self.zero = False
+        self.carry = False
+        self.call_stack = []
+        self.pc = 0
+        self.cycles = 0
+        self.executed = 0
+        self.profile = {}
+        self.halted = False
+
+    def assemble(self, lines):
+        for line in lines:
+            instruction = asm.parse(line)
+            if instruction.label is not None:
+                self.labels[instruction.label] = len(self.program)
+            if instruction.opcode is None:
+                continue
+
+            opcode, operands = instruction.opcode, instruction.operands
+            if opcode in PSEUDO:
+                opcode, build = PSEUDO[opcode]
+                operands = build(*operands)
+            if opcode not in CYCLES:
+                raise SimulationError(f"Unknown instruction '{line.strip()}'.")
+            self.program.append((opcode, operands))
+
+        for opcode, operands in self.program:
+            if opcode in ('JMP', 'BRH', 'CAL') and operands[-1] not in self.labels:
+                raise SimulationError(f"Undefined label '{operands[-1]}'.")
+
+    def read(self, register):
+        return self.registers[int(register[1:])]
+
+    def write(self, register, value):
+        index = int(register[1:])
+        if index != 0:
+            self.registers[index] = value & 0xFF
+
+    def set_flags(self, result, carry=False):
+        self.zero = (result & 0xFF) == 0
+        self.carry = carry
+
+    def run(self):
+        """Executes from the first instruction until HLT."""
+        while not self.halted:
+            if self.cycles >= self.max_cycles:
+                raise SimulationError(
+                    f"No HLT after {self.max_cycles} cycles.")
+            self.step()
+        return self
+
+    def step(self):
+        if not 0 <= self.pc < len(self.program):
+            raise SimulationError(f"Program counter out of range: {self.pc}.")
+        opcode, operands = self.program[self.pc]
+        self.pc += 1
+        self.cycles += CYCLES[opcode]
+        self.executed += 1
+        self.profile[opcode] = self.profile.get(opcode, 0) + 1
+
+        match opcode:
+            case 'NOP':
+                pass
+            case 'HLT':
+                self.halted = True
+            case 'ADD':
+                result = self.read(operands[0]) + self.read(operands[1])
+                self.set_flags(result, result > 0xFF)
+                self.write(operands[2], result)
+            case 'SUB':
+                # a + ~b + 1: the carry is set when there is no borrow.
+                a, b = self.read(operands[0]), self.read(operands[1])
+                self.set_flags(a - b, a >= b)
+                self.write(operands[2], a - b)
+            case 'NOR':
+                result = ~(self.read(operands[0]) | self.read(operands[1]))
+                self.set_flags(result)
+                self.write(operands[2], result)
+            case 'AND':
+                result = self.read(operands[0]) & self.read(operands[1])
+                self.set_flags(result)
+                self.write(operands[2], result)
+            case 'XOR':
+                result = self.read(operands[0]) ^ self.read(operands[1])
+                self.set_flags(result)
+                self.write(operands[2], result)
+            case 'RSH':
+                result = self.read(operands[0]) >> 1
+                self.set_flags(result)
+                self.write(operands[1], result)
+            case 'LDI':
+                self.write(operands[0], number(operands[1]))
+            case 'ADI':
+                result = self.read(operands[0]) + (number(operands[1]) & 0xFF)
+                self.set_flags(result, result > 0xFF)
+                self.write(operands[0], result)
+            case 'JMP':
+                self.pc = self.labels[operands[0]]
+            case 'BRH':
+                if self.condition(operands[0]):
+                    self.pc = self.labels[operands[1]]
+            case 'CAL':
+                if len(self.call_stack) >= CALL_STACK_DEPTH:
+                    raise SimulationError("Call stack overflow.")
+                self.call_stack.append(self.pc)
+                self.pc = self.labels[operands[0]]
+            case 'RET':
+                if not self.call_stack:
+                    raise SimulationError("Return with an empty call stack.")
+                self.pc = self.call_stack.pop()
+            case 'LOD':
+                address = (self.read(operands[0]) + number(operands[2])) & 0xFF
+                if address >= DATA_SIZE:
+                    self.write(operands[1], self.inputs.get(address, 0))
+                else:
+                    self.write(operands[1], self.memory[address])
+            case 'STR':
+                address = (self.read(operands[0]) + number(operands[2])) & 0xFF
+                if address >= DATA_SIZE:
+                    self.output.append((address, self.read(operands[1])))
+                else:
+                    self.memory[address] = self.read(operands[1])
+
+    def condition(self, name):
+        match CONDITIONS[name.upper()]:
+            case 'zero':
+                return self.zero
+            case 'notzero':
+                return not self.zero
+            case 'carry':
+                return self.carry
+            case 'notcarry':
+                return not self.carry
+
+    def report(self):
+        lines = [f"Cycles: {self.cycles}",
+                 f"Instructions executed: {self.executed}",
+                 "Registers: " + ' '.join(f"r{index}={value}"
+                                          for index, value in enumerate(self.registers)),
+                 "Memory: " + ' '.join(f"[{address}]={value}"
+                                       for address, value in enumerate(self.memory) if value)]
+        lines += [f"  {opcode:<4}{count:>10}" for opcode, count
+                  in sorted(self.profile.items(), key=lambda item: -item[1])]
+        return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 simulator.py [file.as]")
+        sys.exit(64)
+    with open(sys.argv[1]) as file:
+        print(Simulator(file.read()).run().report())
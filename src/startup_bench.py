@@ -0,0 +1,86 @@
+"""Measures and guards the compiler's cold-start cost.
+
+Usage: python3 startup_bench.py [runs] [budget_ms]
+
+Imports main.py in a fresh interpreter under -X importtime several times
+and reports the median import time of each top-level module and of the
+whole compiler, then times a complete compilation of a small script. It
+exits with 1 if a module that only some runs need is imported at start-up,
+or if the median import time exceeds the budget.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Modules that must stay out of start-up; they are imported on first use.
+DEFERRED = ('colorama', 'concurrent.futures', 'tracemalloc', 'tempfile',
+            'json', 'batch', 'cache', 'server')
+
+SCRIPT = "let a = 3; let b = a * 5; while (b != 0) { b = b - 1; }\n"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times():
+    """Imports main in a new interpreter; returns {module: cumulative µs}."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                             cwd=HERE, capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def compile_time(path):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'main.py', '--no-cache', path],
+                   cwd=HERE, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main(args):
+    runs = int(args[0]) if args else 10
+    budget = float(args[1]) if len(args) > 1 else None
+
+    samples = [import_times() for _ in range(runs)]
+    modules = set().union(*samples)
+    medians = {name: statistics.median(sample.get(name, 0) for sample in samples)
+               for name in modules}
+
+    # Top-level modules are the ones main imports directly; their cumulative
+    # times add up to the cost of importing the compiler.
+    own = {name[:-3] for name in os.listdir(HERE) if name.endswith('.py')} - {'main'}
+    print(f"{'module':<24}{'median':>12}")
+    for name in sorted(own & modules, key=lambda name: -medians[name]):
+        print(f"{name:<24}{medians[name] / 1000:>9.3f} ms")
+    total = medians.get('main', 0) / 1000
+    print(f"{'import main':<24}{total:>9.3f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'startup.tki')
+        with open(path, 'w') as file:
+            file.write(SCRIPT)
+        wall = statistics.median(compile_time(path) for _ in range(runs))
+    print(f"{'compile (wall)':<24}{wall * 1000:>9.3f} ms")
+
+    failed = False
+    for name in DEFERRED:
+        if name in modules:
+            print(f"'{name}' is imported at start-up.")
+            failed = True
+    if budget is not None and total > budget:
+        print(f"Import time {total:.3f} ms is over the {budget} ms budget.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
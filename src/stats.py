@@ -0,0 +1,127 @@
+import time
+from contextlib import contextmanager
+
+import asm as asm
+import expr as expr
+import stmt as stmt
+
+
+class PhaseStats:
+    """
+    What one compiler phase cost.
+
+    Attributes:
+        name (str): The phase name (e.g. 'parse', 'generate').
+        seconds (float): Wall time spent in the phase.
+        allocated (int): Bytes still allocated when the phase ended, net of
+                         what was freed during it.
+        peak (int): Highest traced memory reached during the phase, relative
+                    to where it started.
+        counts (dict): Items the phase produced (e.g. {'tokens': 42}).
+    """
+    __slots__ = ('name', 'seconds', 'allocated', 'peak', 'counts')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.allocated = 0
+        self.peak = 0
+        self.counts = {}
+
+    def as_dict(self):
+        return {'name': self.name, 'seconds': self.seconds, 'allocated': self.allocated,
+                'peak': self.peak, 'counts': self.counts}
+
+
+class Stats:
+    """
+    Records wall time, allocations and item counts for each phase of the
+    compiler pipeline.
+
+    Memory is traced with tracemalloc, which slows the compiler down
+    noticeably, so it only runs while a Stats object is enabled. A disabled
+    Stats keeps its interface but records nothing, letting the pipeline be
+    instrumented unconditionally.
+
+    Attributes:
+        enabled (bool): Whether anything is recorded.
+        phases (list): PhaseStats in the order the phases ran.
+        extra (dict): Additional report sections, e.g. per-pass timings.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = []
+        self.extra = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measures the code run inside the with block as one phase.
+
+        Yields:
+            PhaseStats: The record being filled, so the caller can add counts.
+        """
+        record = PhaseStats(name)
+        if not self.enabled:
+            yield record
+            return
+
+        import tracemalloc
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            record.allocated = current - memory_before
+            record.peak = peak - memory_before
+            if started:
+                tracemalloc.stop()
+            self.phases.append(record)
+
+    def total_seconds(self):
+        return sum(record.seconds for record in self.phases)
+
+    def as_dict(self):
+        return {'phases': [record.as_dict() for record in self.phases],
+                'total_seconds': self.total_seconds(),
+                **self.extra}
+
+    def write(self, path):
+        """Saves the machine-readable report as JSON."""
+        import json
+
+        with open(path, 'w') as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+    def report(self):
+        """A human-readable table, one line per phase."""
+        lines = [f"{'phase':<12}{'time':>12}{'allocated':>14}{'peak':>14}  counts"]
+        for record in self.phases:
+            counts = ', '.join(f"{name}={value}" for name,
+                               value in record.counts.items())
+            lines.append(f"{record.name:<12}{record.seconds * 1000:>9.3f} ms"
+                         f"{record.allocated:>12} B{record.peak:>12} B  {counts}")
+        lines.append(f"{'total':<12}{self.total_seconds() * 1000:>9.3f} ms")
+        return '\n'.join(lines)
+
+
+def count_nodes(node):
+    """Counts the AST nodes reachable from a statement list or a node."""
+    if isinstance(node, list):
+        return sum(count_nodes(item) for item in node)
+    if isinstance(node, (expr.Expr, stmt.Stmt)):
+        return 1 + sum(count_nodes(getattr(node, name)) for name in node.__slots__)
+    return 0
+
+
+def count_instructions(lines):
+    """Counts the assembly lines that hold an instruction, skipping labels."""
+    return sum(1 for line in lines if asm.parse(line).opcode is not None)
@@ -1,6 +1,8 @@
 # This file is auto-generated
 
 class Stmt:
+    __slots__ = ()
+
     def accept(self, visitor):
         pass
 
@@ -24,11 +26,16 @@ class Visitor:
     def visit_var_stmt(self, stmt):
         pass
 
+    def visit_return_stmt(self, stmt):
+        pass
+
     def visit_while_stmt(self, stmt):
         pass
 
 
 class Block(Stmt):
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements
 
@@ -37,6 +44,8 @@ class Block(Stmt):
 
 
 class Expression(Stmt):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -45,16 +54,25 @@ class Expression(Stmt):
 
 
 class Function(Stmt):
+    __slots__ = ('name', 'params', 'body', 'binding', 'depth', 'slot', 'param_slots')
+
     def __init__(self, name, params, body):
         self.name = name
         self.params = params
         self.body = body
+        # Filled in by the Resolver.
+        self.binding = None
+        self.depth = None
+        self.slot = None
+        self.param_slots = None
 
     def accept(self, visitor):
         return visitor.visit_function_stmt(self)
 
 
 class If(Stmt):
+    __slots__ = ('condition', 'then_branch', 'else_branch')
+
     def __init__(self, condition, then_branch, else_branch):
         self.condition = condition
         self.then_branch = then_branch
@@ -65,24 +83,49 @@ class If(Stmt):
 
 
 class Const(Stmt):
+    __slots__ = ('name', 'initializer', 'binding', 'depth', 'slot')
+
     def __init__(self, name, initializer):
         self.name = name
         self.initializer = initializer
+        # Filled in by the Resolver.
+        self.binding = None
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_const_stmt(self)
 
 
 class Var(Stmt):
+    __slots__ = ('name', 'initializer', 'binding', 'depth', 'slot')
+
     def __init__(self, name, initializer):
         self.name = name
         self.initializer = initializer
+        # Filled in by the Resolver.
+        self.binding = None
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_var_stmt(self)
 
 
+class Return(Stmt):
+    __slots__ = ('keyword', 'value')
+
+    def __init__(self, keyword, value):
+        self.keyword = keyword
+        self.value = value
+
+    def accept(self, visitor):
+        return visitor.visit_return_stmt(self)
+
+
 class While(Stmt):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
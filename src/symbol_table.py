@@ -10,9 +10,14 @@ class Symbol:
         symbol (str): The symbol type (e.g., variable, constant or function)
         type (str): The data type of the symbol (e.g., u8, i16, char).
         scope_level (int): The scope in which the symbol is defined (e.g., global or local).
+        slot (int): The symbol's index in SymbolTable.symbols, unique per table.
+        value: The value assigned to the symbol (if any).
+        shared (bool): Whether a global variable is also used by functions,
+                       so it must live in data RAM instead of a register.
     """
+    __slots__ = ('name', 'symbol', 'type', 'scope_level', 'slot', 'value', 'shared')
 
-    def __init__(self, name: str, symbol: str, type: str, scope_level: int, value=None):
+    def __init__(self, name: str, symbol: str, type: str, scope_level: int, value=None, slot: int = 0):
         """
         Initializes a symbol with its name, symbol, type and scope.
 
@@ -22,14 +27,18 @@ class Symbol:
             type (str): The data type or bytes of the symbol.
             scope_level (int): The depth level of the current scope.
             value (optional): The value assigned to the symbol (if any).
+            slot (int): The index the symbol table gave this symbol.
         """
         self.name = name
         self.symbol = symbol
         self.type = type
         self.scope_level = scope_level
+        self.slot = slot
+        self.value = value
+        self.shared = False
 
     def __repr__(self):
-        return f"| name={self.name} | symbol={self.symbol} | type={self.type} | scope={self.scope_level} |\n"
+        return f"| name={self.name} | symbol={self.symbol} | type={self.type} | scope={self.scope_level} | slot={self.slot} |\n"
 
 
 class SymbolTable:
@@ -37,9 +46,20 @@ class SymbolTable:
     A symbol table that tracks variables, functions, constants, and other identifiers.
     It supports multiple scopes, allowing each scope to have its own set of defined symbols.
 
+    Besides the scopes, the table keeps one index from every name to the stack
+    of its visible bindings, innermost last. Looking a name up reads the top of
+    its stack, so it costs the same at any nesting depth, and leaving a scope
+    pops only the names that scope defined.
+
+    Every symbol also gets a slot: its position in the flat list of all the
+    symbols ever defined in the table. Slots are never reused, so the backend
+    can map them to registers or RAM addresses directly.
+
     Attributes:
         scopes (list): A list of dictionaries where each dictionary represents a scope.
                       The first scope is the global scope, and additional scopes are nested.
+        bindings (dict): Name -> list of the Symbols it is bound to, innermost last.
+        symbols (list): Every Symbol defined, indexed by slot.
     """
 
     def __init__(self):
@@ -48,6 +68,8 @@ class SymbolTable:
         """
         self.scopes = [
             {}]  # Start with the global scope as the initial (and only) scope.
+        self.bindings = {}
+        self.symbols = []
 
     def enter_scope(self):
         """
@@ -58,11 +80,15 @@ class SymbolTable:
 
     def exit_scope(self):
         """
-        Exits the current scope by removing the most recent dictionary representing the current scope.
+        Exits the current scope, unbinding the names it defined.
         Raises an error if trying to exit the global scope.
         """
         if len(self.scopes) > 1:
-            self.scopes.pop()
+            for name in self.scopes.pop():
+                stack = self.bindings[name]
+                stack.pop()
+                if not stack:
+                    del self.bindings[name]
         else:
             raise RuntimeError("Cannot exit the global scope.")
 
@@ -75,17 +101,30 @@ class SymbolTable:
             symbol_type (str): The type of the symbol (e.g., u8, function, etc.).
             value (optional): The initial value of the symbol (if applicable).
 
-        The symbol is added to the current (most recent) scope.
+        The symbol is added to the current (most recent) scope. Redefining a name
+        in the same scope replaces its binding there.
+
+        Returns:
+            Symbol: The new symbol, with its slot assigned.
         """
         scope_level = len(self.scopes) - \
             1  # The scope level corresponds to the depth of the current scope.
-        symbol = Symbol(name, symbol, type, scope_level)
+        symbol = Symbol(name, symbol, type, scope_level, slot=len(self.symbols))
+        self.symbols.append(symbol)
+
+        scope = self.scopes[scope_level]
+        stack = self.bindings.setdefault(name, [])
+        if name in scope:
+            stack[-1] = symbol
+        else:
+            stack.append(symbol)
         # Insert symbol into the current scope.
-        self.scopes[scope_level][name] = symbol
+        scope[name] = symbol
+        return symbol
 
     def lookup(self, name: str):
         """
-        Looks up a symbol by its name, starting from the innermost scope and moving outward to global scope.
+        Looks up the innermost visible symbol bound to a name.
 
         Args:
             name (str): The identifier name of the symbol to look up.
@@ -93,11 +132,8 @@ class SymbolTable:
         Returns:
             Symbol: The symbol if it is found, or None if it is not defined.
         """
-        # Search from the innermost scope (most recent) to the global scope (first).
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
-        return None
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
 
     def update(self, name: str, value):
         """
@@ -111,13 +147,11 @@ class SymbolTable:
         Raises:
             RuntimeError: If the symbol is not defined in any scope.
         """
-        # Search from the innermost scope to global scope.
-        for scope in reversed(self.scopes):
-            if name in scope:
-                scope[name].value = value
-                return
-        # Raise an error if symbol is not found.
-        raise RuntimeError(f"Symbol '{name}' not defined.")
+        symbol = self.lookup(name)
+        if symbol is None:
+            # Raise an error if symbol is not found.
+            raise RuntimeError(f"Symbol '{name}' not defined.")
+        symbol.value = value
 
     def __repr__(self):
         return f"SymbolTable(scopes={self.scopes})"
@@ -0,0 +1,77 @@
+class TokenStream:
+    """
+    Lazily pulls tokens from a generator and keeps only the most recent ones
+    in a fixed-size ring buffer.
+
+    The stream is indexed with absolute token positions, just like the list
+    returned by Scanner.scan_tokens, so Parser can use either one. Positions
+    ahead of what has been scanned are pulled on demand; positions that have
+    already fallen out of the buffer raise an IndexError.
+
+    The parse is the same as from the list. Scanning errors are reported as
+    the parser reaches them, though, so they come interleaved with parse
+    errors instead of all before them.
+
+    Attributes:
+        tokens (iterator): The token source, typically RegexScanner.iter_tokens().
+        capacity (int): How many of the most recent tokens are kept.
+        end (int): The number of tokens pulled from the source so far.
+    """
+
+    def __init__(self, tokens, capacity=4):
+        """
+        Initializes the stream over a token iterator.
+
+        Args:
+            tokens (iterable): The tokens to stream; must end with an EOF token.
+            capacity (int): The ring buffer size. Parser needs at least two
+                            slots, one for previous() and one for peek().
+        """
+        if capacity < 2:
+            raise ValueError("TokenStream needs room for at least two tokens.")
+        self.tokens = iter(tokens)
+        self.capacity = capacity
+        self.buffer = [None] * capacity
+        self.end = 0
+        self.start = 0
+        self.pending = None
+        self.pending_start = 0
+
+    def fill(self, index):
+        """Pulls tokens until the given position is buffered or the source runs dry."""
+        while self.end <= index:
+            token = next(self.tokens, None)
+            if token is None:
+                return False
+            self.buffer[self.end % self.capacity] = token
+            self.end += 1
+        self.start = max(0, self.end - self.capacity)
+        return True
+
+    def drain(self):
+        """
+        Buffers the rest of the source on the side, without evicting anything,
+        and returns the total number of tokens in the stream.
+        """
+        if self.pending is None:
+            self.pending_start = self.end
+            self.pending = list(self.tokens)
+            self.tokens = iter(self.pending)
+        return self.pending_start + len(self.pending)
+
+    def __getitem__(self, index):
+        # The parser mostly looks at tokens it already has.
+        if self.start <= index < self.end:
+            return self.buffer[index % self.capacity]
+        if index < 0:
+            # Mirror list semantics: a negative index counts back from the end.
+            index += self.drain()
+            if index >= self.end:
+                return self.pending[index - self.pending_start]
+        elif not self.fill(index):
+            raise IndexError("Token stream exhausted.")
+
+        if index < 0 or index < self.end - self.capacity:
+            raise IndexError(
+                f"Token {index} is no longer buffered (capacity {self.capacity}).")
+        return self.buffer[index % self.capacity]
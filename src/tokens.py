@@ -1,5 +1,6 @@
 class Token:
     """A token represents a unit of code at a specific place in the source text."""
+    __slots__ = ('type', 'lexeme', 'literal', 'line', 'column')
 
     def __init__(self, token_type, lexeme, literal, line, column):
         self.type = token_type
@@ -0,0 +1,140 @@
+"""Compiling programs and running them on the simulator, for the tests."""
+import contextlib
+import io
+
+from error import TikkiError
+from generator import CodeGenerator
+from lexer import RegexScanner
+from lowering import Lowering
+from main import Tikki
+from optimizer import ConstantFolder, DeadCodeEliminator
+from parser import Parser
+from passes import default_pass_manager
+from peephole import Peephole
+from resolver import Resolver
+from semantic import SemanticAnalizer
+from simulator import Simulator
+from symbol_table import SymbolTable
+from tokens import Token
+import tkcode
+
+# Wraps a test body so its result, left in r, can be read from data RAM.
+PRELUDE = "let r = 0;\nfn keep() { return r; }\n"
+
+# Programs and the value each leaves in r, worked out by hand.
+PROGRAMS = [
+    # A counted loop: unrolled fully, its bound and step folded.
+    ("let s = 0; for (let i = 0; i < 4; i = i + 1) { s = s + i; } r = s;", 6),
+    # Too many iterations to unroll fully; an invariant product to hoist.
+    ("let s = 0; let k = 3; for (let i = 0; i < 50; i = i + 1) { s = s + k * 7; } r = s;",
+     50 * 21 & 0xFF),
+    # An induction variable scaled in the loop, for strength reduction.
+    ("let s = 0; for (let i = 0; i < 10; i = i + 1) { s = s ^ (i * 6); } r = s;",
+     0 ^ 6 ^ 12 ^ 18 ^ 24 ^ 30 ^ 36 ^ 42 ^ 48 ^ 54),
+    # Nested loops.
+    ("let s = 0; for (let i = 0; i < 3; i = i + 1) { for (let j = 0; j < 3; j = j + 1)"
+     " { s = s + i * j; } } r = s;", 9),
+    # Repeated computations, some of them after the operands change.
+    ("let a = 9; let b = 4; let c = (a + b) * (b + a); a = a - 1; r = c + (a + b) - (a + b);",
+     (13 * 13) & 0xFF),
+    # A while loop whose trip count isn't known.
+    ("let n = 200; let steps = 0; while (n > 1) { if (n % 2 == 0) { n = n / 2; }"
+     " else { n = 3 * n + 1; } steps = steps + 1; } r = steps;", None),
+    # Functions called once and twice, with an early return.
+    ("fn sq(x) { return x * x; } fn clamp(x) { if (x > 100) { return 100; } return x; }"
+     " r = clamp(sq(5)) + clamp(sq(12)) + sq(3);", (25 + 100 + 9) & 0xFF),
+]
+
+
+def collatz_steps(n):
+    steps = 0
+    while n > 1:
+        n = n // 2 if n % 2 == 0 else (3 * n + 1) & 0xFF
+        steps = (steps + 1) & 0xFF
+    return steps
+
+
+def expected_value(body, value):
+    """The value of one of PROGRAMS, None standing for the Collatz count."""
+    return collatz_steps(200) if value is None else value
+
+
+def compile_source(source, level='O2'):
+    """Returns (assembly text or None on errors, what the compiler printed)."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        _, text = Tikki.compile(source, level=level)
+    return text, output.getvalue()
+
+
+def run(source, level='O2'):
+    """Compiles and runs source, returning the simulator once it halts."""
+    text, output = compile_source(source, level)
+    assert text is not None, output
+    return Simulator(text).run()
+
+
+def result(body, level='O2'):
+    """
+    The value body leaves in the global r. A function reads r, so it lives in
+    data RAM, and being declared first, at address 0.
+    """
+    return run(PRELUDE + body + "\nkeep();\n", level).memory[0]
+
+
+def front_end(source, eliminate=True):
+    """The checked AST after folding and dead code elimination, as
+    Tikki.compile hands it to the code generator."""
+    error = TikkiError(source)
+    symbol_table = SymbolTable()
+    tokens = RegexScanner(source, error).scan_tokens()
+    statements = Parser(tokens, error, symbol_table).parse()
+    SemanticAnalizer(error, symbol_table).analyze(statements)
+    Resolver(error).resolve(statements)
+    statements = ConstantFolder(error).fold(statements)
+    assert not error.had_error
+    return DeadCodeEliminator().eliminate(statements) if eliminate else statements
+
+
+def lower(source):
+    """The unoptimised IR program of source."""
+    return Lowering().lower(front_end(source))
+
+
+def pipeline(without=(), level='O2'):
+    """The default passes, less the named ones."""
+    passes = default_pass_manager(level)
+    for name in without:
+        passes.unregister(name)
+    return passes
+
+
+def assemble(source, passes=None, level='O2', peephole=True):
+    """Compiles source with the given passes, returning (assembly, generator)."""
+    generator = CodeGenerator(passes, level)
+    lines = generator.generate(front_end(source))
+    if peephole:
+        lines = Peephole().optimize(lines)
+    buffer = io.StringIO()
+    tkcode.header(buffer)
+    tkcode.stater(buffer)
+    buffer.write('\n'.join(lines) + "\nJMP .end")
+    return buffer.getvalue(), generator
+
+
+def result_with(body, passes=None, level='O2', peephole=True):
+    """Like result, compiling through assemble."""
+    text, _ = assemble(PRELUDE + body + "\nkeep();\n", passes, level, peephole)
+    return Simulator(text).run().memory[0]
+
+
+def dump(value):
+    """Tokens and trees as plain tuples, so two parses can be compared."""
+    if isinstance(value, list):
+        return [dump(item) for item in value]
+    if isinstance(value, Token):
+        return (value.type, value.lexeme, value.literal, value.line, value.column)
+    if hasattr(value, '__slots__'):
+        slots = [slot for cls in type(value).__mro__ for slot in getattr(cls, '__slots__', ())]
+        return (type(value).__name__,) + tuple(dump(getattr(value, slot)) for slot in slots)
+    return value
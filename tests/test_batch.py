@@ -0,0 +1,59 @@
+import pytest
+
+import batch
+
+
+def test_one_bad_file_does_not_stop_the_batch(tmp_path, monkeypatch):
+    import main
+
+    (tmp_path / "a_good.tki").write_text("let a = 1;\n")
+    (tmp_path / "b_binary.tki").write_bytes(b"let a = \xff\xfe;\n")
+    (tmp_path / "c_crash.tki").write_text("let a = 2;\n")
+    (tmp_path / "d_good.tki").write_text("let a = 3;\n")
+
+    compile_source = main.Tikki.compile.__func__
+
+    def crashing(cls, source, *args, **kwargs):
+        if "2" in source:
+            raise ValueError("boom")
+        return compile_source(cls, source, *args, **kwargs)
+    monkeypatch.setattr(main.Tikki, 'compile', classmethod(crashing))
+
+    paths = batch.collect([str(tmp_path)])
+    results = [batch.compile_file(path, cached=False) for path in paths]
+    assert [result.ok for result in results] == [True, False, False, True]
+    assert "UTF-8" in results[1].output
+    assert "ValueError: boom" in results[2].output
+    assert (tmp_path / "d_good.as").exists()
+
+
+def test_pool_reports_every_file(tmp_path):
+    (tmp_path / "a.tki").write_bytes(b"\xff\xfe")
+    (tmp_path / "b.tki").write_text("let a = 1;\n")
+    results = list(batch.compile_all(batch.collect([str(tmp_path)]), jobs=2, cached=False))
+    assert [result.ok for result in results] == [False, True]
+
+
+@pytest.mark.parametrize("args", [['-x', 'a.tki'], ['-O3', 'a.tki'], ['a.tki', '-'],
+                                  ['-Os', '-o', 'a.tki', 'b.tki']])
+def test_unknown_options_print_the_usage(tmp_path, monkeypatch, capsys, args):
+    from main import Tikki
+
+    (tmp_path / "a.tki").write_text("let a = 1;\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Tikki, 'args', args)
+    with pytest.raises(SystemExit) as exit:
+        Tikki.main()
+    assert exit.value.code == 64
+    assert capsys.readouterr().out.startswith("Usage:")
+    assert not (tmp_path / "a.as").exists()
+
+
+def test_a_level_option_is_accepted(tmp_path, monkeypatch):
+    from main import Tikki
+
+    (tmp_path / "a.tki").write_text("let a = 1;\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Tikki, 'args', ['-Os', '--no-cache', 'a.tki'])
+    Tikki.main()
+    assert (tmp_path / "a.as").exists()
@@ -0,0 +1,98 @@
+import pytest
+
+import ir
+from helpers import PRELUDE, assemble, compile_source, lower, pipeline
+from simulator import Simulator
+
+
+def function_named(program, name):
+    return next(function for function in program.functions if function.name == name)
+
+
+def terminators(function):
+    return [block.terminator for block in function.blocks]
+
+
+def compared(function):
+    """The comparison instructions that materialise a boolean."""
+    return [instruction for block in function.blocks for instruction in block.instructions
+            if isinstance(instruction, ir.Instr) and instruction.op in ir.COMPARE]
+
+
+def body_of(source, name):
+    """The assembly lines of a function, compiled out of line."""
+    text, _ = assemble(source, pipeline(without=['inline']))
+    lines = text.splitlines()
+    start = lines.index(f".{name}") + 1
+    end = next((index for index in range(start, len(lines))
+                if lines[index].startswith((".fn_", ".rt_"))), len(lines))
+    return [line for line in lines[start:end] if line and line != "JMP .end"]
+
+
+@pytest.mark.parametrize("statement", [
+    "if (x < y) { return 1; } return 2;",
+    "while (x >= y) { x = x - 1; } return x;",
+])
+def test_a_comparison_lowers_to_a_compare_branch(statement):
+    program = lower(f"fn f(x, y) {{ {statement} }} let r = f(1, 2);")
+    function = function_named(program, "fn_f")
+    branches = [terminator for terminator in terminators(function)
+                if isinstance(terminator, (ir.Branch, ir.CompareBranch))]
+    assert len(branches) == 1 and isinstance(branches[0], ir.CompareBranch)
+    assert compared(function) == []
+
+
+@pytest.mark.parametrize("statement, condition", [
+    ("if (x < y) { return 1; } return 2;", "GE"),
+    ("while (x != y) { x = x - 1; } return x;", "EQ"),
+])
+def test_a_comparison_is_one_cmp_and_one_brh(statement, condition):
+    lines = body_of(f"let r = 0; fn f(x, y) {{ {statement} }} r = f(1, 2) + f(3, 1);",
+                    "fn_f")
+    assert [line for line in lines if line.startswith("CMP")] == ["CMP r1 r2"]
+    branches = [line for line in lines if line.startswith("BRH")]
+    assert len(branches) == 1 and branches[0].split()[1] == condition
+    # The comparison never goes through the flags register.
+    assert not any("r15" in line for line in lines)
+
+
+@pytest.mark.parametrize("operator", ["and", "or"])
+def test_logical_operators_become_jump_chains(operator):
+    program = lower(f"fn f(x, y) {{ if (x < y {operator} y < 9) {{ return 1; }} return 2; }}"
+                    " let r = f(1, 2);")
+    function = function_named(program, "fn_f")
+    first, second = [terminator for terminator in terminators(function)
+                     if isinstance(terminator, ir.CompareBranch)]
+    assert compared(function) == []
+    if operator == "and":
+        # Only a true left operand goes on to test the right one.
+        assert first.then_block.terminator is second
+        assert first.else_block is second.else_block
+    else:
+        assert first.else_block.terminator is second
+        assert first.then_block is second.then_block
+
+    lines = body_of(f"let r = 0; fn f(x, y) {{ if (x < y {operator} y < 9) {{ return 1; }}"
+                    " return 2; } r = f(1, 2) + f(3, 1);", "fn_f")
+    assert sum(line.startswith("CMP") for line in lines) == 2
+    assert sum(line.startswith("BRH") for line in lines) == 2
+    assert not any("r15" in line for line in lines)
+
+
+@pytest.mark.parametrize("level", ['O2', 'Os'])
+@pytest.mark.parametrize("left, operator, calls", [
+    ("a < b", "and", 1),
+    ("b < a", "and", 0),
+    ("a < b", "or", 0),
+    ("b < a", "or", 1),
+])
+def test_the_right_operand_only_runs_when_needed(left, operator, calls, level):
+    # bump counts its calls in r; a and b are kept from being folded.
+    source = (PRELUDE + "fn bump() { r = r + 1; return 1; }\n"
+              "let a = 1; let b = 2;\n"
+              "while (a == b and b == a) { a = 3; }\n"
+              f"if ({left} {operator} bump() == 1) {{ a = 5; }}\n"
+              "bump(); r = r - 1;\nkeep();\n")
+    text, output = compile_source(source, level)
+    assert text is not None, output
+    assert Simulator(text).run().memory[0] == calls
@@ -0,0 +1,46 @@
+import os
+
+from cache import CompilationCache
+
+
+def test_stores_walk_the_directory_only_when_full(tmp_path, monkeypatch):
+    cache = CompilationCache(str(tmp_path), max_bytes=10_000)
+    walks = []
+    entries = CompilationCache.entries
+    monkeypatch.setattr(CompilationCache, 'entries',
+                        lambda self: walks.append(1) or entries(self))
+
+    for index in range(50):
+        cache.store(cache.key(f"let a = {index};"), "x" * 100)
+    assert len(walks) == 1
+
+    for index in range(100):
+        cache.store(cache.key(f"let b = {index};"), "y" * 100)
+    assert cache.evictions > 0
+    assert sum(size for _, size, _ in entries(cache)) <= 10_000
+    # One walk to fill the total, then one per eviction round, each of
+    # which makes room for a quarter of the cache.
+    assert len(walks) <= 1 + 100 // 25
+
+
+def test_other_caches_in_the_process_share_the_total(tmp_path):
+    first = CompilationCache(str(tmp_path), max_bytes=1000)
+    for index in range(8):
+        first.store(first.key(str(index)), "z" * 100)
+    second = CompilationCache(str(tmp_path), max_bytes=1000)
+    for index in range(8, 16):
+        second.store(second.key(str(index)), "z" * 100)
+    assert sum(size for _, size, _ in second.entries()) <= 1000
+
+
+def test_an_entry_evicted_while_loading_is_a_miss(tmp_path, monkeypatch):
+    cache = CompilationCache(str(tmp_path))
+    key = cache.key("let a = 1;")
+    cache.store(key, "assembly")
+
+    def evicted(path, *args):
+        os.remove(path)
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(os, 'utime', evicted)
+    assert cache.load(key) is None
+    assert (cache.hits, cache.misses) == (0, 1)
@@ -0,0 +1,82 @@
+import pytest
+
+from helpers import PRELUDE, compile_source
+from simulator import Simulator
+
+LEVELS = ('O2', 'Os')
+
+
+def divide(dividend, divisor, op, level, constant=False):
+    """
+    (value left in r, assembly) for the dividend op the divisor. The loop
+    can never run, but its condition keeps the operands from being folded;
+    a constant divisor is written into the expression itself.
+    """
+    right = divisor if constant else 'b'
+    source = (PRELUDE + f"let a = {dividend}; let b = {divisor};\n"
+              "while (a < b and b < a) { a = 1; }\n"
+              f"r = a {op} {right};\nkeep();\n")
+    text, output = compile_source(source, level)
+    assert text is not None, output
+    return Simulator(text).run().memory[0], text
+
+
+def expected(dividend, divisor, op):
+    # A zero divisor gives a quotient of 255 and the dividend as remainder.
+    if divisor == 0:
+        return 255 if op == '/' else dividend
+    return dividend // divisor if op == '/' else dividend % divisor
+
+
+@pytest.mark.parametrize("level", LEVELS)
+@pytest.mark.parametrize("op", ['/', '%'])
+@pytest.mark.parametrize("dividend, divisor", [
+    (200, 7), (7, 200), (0, 1), (255, 1), (255, 255), (254, 255), (128, 3),
+    (255, 16), (129, 128), (200, 0), (0, 0), (255, 0),
+])
+def test_division_by_a_variable(dividend, divisor, op, level):
+    value, text = divide(dividend, divisor, op, level)
+    assert ".div_loop_" in text or "CAL .rt_div" in text
+    assert value == expected(dividend, divisor, op)
+
+
+@pytest.mark.parametrize("level", LEVELS)
+@pytest.mark.parametrize("op", ['/', '%'])
+@pytest.mark.parametrize("divisor", [3, 5, 6, 7, 10, 100, 255])
+def test_division_by_a_constant(divisor, op, level):
+    for dividend in (0, 1, divisor - 1, divisor, 200, 255):
+        value, text = divide(dividend, divisor, op, level, constant=True)
+        assert ".div_skip_" in text or "CAL .rt_div" in text
+        assert value == expected(dividend, divisor, op)
+
+
+def test_a_constant_divisor_is_a_subtraction_chain_at_O2():
+    _, text = divide(200, 7, '/', 'O2', constant=True)
+    lines = text.splitlines()
+    # 7 shifted left as far as it fits in a byte, then less and less, each
+    # compared and subtracted once.
+    steps = [int(line.split()[-1]) for line, after in zip(lines, lines[1:])
+             if line.startswith("LDI") and after.startswith("CMP")]
+    assert steps == [224, 112, 56, 28, 14, 7]
+    assert sum(line.startswith(".div_skip_") for line in lines) == 6
+    assert ".div_loop_" not in text and ".rt_div" not in text
+
+
+def test_a_constant_divisor_calls_the_routine_at_Os():
+    # The unrolled chain is larger than a call.
+    _, text = divide(200, 7, '/', 'Os', constant=True)
+    assert "CAL .rt_div" in text and ".div_skip_" not in text
+
+
+@pytest.mark.parametrize("level", LEVELS)
+def test_the_shared_routine_serves_every_site(level):
+    source = (PRELUDE + "let a = 200; let b = 7; let c = 0; let d = 9;\n"
+              "while (a < b and b < a) { a = 1; c = 1; d = 1; }\n"
+              "r = (a / b) ^ (a % d) ^ (d / c) ^ (a % c);\nkeep();\n")
+    text, output = compile_source(source, level)
+    assert text is not None, output
+    if level == 'Os':
+        lines = text.splitlines()
+        assert lines.count(".rt_div") == 1
+        assert lines.count("CAL .rt_div") == 4
+    assert Simulator(text).run().memory[0] == (200 // 7) ^ (200 % 9) ^ 255 ^ 200
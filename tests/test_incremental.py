@@ -0,0 +1,198 @@
+import random
+
+import pytest
+
+from helpers import dump
+from incremental import Diagnostics, Document
+from lexer import RegexScanner
+from parser import Parser
+from semantic import SemanticAnalizer
+from symbol_table import SymbolTable
+
+SETS = ('variables_defined', 'variables_initialized', 'variables_used',
+        'constants_defined', 'constants_used')
+
+PROGRAM = ("let a = 1;\n"
+           "let b = a + 2;\n"
+           "fn f(x) { return x + b; }\n"
+           "let c = f(3);\n")
+
+
+def state(tokens, statements, symbol_table, literal_pool, analyzer, records):
+    return {
+        'tokens': dump(tokens),
+        'statements': None if statements is None else dump(statements),
+        'symbols': [dump(symbol) for symbol in symbol_table.symbols],
+        'bindings': {name: [symbol.slot for symbol in stack]
+                     for name, stack in symbol_table.bindings.items()},
+        'literal_pool': list(literal_pool),
+        'sets': {name: getattr(analyzer, name) for name in SETS},
+        'diagnostics': records,
+    }
+
+
+def full_parse(source):
+    """What parsing and checking source from scratch gives."""
+    error = Diagnostics(source)
+    symbol_table = SymbolTable()
+    tokens = RegexScanner(source, error).scan_tokens()
+    parser = Parser(tokens, error, symbol_table)
+    statements = parser.parse()
+    analyzer = SemanticAnalizer(error, symbol_table)
+    if statements is not None:
+        analyzer.analyze(statements)
+    return state(tokens, statements, symbol_table, parser.literal_pool, analyzer,
+                 error.records)
+
+
+def document_state(document):
+    return state(document.tokens, document.statements, document.symbol_table,
+                 document.literal_pool, document.analyzer, document.error.records)
+
+
+def edit(document, old, new):
+    """Replaces the only occurrence of old and checks the document against a
+    full parse of the new text."""
+    assert document.source.count(old) == 1
+    start = document.source.index(old)
+    document.edit(start, start + len(old), new)
+    assert document_state(document) == full_parse(document.source)
+    return document.reused
+
+
+def full_analysis(source):
+    error = Diagnostics(source)
+    symbol_table = SymbolTable()
+    statements = Parser(RegexScanner(source, error).scan_tokens(), error,
+                        symbol_table).parse()
+    analyzer = SemanticAnalizer(error, symbol_table)
+    analyzer.analyze(statements)
+    return error.records, analyzer
+
+
+@pytest.mark.parametrize('source', [
+    "let c;\nlet a = 1;\nlet b = (c + 1);",
+    "let c;\nlet a = 1;\nlet b = -c;",
+    "let c;\nlet a = 1;\nif (a == 1 and c == 2) { a = 3; }",
+    "let a = 1;\nlet b = (c + 1);\nlet c = 2;",
+    "let a = (1 + 2);\nlet b = -a;\nlet c = (b);",
+    "let a = 1;\nwhile (a < 3) { let = ; a = a + 1; }\nlet c;\nlet b = c;",
+])
+def test_check_matches_a_full_analysis(source):
+    records, analyzer = full_analysis(source)
+    document = Document(source)
+    assert document.error.records == records
+    assert document.analyzer.variables_initialized == analyzer.variables_initialized
+
+
+def test_uninitialized_variables_inside_groupings_are_reported():
+    records, _ = full_analysis("let c;\nlet b = (c + 1);")
+    assert [record['message'] for record in records] == [
+        " at 'c': Variables must be initialized before use 'c'."]
+
+
+def test_check_lets_analyzer_bugs_through(monkeypatch):
+    def broken(self, node):
+        raise KeyError(node)
+    monkeypatch.setattr(SemanticAnalizer, 'visit_binary', broken)
+    with pytest.raises(KeyError):
+        Document("let a = 1 + 2;")
+
+
+def test_a_new_document_matches_a_full_parse():
+    document = Document(PROGRAM)
+    assert document_state(document) == full_parse(PROGRAM)
+    assert document.reused == {'tokens': 0, 'declarations': 0}
+
+
+def reused_declarations(document, old):
+    """Which declarations of the document are the old objects."""
+    return [declaration in old for declaration in document.declarations]
+
+
+def test_an_edit_inside_one_declaration_reuses_the_others():
+    document = Document(PROGRAM)
+    old = list(document.declarations)
+    # Scanning restarts at `=`, the last token before the edit, and stops at
+    # the `;` after it: 4 of the 33 tokens are new.
+    assert edit(document, "a + 2", "a + 7") == {'tokens': 29, 'declarations': 3}
+    assert reused_declarations(document, old) == [True, False, True, True]
+
+
+def test_an_edit_across_declarations():
+    document = Document(PROGRAM)
+    old = list(document.declarations)
+    assert edit(document, "1;\nlet b", "4;\nlet b") == {'tokens': 28, 'declarations': 2}
+    assert reused_declarations(document, old) == [False, False, True, True]
+
+
+def test_an_edit_across_declarations_that_renames():
+    document = Document(PROGRAM)
+    # Line 2 moves one column right, so all of it is scanned again.
+    assert edit(document, "1;\nlet b", "5;\nlet bb") == {'tokens': 23, 'declarations': 0}
+    assert document.statements[1].name.lexeme == "bb"
+    # f now mentions an undefined b; nothing is reused past an error.
+    assert [record['message'] for record in document.error.records] == [
+        " at 'b': Undefined identifier 'b'."]
+
+
+@pytest.mark.parametrize("old, broken", [
+    ("a + 2", "a + @"),   # A scanning error.
+    ("a + 2", "a + "),    # A parse error.
+    ("x + b", "x + d"),   # An undefined name.
+])
+def test_adding_and_removing_an_error(old, broken):
+    document = Document(PROGRAM)
+    edit(document, old, broken)
+    assert document.error.records
+    edit(document, broken, old)
+    assert document.error.records == []
+    assert document_state(document) == full_parse(PROGRAM)
+
+
+def test_an_error_is_parsed_in_full_once_fixed():
+    document = Document(PROGRAM)
+    edit(document, "a + 2", "a + ")
+    # The previous text had a parse error, so nothing is reused.
+    assert edit(document, "a + ", "a + 2") == {'tokens': 0, 'declarations': 0}
+
+
+def test_redefining_a_name_reparses_the_declarations_that_mention_it():
+    document = Document(PROGRAM)
+    old = list(document.declarations)
+    # b mentions a, so it is parsed again; f and c are reused.
+    assert edit(document, "let a = 1;", "const a = 1;") == {'tokens': 28, 'declarations': 2}
+    assert reused_declarations(document, old) == [False, False, True, True]
+    assert type(document.statements[1].initializer.left).__name__ == "Constant"
+
+
+def test_redefining_a_function_as_a_variable():
+    document = Document(PROGRAM)
+    old = list(document.declarations)
+    edit(document, "fn f(x) { return x + b; }", "let f = b;")
+    # b is parsed again as the edit starts at its lookahead, and c mentions
+    # f, which is no longer a function.
+    assert document.reused['declarations'] == 1
+    assert reused_declarations(document, old) == [True, False, False, False]
+
+
+def test_a_semantic_error_appears_and_goes_with_edits():
+    document = Document(PROGRAM)
+    edit(document, "let a = 1;", "let a;")
+    assert [record['message'] for record in document.error.records] == [
+        " at 'a': Variables must be initialized before use 'a'."]
+    edit(document, "let a;", "let a = 4;")
+    assert document.error.records == []
+
+
+def test_random_edits_match_a_full_parse():
+    generator = random.Random(0)
+    snippets = ["let ", "const ", "fn g(y) { return y; }", "a", "b", "f(1)", " + ", "(",
+                ")", ";", "\n", "1", "{", "}", "@", "if (a) { b = 1; }", " "]
+    document = Document(PROGRAM)
+    for _ in range(300):
+        start = generator.randint(0, len(document.source))
+        end = min(len(document.source), start + generator.choice([0, 0, 1, 3]))
+        text = "".join(generator.choice(snippets) for _ in range(generator.randint(0, 2)))
+        document.edit(start, end, text)
+        assert document_state(document) == full_parse(document.source), document.source
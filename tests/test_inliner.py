@@ -0,0 +1,39 @@
+import pytest
+
+from helpers import compile_source, result
+from inliner import ROM_SIZE
+from stats import count_instructions
+
+
+def chain(length):
+    """Functions f1 to f<length>, each calling the next one twice."""
+    lines = [f"fn f{length}(x) {{ let y = x + 3; return y ^ 5; }}"]
+    for index in range(length - 1, 0, -1):
+        lines.append(f"fn f{index}(x) {{ let a = f{index + 1}(x); "
+                     f"let b = f{index + 1}(a + 1); return a + b; }}")
+    return "\n".join(lines)
+
+
+def expected(length, x):
+    if length == 1:
+        return ((x + 3) & 0xFF) ^ 5
+    a = expected(length - 1, x)
+    return (a + expected(length - 1, (a + 1) & 0xFF)) & 0xFF
+
+
+@pytest.mark.parametrize("level", ['O2', 'Os'])
+def test_call_chains_do_not_blow_up(level):
+    sizes = []
+    for length in range(2, 9):
+        text, output = compile_source(chain(length) + "\nlet r = f1(2);", level)
+        assert text is not None, output
+        sizes.append(count_instructions(text.splitlines()))
+    assert sizes[-1] < ROM_SIZE // 4
+    # Each link adds about a function, not a copy of the chain below it.
+    assert all(later - earlier < 32 for earlier, later in zip(sizes, sizes[1:]))
+
+
+@pytest.mark.parametrize("length", [1, 3, 6])
+@pytest.mark.parametrize("level", ['O2', 'Os'])
+def test_inlined_chains_compute_the_same(length, level):
+    assert result(chain(length) + "\nr = f1(2);", level) == expected(length, 2)
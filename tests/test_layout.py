@@ -0,0 +1,21 @@
+from helpers import compile_source
+from layout import DATA_SIZE
+
+
+def globals_read_by_a_function(count):
+    source = "".join(f"let g{index} = {index % 200};\n" for index in range(count))
+    source += "fn total() { let s = 0;\n"
+    source += "".join(f"s = s + g{index};\n" for index in range(count))
+    return source + "return s; }\nlet r = total();\n"
+
+
+def test_data_stops_below_the_io_ports():
+    assert DATA_SIZE == 240
+    text, output = compile_source(globals_read_by_a_function(DATA_SIZE - 1))
+    assert text is not None, output
+
+
+def test_data_past_the_io_ports_is_an_error():
+    text, output = compile_source(globals_read_by_a_function(250))
+    assert text is None
+    assert "needs 250 bytes of data RAM, only 240 are available" in output
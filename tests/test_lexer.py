@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from lexer import RegexScanner, Scanner
+
+
+class Recorder:
+    """Collects reports instead of printing them."""
+
+    def __init__(self):
+        self.reports = []
+        self.had_error = False
+
+    def report(self, token, message, phase="Syntax"):
+        self.reports.append((token.line, token.column, message, phase))
+
+
+CORPUS = [
+    "",
+    "let a = 1;",
+    "const MAX = 200;\nlet b = MAX - 3 * (4 + 5);",
+    "fn add(x, y) { return x + y; }\nlet c = add(1, 2);",
+    "if (a <= 3 and b >= 4 or !c) { a = a << 1; } else { b = b >> 2; }",
+    "while (a != 0) { a = a - 1; }\nfor (let i = 0; i < 8; i = i + 1) { }",
+    "a = a & 15 | 3 ^ 1 % 4 / 2;",
+    "// a line comment\nlet d = 7; // trailing\n/* a block\n comment */ let e = 8;",
+    "let s = \"a string\";\nlet t = \"over\ntwo lines\";",
+    "\tlet\ttabs = 1;\r\n  let spaces = 2;\f\v",
+    "true false null [ ] , .",
+    # Errors.
+    "let a = 1 @ 2;",
+    "let b = #;\nlet c = $ ~ `;",
+    "let s = \"never closed;",
+    "/* never closed",
+    "let a = 1;\n  ? ",
+    "/",
+    "\"",
+]
+
+
+def scan(scanner_class, source):
+    reporter = Recorder()
+    tokens = scanner_class(source, reporter).scan_tokens()
+    return ([(token.type, token.lexeme, token.literal, token.line, token.column)
+             for token in tokens], reporter.reports)
+
+
+def random_sources(count, seed=0):
+    pieces = ["let", "fn", "if", "x", "y1", "_z", "42", "007", " ", "\n", "\t", "(", ")",
+              "{", "}", ";", "=", "==", "!", "!=", "<", "<=", "<<", ">", ">=", ">>", "+",
+              "-", "*", "/", "%", "&", "|", "^", "//", "/*", "*/", "\"", "@", "#", "é"]
+    generator = random.Random(seed)
+    return ["".join(generator.choice(pieces) for _ in range(generator.randint(1, 40)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("source", CORPUS + random_sources(300))
+def test_regex_scanner_matches_scanner(source):
+    assert scan(RegexScanner, source) == scan(Scanner, source)
+
+
+def test_errors_are_reported_with_their_position():
+    _, reports = scan(RegexScanner, "let a = 1 @ 2;")
+    assert reports == [(1, 11, "Unexpected character: '@'.", "Syntax")]
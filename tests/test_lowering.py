@@ -0,0 +1,31 @@
+import pytest
+
+from helpers import compile_source, result
+
+
+@pytest.mark.parametrize("body, expected", [
+    ("let a = 7; r = a + (a = 5);", 12),
+    ("let a = 7; r = (a) - (a = 5);", 2),
+    ("let a = 7; r = (a * 1) + (a = 5);", 12),
+    ("let a = 7; r = (a = 5) + a;", 10),
+    ("let a = 7; let b = 0; if (a > (a = 5)) { b = 1; } r = b;", 1),
+    ("let a = 7; fn f(x, y) { return x - y; } r = f(a, a = 5);", 2),
+])
+def test_operands_are_read_left_to_right(body, expected):
+    assert result(body) == expected
+
+
+@pytest.mark.parametrize("source", [
+    "let a = null;",
+    'let a = "hi";',
+    "let a = 300;",
+    'const K = "x"; let a = 1;',
+])
+def test_literals_without_a_byte_value_are_errors(source):
+    text, output = compile_source(source)
+    assert text is None
+    assert "Invalid operand" in output
+
+
+def test_largest_byte_literal_compiles():
+    assert result("r = 255;") == 255
@@ -0,0 +1,51 @@
+import pytest
+
+import expr
+from helpers import compile_source, front_end, result
+from optimizer import DeadCodeEliminator
+
+
+@pytest.mark.parametrize("expression, value", [
+    ("200 + 100", 44),
+    ("7 - 9", 254),
+    ("-1", 255),
+    ("3 << 7", 128),
+    ("255 >> 3", 31),
+    ("17 / 5", 3),
+    ("17 % 5", 2),
+    ("6 * 7 & 60 | 1 ^ 3", (6 * 7 & 60) | (1 ^ 3)),
+    ("(4 > 3) + (2 == 2) + (1 >= 2)", 2),
+    ("!0 + !9", 1),
+    ("2 < 3 and 0 or 5", 5),
+])
+def test_folded_constants_wrap_like_the_machine(expression, value):
+    declaration, = front_end(f"let x = {expression};", eliminate=False)
+    assert isinstance(declaration.initializer, expr.Literal)
+    assert result(f"r = {expression};") == value
+
+
+@pytest.mark.parametrize("body, value", [
+    ("let a = 7; r = a * 1 + 0;", 7),
+    ("let a = 7; r = (a - a) + (a ^ a) + (a & 0);", 0),
+    ("let a = 7; r = a * 0 + 3;", 3),
+    ("let a = 200; r = a + 100;", 44),
+])
+def test_identities_keep_the_value(body, value):
+    assert result(body) == value
+
+
+def test_unused_variables_are_eliminated():
+    statements = front_end("let unused = 5; let a = 1; if (0) { a = 2; }", eliminate=False)
+    eliminator = DeadCodeEliminator()
+    assert eliminator.eliminate(statements) == []
+    assert eliminator.removed >= 2
+
+
+@pytest.mark.parametrize("source, message", [
+    ("let a = 1 / 0;", "Division by zero"),
+    ("let b = 3; let a = b % (2 - 2);", "Modulo by zero"),
+])
+def test_constant_division_by_zero_is_an_error(source, message):
+    text, output = compile_source(source)
+    assert text is None
+    assert message in output
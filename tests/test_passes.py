@@ -0,0 +1,87 @@
+import pytest
+
+import ir
+import loops
+from gvn import number_values
+from helpers import PROGRAMS, expected_value, lower, pipeline, result_with
+from inliner import Inliner
+from passes import simplify_cfg
+
+NAMES = [name for name, _ in pipeline().passes]
+
+
+@pytest.mark.parametrize("body, value", PROGRAMS)
+def test_default_pipeline_computes_the_program(body, value):
+    assert result_with(body) == expected_value(body, value)
+
+
+@pytest.mark.parametrize("name", NAMES)
+@pytest.mark.parametrize("body, value", PROGRAMS)
+def test_each_pass_preserves_the_program(name, body, value):
+    # Dropping a pass leaves the others to run on code it would have
+    # changed, so every pass is checked both with and without its peers.
+    assert result_with(body, pipeline(without=[name])) == expected_value(body, value)
+    only = pipeline(without=[other for other in NAMES if other != name])
+    assert result_with(body, only) == expected_value(body, value)
+
+
+def function_named(program, name):
+    return next(function for function in program.functions if function.name == name)
+
+
+def instructions(function, blocks=None):
+    return [instruction for block in (blocks or function.blocks)
+            for instruction in block.instructions]
+
+
+def test_value_numbering_reuses_a_repeated_sum():
+    program = lower("fn f(x, y) { return (x + y) * (y + x); } let r = f(1, 2);")
+    function = function_named(program, "fn_f")
+    assert [instruction.op for instruction in instructions(function)].count('add') == 2
+    number_values(function)
+    ops = [instruction.op for instruction in instructions(function)]
+    assert ops.count('add') == 1
+
+
+def test_invariant_code_leaves_the_loop():
+    program = lower("fn f(x, n) { let s = 0; while (n > 0) { s = s + x * 3; n = n - 1; }"
+                    " return s; } let r = f(1, 2);")
+    function = function_named(program, "fn_f")
+    simplify_cfg(function)
+    loop, = loops.find_loops(function)
+    assert 'mul' in [instruction.op for instruction in instructions(function, loop.blocks)]
+    loops.hoist_invariants(function)
+    loop, = loops.find_loops(function)
+    assert 'mul' not in [instruction.op for instruction in instructions(function, loop.blocks)]
+    assert 'mul' in [instruction.op for instruction in instructions(function)]
+
+
+def test_strength_reduction_removes_the_multiply_from_the_loop():
+    program = lower("fn f(n) { let s = 0; for (let i = 0; i < n; i = i + 1) { s = s + i * 5; }"
+                    " return s; } let r = f(3);")
+    function = function_named(program, "fn_f")
+    simplify_cfg(function)
+    loop, = loops.find_loops(function)
+    assert 'mul' in [instruction.op for instruction in instructions(function, loop.blocks)]
+    loops.reduce_strength(function)
+    loop, = loops.find_loops(function)
+    assert 'mul' not in [instruction.op for instruction in instructions(function, loop.blocks)]
+
+
+def test_constant_loop_is_unrolled_away():
+    program = lower("fn f(x) { let s = x; for (let i = 0; i < 4; i = i + 1) { s = s + i; }"
+                    " return s; } let r = f(3);")
+    function = function_named(program, "fn_f")
+    simplify_cfg(function)
+    assert len(loops.find_loops(function)) == 1
+    loops.unroll(function)
+    assert loops.find_loops(function) == []
+
+
+def test_single_call_site_is_inlined():
+    program = lower("fn f(x) { return x + 1; } let r = f(3);")
+    assert any(isinstance(instruction, ir.Call)
+               for instruction in instructions(program.functions[0]))
+    Inliner()(program.functions[0])
+    assert not any(isinstance(instruction, ir.Call)
+                   for instruction in instructions(program.functions[0]))
@@ -0,0 +1,25 @@
+import pytest
+
+from helpers import PROGRAMS, expected_value, result_with
+from peephole import Peephole
+
+
+@pytest.mark.parametrize("lines, optimized", [
+    (["MOV r1 r1", "ADD r1 r2 r3"], ["ADD r1 r2 r3"]),
+    (["JMP .next", ".next", "HLT"], [".next", "HLT"]),
+    (["LDI r1 5", "LDI r1 6", "STR r0 r1 0"], ["LDI r1 6", "STR r0 r1 0"]),
+    (["CMP r1 r2", "CMP r3 r4", "BRH EQ .x", ".x", "HLT"], ["CMP r3 r4", ".x", "HLT"]),
+])
+def test_rules(lines, optimized):
+    assert Peephole().optimize(lines) == optimized
+
+
+def test_a_load_read_later_stays():
+    lines = ["LDI r1 5", "ADD r1 r1 r2", "LDI r1 6", "STR r0 r2 0"]
+    assert Peephole().optimize(lines)[:2] == lines[:2]
+
+
+@pytest.mark.parametrize("body, value", PROGRAMS)
+def test_peephole_preserves_the_program(body, value):
+    assert result_with(body, peephole=False) == expected_value(body, value)
+    assert result_with(body) == expected_value(body, value)
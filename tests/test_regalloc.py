@@ -0,0 +1,51 @@
+from functools import reduce
+
+from helpers import assemble, result_with, PRELUDE
+from simulator import Simulator
+
+
+def pressure(count):
+    """A function holding count values at once, called twice so it stays
+    out of line."""
+    names = [f"a{index}" for index in range(count)]
+    lets = " ".join(f"let {name} = x + {index * 3 + 1};" for index, name in enumerate(names))
+    total = " ^ ".join(names)
+    return f"fn f(x) {{ {lets} return {total}; }} r = f(1) + f(2);"
+
+
+def expected(count):
+    def f(x):
+        return reduce(lambda left, right: left ^ right,
+                      [(x + index * 3 + 1) & 0xFF for index in range(count)])
+    return (f(1) + f(2)) & 0xFF
+
+
+def test_values_past_the_registers_are_spilled_and_restored():
+    text, generator = assemble(PRELUDE + pressure(12) + "\nkeep();\n")
+    allocator = next(allocator for function, allocator in generator.allocators.items()
+                     if function.name == "fn_f")
+    assert allocator.spill_slots
+    assert Simulator(text).run().memory[0] == expected(12)
+
+
+def test_values_never_live_together_share_a_slot():
+    # Two bursts of pressure, one after the other.
+    first = " ".join(f"let a{index} = x + {index};" for index in range(12))
+    second = " ".join(f"let b{index} = s + {index};" for index in range(12))
+    body = (f"fn f(x) {{ {first} let s = {' ^ '.join(f'a{index}' for index in range(12))};"
+            f" {second} return {' ^ '.join(f'b{index}' for index in range(12))}; }}"
+            " r = f(1) + f(2);")
+    text, generator = assemble(PRELUDE + body + "\nkeep();\n")
+    allocator = next(allocator for function, allocator in generator.allocators.items()
+                     if function.name == "fn_f")
+    assert len(allocator.slots) < len(allocator.spill_slots)
+
+    def f(x):
+        s = reduce(lambda left, right: left ^ right, [x + index for index in range(12)])
+        return reduce(lambda left, right: left ^ right, [s + index for index in range(12)])
+    assert Simulator(text).run().memory[0] == (f(1) + f(2)) & 0xFF
+
+
+def test_spills_at_both_levels():
+    for level in ('O2', 'Os'):
+        assert result_with(pressure(14), level=level) == expected(14)
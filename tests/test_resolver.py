@@ -0,0 +1,117 @@
+import pytest
+
+import expr
+import stmt
+from incremental import Diagnostics
+from lexer import RegexScanner
+from main import Tikki
+from parser import Parser
+from resolver import Resolver
+from symbol_table import SymbolTable
+
+
+def diagnostics(source):
+    error = Diagnostics(source)
+    _, text = Tikki.compile(source, error=error)
+    assert text is None
+    return [(record['phase'], record['message']) for record in error.records]
+
+
+@pytest.mark.parametrize("source, message", [
+    ("fn f(x) { return f(x); } let a = f(1);",
+     "Recursive call to 'f': function frames are static."),
+    ("fn outer(x) { fn inner() { return x; } return inner(); } let a = outer(1);",
+     "Cannot use 'x' here: functions only see their own locals and globals."),
+    ("let a = 1; { let b = 2; fn g() { return b; } a = g(); }",
+     "Cannot use 'b' here: functions only see their own locals and globals."),
+    ("fn f(x) { return x; } let a = f(1, 2);", "Expected 1 arguments but got 2."),
+    ("fn f(x, y) { return x; } let a = f(1);", "Expected 2 arguments but got 1."),
+    ("let v = 1; let a = v(2);", "'v' is not a function."),
+    ("let a = (1)(2);", "'(...)' is not a function."),
+    ("let a = 1; return a;", "Cannot return from top-level code."),
+    ("{ let b = 1; } let a = b;", "Undefined variable 'b'."),
+])
+def test_resolution_errors(source, message):
+    assert diagnostics(source) == [("Resolution", message)]
+
+
+@pytest.mark.parametrize("literal", ["256", "1000", '"text"', "null"])
+def test_literals_without_a_byte_value_are_rejected(literal):
+    assert diagnostics(f"let a = {literal};") == [("Type", f"Invalid operand: '{literal}'.")]
+
+
+def test_a_function_is_not_a_value():
+    assert diagnostics("fn f() { return 1; } let a = f;") == [("Type", "Invalid operand: 'f'.")]
+
+
+@pytest.mark.parametrize("literal", ["0", "255", "true", "false"])
+def test_byte_literals_are_accepted(literal):
+    _, text = Tikki.compile(f"let a = {literal};", error=Diagnostics(""))
+    assert text is not None
+
+
+def resolve(source):
+    error = Diagnostics(source)
+    statements = Parser(RegexScanner(source, error).scan_tokens(), error,
+                        SymbolTable()).parse()
+    resolver = Resolver(error)
+    resolver.resolve(statements)
+    assert error.records == []
+    return statements, resolver
+
+
+def references(node, found):
+    """Every Variable and Assign under node, in source order."""
+    if isinstance(node, list):
+        for item in node:
+            references(item, found)
+    elif isinstance(node, (expr.Variable, expr.Assign)):
+        if isinstance(node, expr.Assign):
+            references(node.value, found)
+        found.append(node)
+    elif isinstance(node, (expr.Expr, stmt.Stmt)):
+        for slot in type(node).__slots__:
+            if slot not in ('binding', 'name'):
+                references(getattr(node, slot), found)
+    return found
+
+
+def test_shadowed_names_are_bound_to_their_own_declarations():
+    statements, resolver = resolve(
+        "let x = 1;\n"
+        "fn f(x) { let y = x; { let x = 2; y = y + x; } return y + x; }\n"
+        "{ let x = 3; x = x + 1; }\n"
+        "let z = x;\n")
+    global_x, function, block, z = statements
+    inner_x = function.body[1].statements[0]
+    block_x = block.statements[0]
+    param_x = function.param_slots[0]
+
+    # Every declaration gets its own slot.
+    slots = [global_x.slot, param_x, inner_x.slot, block_x.slot, z.slot]
+    assert len(set(slots)) == len(slots)
+    assert (global_x.depth, inner_x.depth, block_x.depth) == (0, 2, 1)
+
+    def bound(node):
+        return [(reference.name.lexeme, reference.depth, reference.slot)
+                for reference in references(node, [])]
+
+    # let y = x reads the parameter; the inner block's x shadows it; the
+    # return reads the parameter again.
+    assert bound(function.body) == [
+        ('x', 1, param_x),
+        ('y', 1, function.body[0].slot), ('x', 2, inner_x.slot),
+        ('y', 1, function.body[0].slot),
+        ('y', 1, function.body[0].slot), ('x', 1, param_x),
+    ]
+    assert bound(block) == [('x', 1, block_x.slot), ('x', 1, block_x.slot)]
+    assert bound(z) == [('x', 0, global_x.slot)]
+    assert references(z, [])[0].binding is global_x.binding
+    # Only globals a function reads are shared.
+    assert not global_x.binding.shared
+    assert resolver.symbol_table.symbols[param_x].name == 'x'
+
+
+def test_a_global_used_in_a_function_is_shared():
+    statements, _ = resolve("let g = 1; let h = 2; fn f() { return g; } let a = f();")
+    assert statements[0].binding.shared and not statements[1].binding.shared
@@ -0,0 +1,84 @@
+import pytest
+
+import ir
+import runtime
+from generator import CodeGenerator
+from helpers import PRELUDE, compile_source
+from simulator import Simulator
+
+# Globals the compiler can't fold: the loop never runs, but nothing proves it.
+OPAQUE = ("let a = 13; let b = 7; let c = 5; let n = 3;\n"
+          "while (a < b and b < a) { a = 1; b = 1; c = 1; n = 1; }\n")
+
+# Three multiplies at the top level and one in a loop.
+PROGRAM = (OPAQUE + "let s = a * b;\nlet t = b * c;\nlet i = 0;\n"
+           "while (i < n) { s = s + c * i; i = i + 1; }\n"
+           "r = s ^ t ^ a * c;\nkeep();\n")
+PROGRAM_VALUE = (13 * 7 + 5 * (0 + 1 + 2)) & 0xFF ^ 7 * 5 ^ 13 * 5
+
+
+def compile_program(source, level):
+    text, output = compile_source(PRELUDE + source, level)
+    assert text is not None, output
+    return text, text.splitlines()
+
+
+@pytest.mark.parametrize("name", runtime.ROUTINES)
+def test_a_single_site_is_expanded(name):
+    # Its body and the call sequence are larger than one expansion.
+    for level in runtime.LEVELS:
+        assert not runtime.worth_calling(runtime.ROUTINES[name], 1, 0, level)
+
+
+@pytest.mark.parametrize("name", runtime.ROUTINES)
+def test_Os_calls_a_routine_used_often_even_in_loops(name):
+    routine = runtime.ROUTINES[name]
+    assert runtime.worth_calling(routine, 20, 0, 'Os')
+    assert runtime.worth_calling(routine, 20, 3, 'Os')
+
+
+@pytest.mark.parametrize("name", runtime.ROUTINES)
+def test_O2_expands_every_site_in_a_loop(name):
+    for sites in (2, 5, 50):
+        assert not runtime.worth_calling(runtime.ROUTINES[name], sites, 1, 'O2')
+
+
+def test_O2_calls_outside_loops_only_when_the_rom_saved_outweighs_the_cycles():
+    # A multiply saves 13 - 4 - 11 / 2 = 3.5 instructions a site, more than
+    # the 3 cycles a call adds; a shift saves 7 - 4 - 6 / 2 = 0.
+    assert runtime.worth_calling(runtime.ROUTINES['mul'], 2, 0, 'O2')
+    assert not runtime.worth_calling(runtime.ROUTINES['shl'], 2, 0, 'O2')
+    assert not runtime.worth_calling(runtime.ROUTINES['shl'], 50, 0, 'O2')
+
+
+def test_a_constant_divisor_weighs_its_own_expansion():
+    division = ir.Instr('div', ir.Temp(1), [ir.Temp(2), ir.Const(7)])
+    size, cycles = CodeGenerator.expansion(division)
+    assert size == 2 + 5 * 6
+    routine = runtime.ROUTINES['div']
+    assert runtime.worth_calling(routine, 1, 0, 'Os', size, cycles)
+    assert not runtime.worth_calling(routine, 1, 0, 'O2', size, cycles)
+
+
+def test_Os_emits_one_shared_body_for_every_site():
+    text, lines = compile_program(PROGRAM, 'Os')
+    assert lines.count(".rt_mul") == 1
+    assert lines.count("CAL .rt_mul") == 4
+    assert not any(line.startswith(".mul_loop_") for line in lines)
+    assert Simulator(text).run().memory[0] == PROGRAM_VALUE
+
+
+def test_O2_keeps_the_site_in_the_loop_inline():
+    text, lines = compile_program(PROGRAM, 'O2')
+    assert lines.count(".rt_mul") == 1
+    assert lines.count("CAL .rt_mul") == 3
+    assert sum(line.startswith(".mul_loop_") for line in lines) == 1
+    assert Simulator(text).run().memory[0] == PROGRAM_VALUE
+
+
+@pytest.mark.parametrize("level", runtime.LEVELS)
+def test_a_lone_site_emits_no_routine(level):
+    text, lines = compile_program(OPAQUE + "r = a * b;\nkeep();\n", level)
+    assert not any(line.startswith(".rt_") for line in lines)
+    assert sum(line.startswith(".mul_loop_") for line in lines) == 1
+    assert Simulator(text).run().memory[0] == 13 * 7 & 0xFF
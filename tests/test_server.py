@@ -0,0 +1,87 @@
+import json
+import threading
+
+import pytest
+
+from client import Client, describe
+from server import CompilerService, Server
+
+
+def compile_request(service, source, **params):
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': 'compile',
+               'params': dict(source=source, cache=False, **params)}
+    return json.loads(service.handle(json.dumps(request)))['result']
+
+
+def test_compile_returns_structured_diagnostics():
+    result = compile_request(CompilerService(), "let a = 1;\nlet b = 1 / 0;")
+    assert not result['ok'] and result['assembly'] is None
+    assert result['diagnostics'] == [{'line': 2, 'column': 11, 'phase': 'Arithmetic',
+                                      'message': "Division by zero is not allowed."}]
+
+
+def test_a_clean_compile_has_no_diagnostics():
+    result = compile_request(CompilerService(), "let a = 1;")
+    assert result['ok'] and result['diagnostics'] == []
+    assert "Defined Variables" not in result['assembly']
+
+
+def test_program_wide_errors_have_no_position():
+    source = "".join(f"let g{index} = 1;\n" for index in range(250))
+    source += "fn f() { let s = 0;\n" + "".join(f"s = s + g{index};\n" for index in range(250))
+    source += "return s; }\nlet r = f();\n"
+    diagnostic, = compile_request(CompilerService(), source)['diagnostics']
+    assert (diagnostic['line'], diagnostic['phase']) == (None, 'Memory')
+    assert describe(diagnostic).startswith("[MemoryError] in the program: ")
+
+
+@pytest.mark.parametrize("request_", [
+    {'jsonrpc': '2.0', 'method': 'nonexistent'},
+    {'jsonrpc': '2.0', 'method': 'compile', 'params': {'wrong': 1}},
+    {'jsonrpc': '2.0', 'method': 'compile', 'params': []},
+    {'jsonrpc': '2.0', 'method': 'compile', 'params': {'source': "let a = 1;", 'level': 'O9'}},
+    {'jsonrpc': '2.0', 'method': 'edit',
+     'params': {'uri': 'missing', 'start': 0, 'end': 0, 'text': ''}},
+    {'jsonrpc': '2.0', 'method': 7},
+])
+def test_failed_notifications_get_no_reply(request_):
+    service = CompilerService()
+    assert service.handle(json.dumps(request_)) is None
+    # The same request with an id is answered with the error.
+    response = json.loads(service.handle(json.dumps(dict(request_, id=3))))
+    assert response['id'] == 3 and 'error' in response
+
+
+def test_a_notification_still_runs():
+    service = CompilerService()
+    request = {'jsonrpc': '2.0', 'method': 'open', 'params': {'uri': 'a', 'source': "let a;"}}
+    assert service.handle(json.dumps(request)) is None
+    assert 'a' in service.documents
+
+
+def test_a_null_id_is_a_request():
+    response = json.loads(CompilerService().handle(
+        json.dumps({'jsonrpc': '2.0', 'id': None, 'method': 'nonexistent'})))
+    assert response['id'] is None and 'error' in response
+
+
+def test_a_line_that_is_not_json_is_answered():
+    response = json.loads(CompilerService().handle("{not json"))
+    assert response['id'] is None and response['error']['code'] == -32700
+
+
+def test_client_passes_the_level(tmp_path):
+    path = str(tmp_path / "tikki.sock")
+    service = CompilerService()
+    with Server(path, service) as server:
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        client = Client(path)
+        source = "fn f(x) { return x * 3 + x * 5; } let r = f(1) + f(2) + f(3);"
+        sizes = {level: len(client.compile(source, level)['assembly'].splitlines())
+                 for level in ('O2', 'Os')}
+        with pytest.raises(RuntimeError, match="'level' must be"):
+            client.compile(source, 'O3')
+        client.close()
+        thread.join()
+    assert sizes['Os'] <= sizes['O2']
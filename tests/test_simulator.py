@@ -0,0 +1,165 @@
+import pytest
+
+from layout import DATA_SIZE
+from simulator import CALL_STACK_DEPTH, SimulationError, Simulator
+
+
+def run(*lines, **options):
+    return Simulator(list(lines) + ["HLT"], **options).run()
+
+
+@pytest.mark.parametrize("a, b, result, zero, carry", [
+    (1, 2, 3, False, False),
+    (200, 100, 44, False, True),
+    (128, 128, 0, True, True),
+    (0, 0, 0, True, False),
+])
+def test_add_wraps_and_sets_the_carry(a, b, result, zero, carry):
+    simulator = run(f"LDI r1 {a}", f"LDI r2 {b}", "ADD r1 r2 r3")
+    assert simulator.registers[3] == result
+    assert (simulator.zero, simulator.carry) == (zero, carry)
+
+
+@pytest.mark.parametrize("a, b, result, zero, carry", [
+    (5, 3, 2, False, True),
+    (3, 5, 254, False, False),
+    (5, 5, 0, True, True),
+    (0, 255, 1, False, False),
+])
+def test_sub_sets_the_carry_when_nothing_is_borrowed(a, b, result, zero, carry):
+    simulator = run(f"LDI r1 {a}", f"LDI r2 {b}", "SUB r1 r2 r3")
+    assert simulator.registers[3] == result
+    assert (simulator.zero, simulator.carry) == (zero, carry)
+
+
+def test_adi_inc_and_dec():
+    simulator = run("LDI r1 255", "INC r1")
+    assert simulator.registers[1] == 0 and simulator.zero and simulator.carry
+    simulator = run("LDI r1 1", "DEC r1")
+    assert simulator.registers[1] == 0 and simulator.zero
+    simulator = run("LDI r1 0", "DEC r1")
+    assert simulator.registers[1] == 255 and not simulator.carry
+
+
+@pytest.mark.parametrize("line, result", [
+    ("NOR r1 r2 r3", ~(0b1100 | 0b1010) & 0xFF),
+    ("AND r1 r2 r3", 0b1000),
+    ("XOR r1 r2 r3", 0b0110),
+    ("RSH r1 r3", 0b0110),
+    ("LSH r1 r3", 0b11000),
+    ("NOT r1 r3", ~0b1100 & 0xFF),
+    ("NEG r1 r3", 256 - 0b1100),
+    ("MOV r1 r3", 0b1100),
+])
+def test_logic_and_pseudo_instructions(line, result):
+    assert run("LDI r1 12", "LDI r2 10", line).registers[3] == result
+
+
+def test_logic_clears_the_carry():
+    simulator = run("LDI r1 200", "ADD r1 r1 r2", "AND r1 r0 r3")
+    assert simulator.zero and not simulator.carry
+
+
+def test_r0_always_reads_zero():
+    simulator = run("LDI r0 5", "LDI r1 7", "ADD r1 r0 r0", "ADD r0 r1 r2")
+    assert simulator.registers[0] == 0 and simulator.registers[2] == 7
+
+
+def test_cmp_only_sets_the_flags():
+    simulator = run("LDI r1 3", "LDI r2 3", "CMP r1 r2")
+    assert simulator.zero and simulator.carry
+    assert simulator.registers[:3] == [0, 3, 3]
+
+
+def test_ldi_leaves_the_flags_alone():
+    simulator = run("LDI r1 3", "CMP r1 r1", "LDI r2 9")
+    assert simulator.zero and simulator.carry
+
+
+@pytest.mark.parametrize("a, b", [(3, 3), (3, 5), (5, 3), (0, 255), (255, 0)])
+@pytest.mark.parametrize("conditions, holds", [
+    (("EQ", "=", "Z", "ZERO"), lambda a, b: a == b),
+    (("NE", "!=", "NZ", "NOTZERO"), lambda a, b: a != b),
+    (("GE", ">=", "C", "CARRY"), lambda a, b: a >= b),
+    (("LT", "<", "NC", "NOTCARRY"), lambda a, b: a < b),
+])
+def test_branch_conditions_after_a_compare(a, b, conditions, holds):
+    for condition in conditions:
+        simulator = run(f"LDI r1 {a}", f"LDI r2 {b}", "CMP r1 r2", f"BRH {condition} .taken",
+                        "LDI r3 1", "HLT", ".taken", "LDI r3 2")
+        assert simulator.registers[3] == (2 if holds(a, b) else 1), condition
+
+
+def test_jmp():
+    assert run("JMP .skip", "LDI r1 1", ".skip", "LDI r2 2").registers[1:3] == [0, 2]
+
+
+def test_calls_return_to_their_sites():
+    simulator = run("CAL .outer", "LDI r3 3", "HLT",
+                    ".outer", "LDI r1 1", "CAL .inner", "ADI r1 10", "RET",
+                    ".inner", "LDI r2 2", "RET")
+    assert simulator.registers[1:4] == [11, 2, 3]
+    assert simulator.call_stack == []
+
+
+def test_the_call_stack_holds_sixteen_returns():
+    def nested(depth):
+        lines = [f"CAL .f{0}", "HLT"]
+        for level in range(depth):
+            lines += [f".f{level}", f"CAL .f{level + 1}", "RET"]
+        return lines + [f".f{depth}", "RET"]
+    # The first CAL and depth more.
+    run(*nested(CALL_STACK_DEPTH - 1))
+    with pytest.raises(SimulationError, match="overflow"):
+        run(*nested(CALL_STACK_DEPTH))
+
+
+def test_ret_with_an_empty_stack_fails():
+    with pytest.raises(SimulationError, match="empty call stack"):
+        run("RET")
+
+
+def test_lod_and_str_add_the_offset_to_the_base():
+    simulator = run("LDI r1 10", "LDI r2 42", "STR r1 r2 3", "STR r1 r2 -2", "STR r0 r2 7",
+                    "LDI r4 13", "LOD r4 r5 0", "LOD r1 r6 -2", "LOD r0 r7 7")
+    assert [simulator.memory[address] for address in (13, 8, 7)] == [42, 42, 42]
+    assert simulator.registers[5:8] == [42, 42, 42]
+
+
+def test_stores_to_the_ports_are_output_not_memory():
+    simulator = run("LDI r1 240", "LDI r2 3", "STR r1 r2 0", "STR r1 r2 10",
+                    "LDI r2 1", "STR r1 r2 2")
+    assert len(simulator.memory) == DATA_SIZE == 240
+    assert not any(simulator.memory)
+    assert simulator.output == [(240, 3), (250, 3), (242, 1)]
+
+
+def test_loads_from_the_ports_read_their_input():
+    simulator = run("LDI r1 255", "LOD r1 r2 0", "LOD r1 r3 -1", inputs={255: 7})
+    assert simulator.registers[2:4] == [7, 0]
+
+
+def test_addresses_wrap_around_the_byte():
+    # 250 + 7 wraps to data RAM address 1, 250 - 8 is port 242.
+    simulator = run("LDI r1 250", "LDI r2 9", "STR r1 r2 7", "STR r1 r2 -8")
+    assert simulator.memory[1] == 9
+    assert simulator.output == [(242, 9)]
+
+
+def test_every_instruction_takes_one_cycle():
+    simulator = run("LDI r1 2", ".loop", "DEC r1", "BRH NE .loop")
+    # LDI, then DEC and BRH twice, then HLT.
+    assert simulator.cycles == simulator.executed == 6
+    assert simulator.profile == {'LDI': 1, 'ADI': 2, 'BRH': 2, 'HLT': 1}
+
+
+def test_assembly_errors():
+    with pytest.raises(SimulationError, match="Unknown instruction"):
+        Simulator(["FOO r1"])
+    with pytest.raises(SimulationError, match="Undefined label"):
+        Simulator(["JMP .nowhere"])
+
+
+def test_a_program_without_hlt_stops_at_the_cycle_limit():
+    with pytest.raises(SimulationError, match="No HLT"):
+        Simulator([".loop", "JMP .loop"], max_cycles=100).run()
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+import tkcode
+from generator import CodeGenerator
+from helpers import front_end
+from main import Tikki
+from stats import count_instructions
+
+SOURCE = "let a = 3;\nlet b = a * 5;\n"
+PHASES = ['parse', 'semantic', 'resolve', 'fold', 'dce', 'generate', 'peephole', 'emit']
+
+
+def compile_with_stats(tmp_path, monkeypatch, *flags):
+    (tmp_path / "p.tki").write_text(SOURCE)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Tikki, 'args', ['--no-cache', *flags, 'p.tki'])
+    Tikki.main()
+
+
+def test_the_report_has_every_phase_and_its_counts(tmp_path, monkeypatch, capsys):
+    compile_with_stats(tmp_path, monkeypatch, '--stats=report.json')
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert set(report) == {'phases', 'total_seconds', 'passes', 'peephole'}
+    assert [phase['name'] for phase in report['phases']] == PHASES
+    for phase in report['phases']:
+        assert set(phase) == {'name', 'seconds', 'allocated', 'peak', 'counts'}
+        assert isinstance(phase['seconds'], float) and phase['seconds'] >= 0
+        assert isinstance(phase['allocated'], int) and isinstance(phase['peak'], int)
+    assert report['total_seconds'] == pytest.approx(
+        sum(phase['seconds'] for phase in report['phases']))
+
+    counts = {phase['name']: phase['counts'] for phase in report['phases']}
+    # let a = 3 ; let b = a * 5 ; and the end of file.
+    assert counts['parse'] == {'tokens': 13, 'nodes': 6}
+    assert counts['semantic'] == {'symbols': 2}
+    assert counts['resolve'] == {'slots': 2}
+
+    # The peephole count is what the output holds, less the fixed header.
+    output = (tmp_path / "p.as").read_text()
+    header = io.StringIO()
+    tkcode.header(header)
+    tkcode.stater(header)
+    fixed = count_instructions(header.getvalue().splitlines() + ["JMP .end"])
+    assert counts['peephole']['instructions'] == count_instructions(output.splitlines()) - fixed
+    generator = CodeGenerator()
+    generator.generate(front_end(SOURCE))
+    assert counts['generate']['instructions'] == count_instructions(generator.instructions)
+    assert counts['emit'] == {'bytes': len(output)}
+    assert set(report['passes']) == {'inline', 'simplify-cfg', 'gvn', 'licm',
+                                     'strength-reduce', 'unroll', 'simplify-cfg-late'}
+    assert all(isinstance(hits, int) for hits in report['peephole'].values())
+
+    # The same table is printed.
+    printed = capsys.readouterr().out
+    assert all(name in printed for name in PHASES) and "tokens=13" in printed
+
+
+def test_the_report_defaults_next_to_the_script(tmp_path, monkeypatch):
+    compile_with_stats(tmp_path, monkeypatch, '--stats')
+    assert json.loads((tmp_path / "p.stats.json").read_text())['phases']
+
+
+def test_no_report_without_the_flag(tmp_path, monkeypatch, capsys):
+    compile_with_stats(tmp_path, monkeypatch)
+    assert not list(tmp_path.glob("*.json"))
+    assert "phase" not in capsys.readouterr().out
@@ -0,0 +1,62 @@
+import pytest
+
+from symbol_table import SymbolTable
+
+
+def test_lookup_reads_the_innermost_binding():
+    table = SymbolTable()
+    outer = table.define("x", "var", "u8")
+    table.enter_scope()
+    inner = table.define("x", "const", "u8")
+    assert table.lookup("x") is inner
+    assert table.bindings["x"] == [outer, inner]
+    assert table.lookup("missing") is None
+
+
+def test_exit_scope_unbinds_only_its_names():
+    table = SymbolTable()
+    outer = table.define("x", "var", "u8")
+    table.enter_scope()
+    table.define("x", "var", "u8")
+    table.define("y", "var", "u8")
+    table.exit_scope()
+    assert table.lookup("x") is outer
+    assert table.bindings == {"x": [outer]}
+    assert table.lookup("y") is None
+
+
+def test_the_global_scope_cannot_be_exited():
+    with pytest.raises(RuntimeError):
+        SymbolTable().exit_scope()
+
+
+def test_redefining_in_the_same_scope_replaces_the_binding():
+    table = SymbolTable()
+    table.define("x", "var", "u8")
+    table.enter_scope()
+    first = table.define("x", "var", "u8")
+    second = table.define("x", "fn", "u8")
+    assert table.lookup("x") is second
+    assert len(table.bindings["x"]) == 2 and table.bindings["x"][-1] is second
+    assert table.scopes[-1] == {"x": second}
+    # The replaced symbol keeps its slot.
+    assert table.symbols[first.slot] is first
+    table.exit_scope()
+    assert table.lookup("x").scope_level == 0
+
+
+def test_slots_number_every_definition_across_scopes():
+    table = SymbolTable()
+    a = table.define("a", "var", "u8")
+    table.enter_scope()
+    b = table.define("b", "var", "u8")
+    table.enter_scope()
+    shadow = table.define("a", "var", "u8")
+    table.exit_scope()
+    table.exit_scope()
+    table.enter_scope()
+    # Slots are never reused, even once their scope has closed.
+    c = table.define("c", "var", "u8")
+    assert [symbol.slot for symbol in (a, b, shadow, c)] == [0, 1, 2, 3]
+    assert table.symbols == [a, b, shadow, c]
+    assert [symbol.scope_level for symbol in (a, b, shadow, c)] == [0, 1, 2, 1]
@@ -0,0 +1,76 @@
+import pytest
+
+from error import TikkiError
+from helpers import PRELUDE, PROGRAMS, dump
+from incremental import Diagnostics
+from lexer import RegexScanner
+from parser import Parser
+from symbol_table import SymbolTable
+from token_stream import TokenStream
+
+SOURCE = "let a = 1;\nwhile (a < 9) { a = a + 2; }\n"
+
+
+def scan():
+    return RegexScanner(SOURCE, TikkiError(SOURCE)).scan_tokens()
+
+
+def test_stream_matches_the_token_list():
+    tokens = scan()
+    stream = TokenStream(iter(scan()))
+    for index, token in enumerate(tokens):
+        # Peek at the current token repeatedly, as the parser does.
+        for _ in range(2):
+            assert stream[index].lexeme == token.lexeme
+        if index:
+            assert stream[index - 1].lexeme == tokens[index - 1].lexeme
+    assert stream[-1].type == tokens[-1].type
+
+
+def test_evicted_and_missing_tokens_raise():
+    stream = TokenStream(iter(scan()), capacity=2)
+    stream[5]
+    with pytest.raises(IndexError):
+        stream[2]
+    with pytest.raises(IndexError):
+        stream[len(scan())]
+
+
+def parse(source, streamed, capacity=4):
+    """(statements, symbols, diagnostics) of parsing source from the token
+    list or through a TokenStream."""
+    error = Diagnostics(source)
+    scanner = RegexScanner(source, error)
+    tokens = TokenStream(scanner.iter_tokens(), capacity) if streamed else scanner.scan_tokens()
+    symbol_table = SymbolTable()
+    statements = Parser(tokens, error, symbol_table).parse()
+    return (None if statements is None else dump(statements),
+            [dump(symbol) for symbol in symbol_table.symbols], error.records)
+
+
+@pytest.mark.parametrize("source", [SOURCE] + [PRELUDE + body for body, _ in PROGRAMS])
+@pytest.mark.parametrize("capacity", [2, 4, 64])
+def test_parsing_through_the_stream_matches_the_list(source, capacity):
+    assert parse(source, True, capacity) == parse(source, False)
+
+
+@pytest.mark.parametrize("source", [
+    "let a = 1;\nlet b = a + ;\nlet c = 2;\n",
+    "let a = 1;\nlet b = (a;\nfn f( { }\nlet c = 3;",
+    "let a = 1;\nlet b = a +",
+    "fn f(x) { return x }\nlet c = f(1);",
+])
+def test_parse_errors_match(source):
+    streamed = parse(source, True)
+    assert streamed[2]
+    assert streamed == parse(source, False)
+
+
+def test_scanning_errors_are_reported_when_the_parser_reaches_them():
+    source = "let a = ;\nlet b = 1 @ 2;\n"
+    streamed, listed = parse(source, True), parse(source, False)
+    assert streamed[:2] == listed[:2]
+    # The list is scanned in full before parsing starts.
+    assert [record['phase'] for record in listed[2]] == ['Syntax', 'Parse', 'Parse']
+    assert [record['phase'] for record in streamed[2]] == ['Parse', 'Syntax', 'Parse']
+    assert sorted(map(str, streamed[2])) == sorted(map(str, listed[2]))